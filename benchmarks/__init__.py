@@ -0,0 +1 @@
+"""Benchmarks de desempenho do Eat Out Dashboard."""
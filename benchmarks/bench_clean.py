@@ -0,0 +1,167 @@
+"""Benchmark da limpeza dos dados: implementação linha a linha original x implementação vetorizada.
+
+    Uso (a partir da raiz do repositório):
+        python -m benchmarks.bench_clean
+        python -m benchmarks.bench_clean --scales 1 100 1000 --legacy-max-rows 1000000
+
+    As escalas multiplicam as ~7.5 mil linhas de data/zomato.csv (1 -> 7.5k, 100 -> 750k, 1000 -> 7.5M).
+    Cada réplica recebe um 'Restaurant ID' próprio para que as linhas não sejam descartadas como duplicadas.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import time
+import argparse
+import inflection
+
+import pandas         as pd
+
+from eat_out.data           import CSV_PATH, COUNTRIES, clean_dataframe, read_exchange_rate
+
+# ================================================================
+# IMPLEMENTAÇÃO ORIGINAL (REFERÊNCIA)
+# ================================================================
+
+def legacy_clean_dataframe(df, exchange_rate):
+    """
+        Cópia da clean_dataframe anterior à vetorização, mantida apenas como referência de tempo e de resultado
+    """
+    df = legacy_rename_columns(df)
+    df = df.dropna()
+    df = df.drop_duplicates(keep='first')
+    df['rating_color'] = df['rating_color'].map({
+                                                "3F7E00": "darkgreen",
+                                                "5BA829": "green",
+                                                "9ACD32": "lightgreen",
+                                                "CDD614": "orange",
+                                                "FFBA00": "red",
+                                                "CBCBC8": "darkred",
+                                                "FF7800": "darkred",
+                                                })
+    df['price_range'] = df.loc[:, 'price_range'].apply(lambda x: legacy_create_price_type(x))
+    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(",")[0])
+    df['currency'] = df.loc[:, 'currency'].apply(lambda x: legacy_currency_type(x))
+    df['average_cost_for_two'] = df['average_cost_for_two'].astype(float)
+    df['country'] = df.loc[:, 'country_code'].apply(lambda x: COUNTRIES[x])
+    df['exchange_rate'] = df.loc[:, 'currency'].map(exchange_rate)
+    df['price_brl'] = df['average_cost_for_two'] / df['exchange_rate']
+
+    return df
+
+def legacy_rename_columns(dataframe):
+    df = dataframe.copy()
+    title = lambda x: inflection.titleize(x)
+    snakecase = lambda x: inflection.underscore(x)
+    spaces = lambda x: x.replace(" ", "")
+    cols_old = list(df.columns)
+    cols_old = list(map(title, cols_old))
+    cols_old = list(map(spaces, cols_old))
+    cols_new = list(map(snakecase, cols_old))
+    df.columns = cols_new
+
+    return df
+
+def legacy_create_price_type(price_range):
+    if price_range == 1:
+        return "cheap"
+    elif price_range == 2:
+        return "normal"
+    elif price_range == 3:
+        return "expensive"
+    else:
+        return "gourmet"
+
+def legacy_currency_type(currency):
+    if currency == 'Botswana Pula(P)':
+        return 'BWP'
+    elif currency == 'Brazilian Real(R$)':
+        return 'BRL'
+    elif currency == 'Dollar($)':
+        return 'USD'
+    elif currency == 'Emirati Diram(AED)':
+        return 'AED'
+    elif currency == 'Indian Rupees(Rs.)':
+        return 'INR'
+    elif currency == 'Indonesian Rupiah(IDR)':
+        return 'IDR'
+    elif currency == 'NewZealand($)':
+        return 'NZD'
+    elif currency == 'Pounds(£)':
+        return 'GBP'
+    elif currency == 'Qatari Rial(QR)':
+        return 'QAR'
+    elif currency == 'Rand(R)':
+        return 'ZAR'
+    elif currency == 'Sri Lankan Rupee(LKR)':
+        return 'LKR'
+    else:
+        return 'TRY'
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def scale_dataframe(df, scale):
+    """
+        Replica o dataframe bruto 'scale' vezes, deslocando o 'Restaurant ID' de cada réplica
+    """
+    if scale == 1:
+        return df
+
+    frames = []
+    offset = int(df['Restaurant ID'].max()) + 1
+    for i in range(scale):
+        frame = df.copy()
+        frame['Restaurant ID'] = frame['Restaurant ID'] + i * offset
+        frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True)
+
+def best_time(func, repeat):
+    """
+        Executa func 'repeat' vezes e devolve o menor tempo e o último resultado
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max-rows', type=int, default=None,
+                        help='não executa a implementação original acima deste número de linhas')
+    args = parser.parse_args()
+
+    raw = pd.read_csv(CSV_PATH)
+    exchange_rate = read_exchange_rate()
+
+    print('{:>10} | {:>12} | {:>14} | {:>8}'.format('linhas', 'original (s)', 'vetorizada (s)', 'speedup'))
+    for scale in args.scales:
+        df = scale_dataframe(raw, scale)
+        repeat = args.repeat if scale < 1000 else 1
+
+        new_time, new = best_time(lambda: clean_dataframe(df, exchange_rate), repeat)
+
+        if args.legacy_max_rows is not None and len(df) > args.legacy_max_rows:
+            print('{:>10} | {:>12} | {:>14.3f} | {:>8}'.format(len(df), '-', new_time, '-'))
+            continue
+
+        old_time, old = best_time(lambda: legacy_clean_dataframe(df, exchange_rate), repeat)
+
+        # as duas implementações precisam produzir exatamente o mesmo dataframe (a atual acrescenta price_outlier)
+        pd.testing.assert_frame_equal(old, new[old.columns])
+
+        print('{:>10} | {:>12.3f} | {:>14.3f} | {:>7.1f}x'.format(len(df), old_time, new_time, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
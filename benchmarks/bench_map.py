@@ -0,0 +1,60 @@
+"""Benchmark do mapa de localização: marcadores folium individuais x payload colunar com cluster no navegador.
+
+    Uso (a partir da raiz do repositório):
+        python -m benchmarks.bench_map
+        python -m benchmarks.bench_map --scales 1 10 100 --legacy-max-rows 100000
+
+    As escalas multiplicam os ~7 mil restaurantes limpos (1 -> 7k, 10 -> 70k, 100 -> 700k).
+    O tempo medido inclui a montagem do mapa e a renderização do HTML, que é o que o folium_static envia ao navegador.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import time
+import argparse
+
+import pandas         as pd
+
+from eat_out.data           import build_clean_restaurants
+from eat_out.maps           import LOCATION_COLUMNS, build_location_map
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def render_map(df, mode):
+    """
+        Monta e renderiza o mapa, devolvendo o tempo gasto e o tamanho do HTML em bytes
+    """
+    start = time.perf_counter()
+    html = build_location_map(df, mode).get_root().render()
+    elapsed = time.perf_counter() - start
+
+    return elapsed, len(html.encode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--legacy-max-rows', type=int, default=100000,
+                        help='não executa o modo markers acima deste número de linhas')
+    args = parser.parse_args()
+
+    df = build_clean_restaurants().loc[:, LOCATION_COLUMNS]
+
+    print('{:>8} | {:>8} | {:>10} | {:>12}'.format('linhas', 'modo', 'tempo (s)', 'HTML (MB)'))
+    for scale in args.scales:
+        df_scaled = pd.concat([df] * scale, ignore_index=True) if scale > 1 else df
+
+        for mode in ('markers', 'fast'):
+            if mode == 'markers' and len(df_scaled) > args.legacy_max_rows:
+                print('{:>8} | {:>8} | {:>10} | {:>12}'.format(len(df_scaled), mode, '-', '-'))
+                continue
+
+            elapsed, size = render_map(df_scaled, mode)
+            print('{:>8} | {:>8} | {:>10.3f} | {:>12.2f}'.format(len(df_scaled), mode, elapsed, size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
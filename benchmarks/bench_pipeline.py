@@ -0,0 +1,411 @@
+"""Benchmark do pipeline completo do dashboard, etapa por etapa, sem navegador.
+
+    Cada etapa chama o mesmo código usado pelas páginas (leitura, limpeza, snapshot, índices pré-calculados, filtros
+    da barra lateral, agregações de cada gráfico e HTML do mapa), com a seleção padrão das páginas: todos os países
+    e as faixas completas de nota e de preço. Os caches do Streamlit não participam: os objetos são montados direto.
+
+    Para cada escala e etapa são registrados:
+        - o menor tempo de parede entre as repetições;
+        - o pico de memória alocada durante a etapa (tracemalloc, em uma execução separada, fora da medição de tempo).
+          O tracemalloc enxerga a memória do Python e do NumPy; buffers internos do Arrow ficam de fora.
+
+    Com --baseline os resultados são comparados a uma execução gravada antes com --save-baseline: etapas mais lentas
+    (ou que usam mais memória) que o limite --threshold são marcadas e o script termina com código 1. O baseline
+    depende da máquina, por isso não é versionado. Com --baseline-ref o próprio script mede o baseline: o merge-base
+    do HEAD com a referência (por exemplo origin/main) é aberto em um git worktree temporário e o benchmark dele roda
+    antes, na mesma máquina e com as mesmas opções. É assim que o CI detecta regressões sem um arquivo gravado.
+
+    Uso (a partir da raiz do repositório):
+        python -m benchmarks.bench_pipeline
+        python -m benchmarks.bench_pipeline --scales 1 10 --save-baseline benchmarks/baseline.json
+        python -m benchmarks.bench_pipeline --scales 1 10 --baseline benchmarks/baseline.json
+        python -m benchmarks.bench_pipeline --scales 1 10 --baseline-ref origin/main
+
+    As escalas multiplicam as ~7.5 mil linhas de data/zomato.csv: por padrão com réplicas da amostra, como em
+    benchmarks.bench_clean, e com --synthetic com linhas do gerador de benchmarks.synthetic.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy          as np
+import pandas         as pd
+
+from eat_out.data           import CSV_PATH, CURRENCY_PATH, clean_dataframe, read_exchange_rate
+from eat_out.schema         import apply_schema
+from eat_out.snapshot       import write_snapshot, read_snapshot
+from eat_out.currency       import FileRateProvider, rate_paths
+from eat_out.filters        import FilterIndex
+from eat_out.cube           import RestaurantCube
+from eat_out.pyramid        import LocationPyramid
+from eat_out.ranking        import top_k, rank_ends
+from eat_out.leaderboard    import leaderboard
+from eat_out.maps           import PYRAMID_MIN_POINTS, MAP_LEVELS, MAX_CELLS_PER_LEVEL, build_location_map, build_density_map
+from benchmarks.bench_clean import scale_dataframe
+from benchmarks.synthetic   import write_csv
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+
+# limite padrão de piora em relação ao baseline (1.25 = 25% mais lento ou 25% mais memória)
+THRESHOLD = 1.25
+
+# etapas abaixo deste tempo não são comparadas com o baseline: entre processos o tempo delas varia mais que o limite
+MIN_COMPARABLE_SECONDS = 0.05
+
+# etapas curtas são repetidas até somar este tempo (no máximo MAX_REPEAT vezes), para estabilizar o menor tempo
+MIN_MEASURE_SECONDS = 0.2
+MAX_REPEAT = 50
+
+# colunas carregadas pela página de culinárias (partições de um país)
+CUISINE_PAGE_COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'aggregate_rating', 'votes', 'price_brl',
+                        'price_outlier', 'average_cost_for_two', 'currency']
+
+# ================================================================
+# ETAPAS
+# ================================================================
+# cada etapa recebe o contexto (dicionário com os resultados das etapas anteriores) e devolve o seu resultado,
+# guardado no contexto com o nome da etapa
+
+def stage_csv_load(ctx):
+    return pd.read_csv(ctx['csv_path'])
+
+def stage_currency_load(ctx):
+    return read_exchange_rate(CURRENCY_PATH)
+
+def stage_rates_load(ctx):
+    return FileRateProvider(rate_paths())
+
+def stage_clean(ctx):
+    return clean_dataframe(ctx['csv_load'], ctx['currency_load'])
+
+def stage_schema(ctx):
+    return apply_schema(ctx['clean'])
+
+def stage_snapshot_write(ctx):
+    return write_snapshot(ctx['schema'], ctx['snapshot_path'], 'benchmark')
+
+def stage_snapshot_read(ctx):
+    return read_snapshot(ctx['snapshot_path'])
+
+def stage_snapshot_read_country(ctx):
+    return read_snapshot(ctx['snapshot_path'], CUISINE_PAGE_COLUMNS, [ctx['country']])
+
+def stage_filter_index(ctx):
+    return FilterIndex(ctx['snapshot_read'])
+
+def stage_cube(ctx):
+    return RestaurantCube(ctx['snapshot_read'])
+
+def stage_pyramid(ctx):
+    return LocationPyramid(ctx['snapshot_read'])
+
+def stage_filter_country(ctx):
+    return ctx['filter_index'].isin(ctx['countries'])
+
+def stage_filter_rating_domain(ctx):
+    return ctx['filter_index'].domain('aggregate_rating', ctx['filter_country'])
+
+def stage_filter_rating(ctx):
+    domain = ctx['filter_rating_domain']
+    return ctx['filter_country'] & ctx['filter_index'].between('aggregate_rating', domain.min, domain.max)
+
+def stage_filter_price_domain(ctx):
+    rows = ctx['filter_rating'] & ctx['filter_index'].unflagged('price_outlier')
+    return ctx['filter_index'].domain('price_brl', rows)
+
+def stage_filter_price(ctx):
+    domain = ctx['filter_price_domain']
+    rows = ctx['filter_rating'] & ctx['filter_index'].unflagged('price_outlier')
+    return rows & ctx['filter_index'].between('price_brl', domain.min, domain.max)
+
+def stage_filter_take(ctx):
+    return ctx['filter_index'].take(ctx['snapshot_read'], ctx['filter_price'])
+
+def stage_cube_select(ctx):
+    rating, price = ctx['filter_rating_domain'], ctx['filter_price_domain']
+    selection = ctx['cube'].select(ctx['countries'], (rating.min, rating.max), (price.min, price.max))
+    return selection.where(~selection.cells['price_outlier'])
+
+def stage_geral_metrics(ctx):
+    selection = ctx['cube_select']
+    return [selection.total(column) for column in ('country', 'restaurant_id', 'city', 'cuisines', 'votes_sum')]
+
+def stage_geral_restaurants(ctx):
+    return top_k(ctx['cube_select'].nunique('country', 'restaurant_id'), 'restaurant_id')
+
+def stage_geral_cuisines(ctx):
+    return top_k(ctx['cube_select'].nunique('country', 'cuisines'), 'cuisines')
+
+def stage_geral_cities(ctx):
+    return top_k(ctx['cube_select'].nunique('country', 'city'), 'city', k=None)
+
+def stage_cidades_cuisines(ctx):
+    return top_k(ctx['cube'].select(ctx['countries']).nunique('city', 'cuisines'), 'cuisines')
+
+def stage_cidades_rating_high(ctx):
+    selection = ctx['cube'].select(ctx['countries'])
+    return top_k(selection.above('aggregate_rating', 4).nunique('city', 'restaurant_id'), 'restaurant_id')
+
+def stage_cidades_rating_low(ctx):
+    selection = ctx['cube'].select(ctx['countries'])
+    return top_k(selection.below('aggregate_rating', 2.5).nunique('city', 'restaurant_id'), 'restaurant_id', k=None)
+
+def stage_cidades_cost(ctx):
+    selection = ctx['cube'].select(ctx['countries'])
+    return rank_ends(selection.where(~selection.cells['price_outlier']).cost_mean(['city', 'country'], ctx['rates_load'].table(), 'USD'),
+                     'average_cost_for_two')
+
+def stage_culinarias_leaderboard(ctx):
+    board = leaderboard(ctx['snapshot_read'])
+    return ctx['rates_load'].convert(board['average_cost_for_two'], board['currency'], 'USD')
+
+def stage_culinarias_rating(ctx):
+    return rank_ends(ctx['cube'].select(ctx['countries']).mean('cuisines', 'aggregate_rating'), 'aggregate_rating')
+
+def stage_culinarias_cost(ctx):
+    selection = ctx['cube'].select(ctx['countries'])
+    return top_k(selection.where(~selection.cells['price_outlier']).cost_mean('cuisines', ctx['rates_load'].table(), 'USD'),
+                 'average_cost_for_two')
+
+def stage_culinarias_delivery(ctx):
+    selection = ctx['cube'].select(ctx['countries'])
+    return top_k(selection.where(selection.cells['online_delivery'] > 0).sum('cuisines', 'online_delivery'), 'online_delivery')
+
+def stage_map_html(ctx):
+    # mesma regra da página Geral: pontos até PYRAMID_MIN_POINTS, células da pirâmide acima disso
+    df = ctx['filter_take']
+    if len(df) > PYRAMID_MIN_POINTS:
+        rating, price = ctx['filter_rating_domain'], ctx['filter_price_domain']
+        cells = ctx['pyramid'].query(ctx['countries'], (rating.min, rating.max), (price.min, price.max), levels=MAP_LEVELS,
+                                     drop_outliers=True, max_cells=MAX_CELLS_PER_LEVEL)
+        mapa = build_density_map(cells)
+    else:
+        mapa = build_location_map(df)
+
+    return mapa.get_root().render()
+
+STAGES = [
+('csv_load', stage_csv_load),
+('currency_load', stage_currency_load),
+('rates_load', stage_rates_load),
+('clean', stage_clean),
+('schema', stage_schema),
+('snapshot_write', stage_snapshot_write),
+('snapshot_read', stage_snapshot_read),
+('snapshot_read_country', stage_snapshot_read_country),
+('filter_index', stage_filter_index),
+('cube', stage_cube),
+('pyramid', stage_pyramid),
+('filter_country', stage_filter_country),
+('filter_rating_domain', stage_filter_rating_domain),
+('filter_rating', stage_filter_rating),
+('filter_price_domain', stage_filter_price_domain),
+('filter_price', stage_filter_price),
+('filter_take', stage_filter_take),
+('cube_select', stage_cube_select),
+('geral_metrics', stage_geral_metrics),
+('geral_restaurants', stage_geral_restaurants),
+('geral_cuisines', stage_geral_cuisines),
+('geral_cities', stage_geral_cities),
+('cidades_cuisines', stage_cidades_cuisines),
+('cidades_rating_high', stage_cidades_rating_high),
+('cidades_rating_low', stage_cidades_rating_low),
+('cidades_cost', stage_cidades_cost),
+('culinarias_leaderboard', stage_culinarias_leaderboard),
+('culinarias_rating', stage_culinarias_rating),
+('culinarias_cost', stage_culinarias_cost),
+('culinarias_delivery', stage_culinarias_delivery),
+('map_html', stage_map_html),
+]
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def measure(func, ctx, repeat):
+    """
+        Menor tempo de parede entre as repetições e pico de memória (MB) de uma execução extra com tracemalloc.
+        A etapa roda pelo menos 'repeat' vezes e, se for curta, até somar MIN_MEASURE_SECONDS.
+    """
+    best = None
+    result = None
+    count = 0
+    total = 0.0
+    while count < repeat or (total < MIN_MEASURE_SECONDS and count < MAX_REPEAT):
+        start = time.perf_counter()
+        result = func(ctx)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        count += 1
+        total += elapsed
+
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak / 1024 ** 2, result
+
+def run_scale(raw, scale, repeat, countries, workdir, seed=None):
+    """
+        Executa todas as etapas em uma escala e devolve {etapa: {'rows', 'seconds', 'peak_mb'}}.
+        Com seed, o CSV da escala vem do gerador sintético em vez das réplicas da amostra.
+    """
+    csv_path = os.path.join(workdir, 'zomato_x{}.csv'.format(scale))
+    if seed is None:
+        rows = len(raw) * scale
+        scale_dataframe(raw, scale).to_csv(csv_path, index=False)
+    else:
+        rows = write_csv(csv_path, len(raw) * scale, seed)
+
+    ctx = {
+        'csv_path': csv_path,
+        'snapshot_path': os.path.join(workdir, 'zomato_x{}.feather'.format(scale)),
+        'countries': countries,
+        'country': countries[0],
+    }
+
+    results = {}
+    for name, func in STAGES:
+        seconds, peak_mb, ctx[name] = measure(func, ctx, repeat)
+        results[name] = {'rows': rows, 'seconds': seconds, 'peak_mb': peak_mb}
+
+    return results
+
+def compare(results, baseline, threshold):
+    """
+        Razão atual/baseline de tempo e de memória de cada etapa e a lista das que pioraram além do limite
+    """
+    ratios = {}
+    regressions = []
+    for key, current in results.items():
+        if key not in baseline:
+            continue
+
+        previous = baseline[key]
+        time_ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else np.nan
+        memory_ratio = current['peak_mb'] / previous['peak_mb'] if previous['peak_mb'] else np.nan
+        ratios[key] = (time_ratio, memory_ratio)
+
+        slower = previous['seconds'] >= MIN_COMPARABLE_SECONDS and time_ratio > threshold
+        if slower or memory_ratio > threshold:
+            regressions.append(key)
+
+    return ratios, regressions
+
+def environment():
+    """
+        Versões registradas junto com o baseline, para saber em que ambiente ele foi medido
+    """
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }
+
+def git(*args, cwd=None):
+    """
+        Executa um comando git e devolve a saída sem espaços nas pontas
+    """
+    return subprocess.check_output(('git',) + args, cwd=cwd, text=True).strip()
+
+def ref_baseline(ref, options):
+    """
+        Mede o baseline no merge-base do HEAD com ref: o commit é aberto em um git worktree temporário e o benchmark
+        dele roda com as mesmas options (argumentos de linha de comando). Devolve os resultados gravados pela execução.
+    """
+    root = git('rev-parse', '--show-toplevel')
+    commit = git('merge-base', 'HEAD', ref, cwd=root)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tree = os.path.join(workdir, 'tree')
+        output = os.path.join(workdir, 'baseline.json')
+        git('worktree', 'add', '--quiet', '--detach', tree, commit, cwd=root)
+        try:
+            print('medindo o baseline em {} ({})'.format(commit[:12], ref))
+            subprocess.run([sys.executable, '-m', 'benchmarks.bench_pipeline', *options, '--save-baseline', output],
+                           cwd=tree, check=True, stdout=subprocess.DEVNULL)
+            with open(output, encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        finally:
+            git('worktree', 'remove', '--force', tree, cwd=root)
+
+    return baseline
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--countries', nargs='+', default=None, help='países selecionados (padrão: todos)')
+    parser.add_argument('--synthetic', action='store_true', help='usa o gerador sintético em vez de réplicas da amostra')
+    parser.add_argument('--seed', type=int, default=0, help='semente do gerador sintético')
+    parser.add_argument('--baseline', default=None, help='JSON gravado antes com --save-baseline')
+    parser.add_argument('--baseline-ref', default=None,
+                        help='mede o baseline no merge-base do HEAD com esta referência git (por exemplo origin/main)')
+    parser.add_argument('--save-baseline', default=None, help='grava os resultados desta execução neste JSON')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+    if args.baseline and args.baseline_ref:
+        parser.error('use --baseline ou --baseline-ref, não os dois')
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+    elif args.baseline_ref:
+        # o baseline roda antes da medição atual, com as mesmas opções
+        options = ['--scales', *map(str, args.scales), '--repeat', str(args.repeat)]
+        options += ['--countries', *args.countries] if args.countries else []
+        options += ['--synthetic', '--seed', str(args.seed)] if args.synthetic else []
+        baseline = ref_baseline(args.baseline_ref, options)
+
+    raw = pd.read_csv(CSV_PATH)
+    countries = args.countries or sorted(clean_dataframe(raw, read_exchange_rate())['country'].unique())
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            repeat = args.repeat if scale < 100 else 1
+            seed = args.seed if args.synthetic else None
+            for name, result in run_scale(raw, scale, repeat, countries, workdir, seed).items():
+                results['{}:{}'.format(scale, name)] = result
+
+    ratios, regressions = compare(results, baseline, args.threshold)
+
+    print('{:>6} | {:<24} | {:>9} | {:>10} | {:>9} | {:>8} | {:>8}'.format(
+        'escala', 'etapa', 'linhas', 'tempo (ms)', 'pico (MB)', 'tempo x', 'mem x'))
+    for key, result in results.items():
+        scale, name = key.split(':')
+        time_ratio, memory_ratio = ('{:.2f}'.format(ratio) for ratio in ratios[key]) if key in ratios else ('-', '-')
+        print('{:>6} | {:<24} | {:>9} | {:>10.1f} | {:>9.1f} | {:>8} | {:>8}{}'.format(
+            scale, name, result['rows'], result['seconds'] * 1e3, result['peak_mb'], time_ratio, memory_ratio,
+            '  <-- piorou' if key in regressions else ''))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump({'environment': environment(), 'results': results}, file, indent=1, sort_keys=True)
+        print('baseline gravado: {}'.format(args.save_baseline))
+
+    if regressions:
+        print('{} etapa(s) pioraram mais que {:.0%} em relação ao baseline'.format(len(regressions), args.threshold - 1))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark da inicialização das páginas: tempo de import por módulo, primeira execução e reruns.
+
+    Cada página roda em um processo Python novo (sem o servidor do Streamlit, como nos demais benchmarks) com
+    -X importtime. São medidos:
+        - partida a frio: do início do processo até o fim da primeira execução da página;
+        - imports: soma do tempo de import dos módulos de primeiro nível, com os mais lentos listados, e a quantidade
+          total de módulos carregados (que não varia com a carga da máquina);
+        - primeira execução e rerun: a página é executada duas vezes no mesmo processo; no rerun os módulos já estão
+          importados, então o tempo é só o do código da página.
+    Cada página é medida --repeat vezes e fica a execução com a menor partida a frio.
+
+    Uso (a partir da raiz do repositório):
+        python -m benchmarks.bench_startup
+        python -m benchmarks.bench_startup --top 5 --root /caminho/de/outra/versao
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import subprocess
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+
+# executado no processo filho: roda a página duas vezes e imprime os tempos como JSON na última linha
+RUN_PAGE = '''
+import sys, json, time, runpy, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, '.')
+times = []
+for _ in range(2):
+    start = time.perf_counter()
+    runpy.run_path(sys.argv[1], run_name='__main__')
+    times.append(time.perf_counter() - start)
+print(json.dumps({'first_run': times[0], 'rerun': times[1]}))
+'''
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def page_paths(root):
+    """
+        Home e páginas do dashboard, na ordem do menu
+    """
+    return sorted(glob.glob(os.path.join(root, '*Home.py'))) + sorted(glob.glob(os.path.join(root, 'pages', '*.py')))
+
+def parse_importtime(stderr):
+    """
+        Tempo acumulado (s) de cada módulo importado no primeiro nível e quantidade total de módulos carregados, a
+        partir da saída de -X importtime
+    """
+    modules = {}
+    loaded = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        loaded += 1
+        if not name.startswith('  '):
+            name = name.strip()
+            modules[name] = modules.get(name, 0) + int(cumulative) / 1e6
+
+    return modules, loaded
+
+def measure_page(path, root):
+    """
+        Partida a frio, tempos da página e imports de primeiro nível de uma execução em processo novo
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(root))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', RUN_PAGE, os.path.abspath(path)],
+                             cwd=root, env=env, capture_output=True, text=True)
+    cold_start = time.perf_counter() - start
+
+    if process.returncode != 0:
+        return {'error': process.stderr.strip().splitlines()[-1]}
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['cold_start'] = cold_start
+    result['modules'], result['loaded'] = parse_importtime(process.stderr)
+    result['imports'] = sum(result['modules'].values())
+
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--root', default='.', help='raiz do repositório a medir')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8, help='quantidade de módulos listados por página')
+    args = parser.parse_args()
+
+    for path in page_paths(args.root):
+        runs = [measure_page(path, args.root) for _ in range(args.repeat)]
+        ok = [run for run in runs if 'error' not in run]
+        name = os.path.basename(path)
+
+        if not ok:
+            print('{}: erro ao executar ({})'.format(name, runs[-1]['error']))
+            continue
+
+        best = min(ok, key=lambda run: run['cold_start'])
+        print('{}: partida a frio {:.2f} s | imports {:.2f} s ({} módulos) | primeira execução {:.2f} s | rerun {:.3f} s'.format(
+            name, best['cold_start'], best['imports'], best['loaded'], best['first_run'], best['rerun']))
+
+        slowest = sorted(best['modules'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for module, seconds in slowest:
+            print('    {:<28} {:>7.3f} s'.format(module, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Gerador de dados sintéticos no formato de data/zomato.csv, para testes de carga e de escala.
+
+    As linhas são geradas por bootstrap condicionado ao país: o país segue a proporção de 'Country Code' da amostra e
+    cada grupo de colunas (COLUMN_GROUPS) é copiado de uma linha sorteada do mesmo país, de forma independente entre
+    os grupos. Assim são mantidos:
+        - a mistura de países e a moeda de cada país (os textos que currency_type reconhece);
+        - as cidades e localidades de cada país, com as coordenadas deslocadas por um ruído pequeno
+          (LOCATION_JITTER), o que preserva os aglomerados de cada cidade;
+        - as strings de 'Cuisines' com várias culinárias, e a taxa de valores ausentes da coluna;
+        - os pares de nota, cor e texto da avaliação, com os votos da mesma linha;
+        - o preço para duas pessoas junto com a faixa de preço.
+    Uma fração das linhas (a mesma taxa de duplicados da amostra) é cópia exata de uma linha anterior do mesmo bloco.
+
+    A geração é feita em blocos de BLOCK_ROWS linhas, cada um com a sua semente derivada de --seed, e gravada no CSV
+    bloco a bloco: a memória não depende do total de linhas e a mesma semente sempre gera o mesmo arquivo (os blocos
+    completos iniciais são iguais para qualquer total de linhas). Com --snapshot o CSV também é convertido para o
+    snapshot colunar (eat_out.ingest), ao lado do CSV.
+
+    Uso (a partir da raiz do repositório):
+        python -m benchmarks.synthetic --rows 750000 --output /tmp/zomato_750k.csv
+        python -m benchmarks.synthetic --rows 7500000 --seed 7 --output /tmp/zomato_7m.csv --snapshot
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import argparse
+
+import numpy          as np
+import pandas         as pd
+
+from eat_out.data           import CSV_PATH
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+BLOCK_ROWS = 100000
+
+# colunas copiadas juntas de uma mesma linha da amostra
+COLUMN_GROUPS = {
+'name': ['Restaurant Name'],
+'location': ['City', 'Address', 'Locality', 'Locality Verbose', 'Longitude', 'Latitude'],
+'cuisines': ['Cuisines'],
+'price': ['Average Cost for two', 'Price range'],
+'services': ['Has Table booking', 'Has Online delivery', 'Is delivering now', 'Switch to order menu'],
+'rating': ['Aggregate rating', 'Rating color', 'Rating text', 'Votes'],
+}
+
+# desvio padrão (em graus) do ruído somado às coordenadas; coordenadas (0, 0) da amostra ficam como estão
+LOCATION_JITTER = 0.002
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class SyntheticZomato:
+    """
+        Modelo do gerador: as linhas da amostra agrupadas por país, a proporção de cada país e a taxa de duplicados
+    """
+
+    def __init__(self, sample):
+        self.columns = list(sample.columns)
+        self.duplicate_rate = 1 - len(sample.drop_duplicates()) / len(sample)
+
+        # linhas distintas da amostra ordenadas por país: as de cada país ocupam um intervalo contínuo
+        distinct = sample.drop_duplicates().sort_values('Country Code', kind='mergesort').reset_index(drop=True)
+        countries, starts, counts = np.unique(distinct['Country Code'].to_numpy(), return_index=True, return_counts=True)
+        self.rows = distinct
+        self.countries = countries
+        self.starts = starts
+        self.counts = counts
+        self.weights = sample['Country Code'].value_counts(normalize=True).reindex(countries).to_numpy()
+        self.currencies = distinct.groupby('Country Code')['Currency'].first().reindex(countries).to_numpy()
+
+    def block(self, rng, n_rows, first_id):
+        """
+            Gera um bloco de n_rows linhas com o gerador rng; os ids das linhas novas começam em first_id
+        """
+        country = rng.choice(len(self.countries), size=n_rows, p=self.weights)
+
+        columns = {
+            'Restaurant ID': np.arange(first_id, first_id + n_rows, dtype=np.int64),
+            'Country Code': self.countries[country],
+            'Currency': self.currencies[country],
+        }
+        for group in COLUMN_GROUPS.values():
+            # uma linha sorteada do mesmo país para cada grupo de colunas
+            source = self.starts[country] + (rng.random(n_rows) * self.counts[country]).astype(np.int64)
+            for col in group:
+                columns[col] = self.rows[col].to_numpy()[source]
+
+        for col in ('Latitude', 'Longitude'):
+            values = columns[col]
+            columns[col] = np.where(values != 0, values + rng.normal(0, LOCATION_JITTER, n_rows), values).round(6)
+
+        df = pd.DataFrame(columns).loc[:, self.columns]
+
+        return df.take(duplicate_sources(rng, n_rows, self.duplicate_rate))
+
+    def generate(self, n_rows, seed=0):
+        """
+            Gera n_rows linhas em blocos de BLOCK_ROWS (dataframes), com uma semente derivada de seed por bloco
+        """
+        n_blocks = -(-n_rows // BLOCK_ROWS)
+        for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_blocks)):
+            size = min(BLOCK_ROWS, n_rows - i * BLOCK_ROWS)
+            yield self.block(np.random.default_rng(child), size, 1 + i * BLOCK_ROWS)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def duplicate_sources(rng, n_rows, rate):
+    """
+        Linha de origem de cada posição do bloco: a própria posição ou, para uma fração rate das linhas, uma posição
+        anterior sorteada (resolvida até uma linha original, então a cópia é exata)
+    """
+    sources = np.arange(n_rows)
+    duplicated = rng.random(n_rows) < rate
+    duplicated[0] = False
+    positions = np.flatnonzero(duplicated)
+    sources[positions] = (rng.random(len(positions)) * positions).astype(np.int64)
+
+    # uma cópia de cópia aponta para a origem da origem, até chegar em uma linha original
+    while duplicated[sources].any():
+        sources = sources[sources]
+
+    return sources
+
+def write_csv(path, n_rows, seed=0, sample_path=CSV_PATH):
+    """
+        Grava n_rows linhas sintéticas em path, bloco a bloco. Devolve a quantidade de linhas gravadas.
+    """
+    model = SyntheticZomato(pd.read_csv(sample_path))
+
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        for block in model.generate(n_rows, seed):
+            block.to_csv(file, header=written == 0, index=False)
+            written += len(block)
+
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--sample', default=CSV_PATH)
+    parser.add_argument('--snapshot', action='store_true', help='também gera o snapshot colunar ao lado do CSV')
+    args = parser.parse_args()
+
+    written = write_csv(args.output, args.rows, args.seed, args.sample)
+    print('{} linhas gravadas em {}'.format(written, args.output))
+
+    if args.snapshot:
+        from eat_out.ingest import stream_snapshot
+        from eat_out.snapshot import snapshot_path
+
+        stats = stream_snapshot(args.output)
+        print('snapshot gerado: {}'.format(snapshot_path(args.output)))
+        print(stats.report())
+
+
+if __name__ == '__main__':
+    main()
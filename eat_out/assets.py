@@ -0,0 +1,199 @@
+"""Imagens das páginas, codificadas uma vez por processo no formato que o Streamlit envia sem converter.
+
+    O st.image do Streamlit 1.16 só envia JPEG, PNG e GIF. Sem output_format, uma imagem opaca (RGB) é sempre
+    convertida para JPEG, e um PNG lido do disco era decodificado e codificado de novo a cada rerun. Aqui cada
+    imagem de ASSETS é codificada na primeira vez em que é exibida:
+        - imagens estáticas: limitadas a MAX_IMAGE_WIDTH de largura; imagens opacas viram o menor entre um PNG
+          otimizado e um JPEG (JPEG_QUALITY), e imagens com transparência ou paleta ficam em PNG otimizado;
+        - GIFs animados: um de cada GIF_FRAME_STEP quadros, com a duração somada (a animação dura o mesmo tempo).
+    A versão codificada só é usada quando é menor que o arquivo original. Os bytes ficam em um cache do processo
+    (eat_out.cache) chaveado pelo arquivo e pela data de modificação, e são passados ao st.image com output_format
+    fixo, então o Streamlit não decodifica nem converte a imagem de novo.
+
+    Uma imagem que não existe no disco não interrompe a página: validate_assets() registra no log as imagens
+    ausentes uma vez por processo e show_image() exibe um aviso no lugar.
+
+    Relatório das imagens (tamanho original e codificado), a partir da raiz do repositório:
+        python -m eat_out.assets
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import io
+import os
+import logging
+
+from functools import lru_cache
+
+import streamlit      as st
+
+from PIL                    import Image, ImageSequence
+
+from eat_out.cache          import BudgetCache, budget_bytes
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+ASSETS = {
+'logo': 'img/logo_eat_out.png',
+'localizacao_info': 'img/localizacao_info.png',
+'ranking_culinaria': 'img/ranking_culinaria.png',
+'filtro_preco': 'img/filtro_preco.png',
+'gif_graph': 'img/gif_graph.gif',
+'gif_graph2': 'img/gif_graph2.gif',
+}
+
+# largura da coluna de conteúdo do Streamlit; imagens maiores são reduzidas antes de codificar
+MAX_IMAGE_WIDTH = 730
+
+JPEG_QUALITY = 90
+
+# nos GIFs animados fica um quadro a cada GIF_FRAME_STEP
+GIF_FRAME_STEP = 2
+
+ASSET_CACHE_ENV = 'EAT_OUT_ASSET_CACHE_MB'
+ASSET_CACHE_MB = 16
+
+logger = logging.getLogger(__name__)
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class EncodedAsset:
+    """
+        Bytes prontos para o st.image, com o formato (output_format) e o tamanho do arquivo original
+    """
+
+    def __init__(self, data, image_format, source_nbytes):
+        self.data = data
+        self.format = image_format
+        self.source_nbytes = source_nbytes
+
+    def __len__(self):
+        return len(self.data)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def missing_assets():
+    """
+        Nomes das imagens de ASSETS que não existem no disco
+    """
+    return [name for name, path in ASSETS.items() if not os.path.isfile(path)]
+
+@lru_cache(maxsize=None)
+def validate_assets():
+    """
+        Verifica as imagens uma vez por processo e registra no log as ausentes
+    """
+    missing = missing_assets()
+    for name in missing:
+        logger.warning('imagem %r não encontrada: %s', name, ASSETS[name])
+
+    return tuple(missing)
+
+def save_image(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+
+    return buffer.getvalue()
+
+def encode_still(image):
+    """
+        (bytes, formato) de uma imagem estática, no formato que o Streamlit envia sem converter
+    """
+    # os mesmos modos que o Streamlit trata como possivelmente transparentes
+    transparent = image.mode in ('RGBA', 'LA', 'P')
+
+    if image.width > MAX_IMAGE_WIDTH:
+        height = round(image.height * MAX_IMAGE_WIDTH / image.width)
+        image = image.convert('RGBA' if transparent else 'RGB').resize((MAX_IMAGE_WIDTH, height), Image.LANCZOS)
+
+    png = save_image(image, 'PNG', optimize=True)
+    if transparent:
+        return png, 'PNG'
+
+    jpeg = save_image(image.convert('RGB'), 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+    return (jpeg, 'JPEG') if len(jpeg) < len(png) else (png, 'PNG')
+
+def encode_animation(image):
+    """
+        (bytes, formato) de um GIF animado com um a cada GIF_FRAME_STEP quadros
+    """
+    frames, durations = [], []
+    for i, frame in enumerate(ImageSequence.Iterator(image)):
+        duration = frame.info.get('duration', 100)
+        if i % GIF_FRAME_STEP == 0:
+            frames.append(frame.convert('RGB'))
+            durations.append(duration)
+        else:
+            durations[-1] += duration
+
+    data = save_image(frames[0], 'GIF', save_all=True, append_images=frames[1:], duration=durations,
+                      loop=image.info.get('loop', 0), optimize=True)
+
+    return data, 'GIF'
+
+def encode_asset(path):
+    """
+        Codifica a imagem path; fica com o arquivo original quando a versão codificada não é menor
+    """
+    with open(path, 'rb') as file:
+        source = file.read()
+
+    image = Image.open(io.BytesIO(source))
+    if image.format == 'GIF':
+        data, image_format = encode_animation(image) if getattr(image, 'n_frames', 1) > 1 else (source, 'GIF')
+    else:
+        data, image_format = encode_still(image)
+
+    if image.format in ('JPEG', 'PNG', 'GIF') and len(data) >= len(source):
+        data, image_format = source, image.format
+
+    return EncodedAsset(data, image_format, len(source))
+
+def load_asset(name):
+    """
+        Imagem codificada do asset name, do cache do processo (None se o arquivo não existe)
+    """
+    path = ASSETS[name]
+    if not os.path.isfile(path):
+        return None
+
+    stat = os.stat(path)
+
+    return IMAGES.get((path, stat.st_mtime_ns, stat.st_size), lambda: encode_asset(path))
+
+def show_image(name, container=st, **kwargs):
+    """
+        Exibe o asset name no container (st, st.sidebar, coluna...), ou um aviso quando a imagem não existe
+    """
+    asset = load_asset(name)
+    if asset is None:
+        container.caption('Imagem indisponível: {}'.format(ASSETS[name]))
+        return
+
+    # GIF não é um output_format do st.image: com 'auto' o Streamlit reconhece o GIF e mantém a animação
+    container.image(asset.data, output_format='auto' if asset.format == 'GIF' else asset.format, **kwargs)
+
+# bytes das imagens codificadas, compartilhados pelas sessões do processo
+IMAGES = BudgetCache('imagens', budget_bytes(ASSET_CACHE_ENV, ASSET_CACHE_MB))
+
+def main():
+    for name, path in ASSETS.items():
+        asset = load_asset(name)
+        if asset is None:
+            print('{:<20} ausente ({})'.format(name, path))
+            continue
+
+        print('{:<20} {:>8} -> {:>8} bytes ({}, {:.0%})'.format(
+            name, asset.source_nbytes, len(asset.data), asset.format, len(asset.data) / asset.source_nbytes))
+
+
+if __name__ == '__main__':
+    main()
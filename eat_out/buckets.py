@@ -0,0 +1,141 @@
+"""Discretização de colunas numéricas em códigos de faixa.
+
+    Dada uma lista ordenada de limites (edges), cada valor recebe um código inteiro:
+        2k      -> valor igual a edges[k]
+        2k + 1  -> valor entre edges[k] e edges[k + 1] (exclusivo)
+        -1      -> valor abaixo de edges[0]
+
+    Com limites pontuais e intervalos separados, o filtro between(edges[a], edges[b]) equivale exatamente aos
+    códigos de 2a até 2b. Com outros limites, low e high caem em faixas ímpares (entre dois limites): só as linhas
+    dessas faixas das pontas precisam ser comparadas com os valores originais.
+
+    Os limites de nota e preço do dataset (bucket_edges) são os mesmos no índice de filtros, no cubo e na pirâmide
+    do mapa:
+        - nota: de RATING_STEP em RATING_STEP;
+        - preço: PRICE_BUCKETS quantis dos preços válidos, com PRICE_DECIMALS casas.
+    O primeiro e o último limite são arredondados para fora, então todos os valores ficam entre eles. As opções dos
+    sliders não dependem destes limites (ver eat_out.filters).
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+# largura das faixas de nota (as notas vão de 0 a 5, de 0.1 em 0.1)
+RATING_STEP = 0.5
+
+# quantidade de faixas de preço (quantis) e casas decimais dos limites de preço
+PRICE_BUCKETS = 20
+PRICE_DECIMALS = 2
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def round_down(value, decimals=None):
+    """
+        Maior valor com decimals casas que não passa de value (o próprio valor quando decimals é None)
+    """
+    if decimals is None:
+        return float(value)
+
+    rounded = round(float(value), decimals)
+
+    return rounded if rounded <= value else round(rounded - 10 ** -decimals, decimals)
+
+def round_up(value, decimals=None):
+    """
+        Menor valor com decimals casas que não fica abaixo de value (o próprio valor quando decimals é None)
+    """
+    if decimals is None:
+        return float(value)
+
+    rounded = round(float(value), decimals)
+
+    return rounded if rounded >= value else round(rounded + 10 ** -decimals, decimals)
+
+def finite_values(values, valid=None):
+    """
+        Valores da coluna como float, sem NaN e, opcionalmente, só nas linhas de valid
+    """
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    if valid is not None:
+        keep &= np.asarray(valid, dtype=bool)
+
+    return values[keep]
+
+def step_edges(values, step):
+    """
+        Limites de step em step que cobrem todos os valores
+    """
+    values = finite_values(values)
+    if not len(values):
+        return np.empty(0)
+
+    first = np.floor(values.min() / step)
+    last = np.ceil(values.max() / step)
+
+    return np.arange(first, last + 1) * step
+
+def quantile_edges(values, n_buckets, decimals, valid=None):
+    """
+        Limites nos quantis dos valores de valid (todos quando None), com decimals casas. Os extremos dos valores
+        válidos e de todos os valores também são limites, arredondados para fora: os valores inválidos ficam em
+        faixas próprias, fora das faixas dos válidos.
+    """
+    selected = finite_values(values, valid)
+    values = finite_values(values)
+    if not len(values):
+        return np.empty(0)
+    if not len(selected):
+        selected = values
+
+    quantiles = np.round(np.quantile(selected, np.linspace(0, 1, n_buckets + 1)[1:-1]), decimals)
+    extremes = [round_down(selected.min(), decimals), round_up(selected.max(), decimals),
+                round_down(values.min(), decimals), round_up(values.max(), decimals)]
+
+    return np.unique(np.concatenate([quantiles, extremes]))
+
+def bucket_edges(df):
+    """
+        Limites das faixas de nota e de preço do dataset (preços válidos: price_outlier falso)
+    """
+    return {
+        'aggregate_rating': step_edges(df['aggregate_rating'], RATING_STEP),
+        'price_brl': quantile_edges(df['price_brl'], PRICE_BUCKETS, PRICE_DECIMALS, ~df['price_outlier'].to_numpy(dtype=bool)),
+    }
+
+def bucketize(values, edges):
+    """
+        Converte os valores nos códigos de faixa definidos pelos limites (ver docstring do módulo)
+    """
+    values = np.asarray(values, dtype=float)
+    idx = np.searchsorted(edges, values, side='left')
+    exact = (idx < len(edges)) & (edges[np.minimum(idx, len(edges) - 1)] == values)
+
+    return (2 * idx - (~exact)).astype(np.int32)
+
+def code_range(low, high, edges):
+    """
+        Intervalo de códigos [primeiro, último] que cobre o filtro between(low, high).
+        O intervalo é exato quando low e high são limites; caso contrário inclui inteiras as faixas das pontas.
+    """
+    first, last = bucketize([low, high], edges)
+
+    return int(first), int(last)
+
+def edge_code(value, edges):
+    """
+        Código do limite value; comparações (>, <) contra um limite são exatas nos códigos, contra outro valor não
+    """
+    code = int(bucketize([value], edges)[0])
+    if code % 2:
+        raise ValueError('{} não é um limite das faixas ({})'.format(value, ', '.join(str(edge) for edge in edges)))
+
+    return code
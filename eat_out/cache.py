@@ -0,0 +1,113 @@
+"""Cache LRU limitado pelo total de bytes, compartilhado entre as sessões do processo.
+
+    Usado pelos caches de objetos prontos para exibição (gráficos em eat_out.figures, HTML dos mapas em
+    eat_out.maps). Diferente do st.experimental_singleton, que limita a quantidade de entradas, aqui o limite é a
+    memória: uma entrada pode ter alguns KB (um gráfico) ou vários MB (um mapa com todos os restaurantes).
+    O tamanho de cada entrada é calculado uma vez, quando ela entra no cache.
+
+    Cada cache é registrado pelo nome em CACHES; cache_stats() reúne os contadores de todos para o painel
+    "Desempenho" (eat_out.profiling).
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import threading
+
+from collections import OrderedDict
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+
+# caches criados no processo, pelo nome
+CACHES = {}
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class BudgetCache:
+    """
+        Cache LRU com orçamento em bytes e contadores de acertos, faltas e remoções.
+        size(valor) dá o tamanho em bytes de cada valor guardado.
+    """
+
+    def __init__(self, name, budget_bytes, size=len):
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self.size = size
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key, build):
+        """
+            Valor da chave key; na falta, monta com build() e guarda
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        # a montagem fica fora do lock: duas sessões com a mesma falta montam o valor cada uma, sem esperar uma à outra
+        value = build()
+        self.put(key, value, self.size(value))
+
+        return value
+
+    def put(self, key, value, nbytes):
+        """
+            Guarda value e remove as entradas usadas há mais tempo até caber no orçamento.
+            Um valor maior que o orçamento inteiro não é guardado.
+        """
+        if nbytes > self.budget_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+
+            self.entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.budget_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """
+            Contadores e ocupação do cache
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.nbytes, 'budget_bytes': self.budget_bytes}
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def budget_bytes(env, default_mb):
+    """
+        Orçamento em bytes, da variável de ambiente env (em MB) ou de default_mb
+    """
+    return int(float(os.environ.get(env, default_mb)) * 1024 ** 2)
+
+def cache_stats():
+    """
+        Contadores de todos os caches do processo, pelo nome
+    """
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -0,0 +1,355 @@
+"""Cubo de agregação que atende os gráficos das páginas.
+
+    Dimensões: país x moeda x cidade x culinária x faixa de nota x faixa de preço x preço inválido (price_outlier). A
+    moeda é a do país e não cria células; ela permite converter o valor original de cada célula. As faixas
+    são as de eat_out.buckets: com elas a quantidade de células depende das combinações de país, cidade e culinária,
+    e não da quantidade de restaurantes. Um filtro cujos limites são limites das faixas (nota > 4, nota < 2.5)
+    seleciona células inteiras. Com outros limites (as opções dos sliders) as faixas das pontas são refinadas: o cubo
+    guarda a célula e os valores de cada restaurante, e os restaurantes das faixas das pontas que ficam fora do
+    filtro são descontados das suas células. O filtro é exato com qualquer limite.
+
+    Medidas aditivas por célula: count, restaurants, price_sum, cost_sum (valor original, na moeda da célula),
+    rating_sum, votes_sum e online_delivery.
+    A contagem de restaurantes distintos só é aditiva se cada restaurant_id aparece em uma única célula; quando isso
+    não acontece o cubo guarda também um sketch HyperLogLog por célula e usa o sketch nas contagens de restaurantes.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import pandas         as pd
+import streamlit      as st
+
+from eat_out.data           import dataset_version, load_clean_restaurants
+from eat_out.buckets        import bucket_edges, bucketize, code_range, edge_code
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+CUBE_DIMENSIONS = ['country', 'currency', 'city', 'cuisines', 'rating_bucket', 'price_bucket', 'price_outlier']
+
+CUBE_COLUMNS = ['country', 'currency', 'city', 'cuisines', 'aggregate_rating', 'price_brl', 'average_cost_for_two',
+                'price_outlier', 'restaurant_id', 'votes', 'has_online_delivery']
+
+# dimensão de faixa de cada coluna numérica
+BUCKET_DIMENSIONS = {
+'aggregate_rating': 'rating_bucket',
+'price_brl': 'price_bucket',
+}
+
+# coluna do dataset somada em cada medida aditiva (None: uma unidade por restaurante)
+ROW_MEASURES = {
+'count': None,
+'restaurants': None,
+'price_sum': 'price_brl',
+'cost_sum': 'average_cost_for_two',
+'rating_sum': 'aggregate_rating',
+'votes_sum': 'votes',
+'online_delivery': 'has_online_delivery',
+}
+
+# medidas que podem ser pedidas a CubeSelection.mean, com a soma correspondente
+MEAN_MEASURES = {
+'price_brl': 'price_sum',
+'aggregate_rating': 'rating_sum',
+'votes': 'votes_sum',
+}
+
+# precisão do HyperLogLog: 2^HLL_PRECISION registradores por célula (erro padrão ~ 1.04 / sqrt(2^p) = 3%)
+HLL_PRECISION = 10
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class RestaurantCube:
+    """
+        Células do cubo (uma linha por combinação observada das dimensões) com as medidas aditivas, e a célula, os
+        códigos de faixa e os valores de cada restaurante para refinar as faixas das pontas.
+        Construído uma vez por versão do dataset; as páginas consultam com select().
+    """
+
+    def __init__(self, df):
+        self.edges = bucket_edges(df)
+        df = df.loc[:, CUBE_COLUMNS].assign(**{
+            dimension: bucketize(df[column], self.edges[column]).astype(np.int16) for column, dimension in BUCKET_DIMENSIONS.items()
+        })
+        grouped = df.groupby(CUBE_DIMENSIONS, observed=True, sort=False)
+
+        # por restaurante: célula, códigos de faixa e valores (views das colunas do dataframe)
+        self.row_cells = grouped.ngroup().to_numpy(dtype=np.int32)
+        self.row_codes = {column: df[dimension].to_numpy() for column, dimension in BUCKET_DIMENSIONS.items()}
+        self.row_values = {column: df[column].to_numpy(dtype=float) for column in
+                           set(BUCKET_DIMENSIONS) | {column for column in ROW_MEASURES.values() if column}}
+        self.row_ids = df['restaurant_id'].to_numpy()
+
+        cells = grouped.agg(
+            count=('restaurant_id', 'size'),
+            restaurants=('restaurant_id', 'nunique'),
+            price_sum=('price_brl', 'sum'),
+            cost_sum=('average_cost_for_two', 'sum'),
+            rating_sum=('aggregate_rating', 'sum'),
+            votes_sum=('votes', 'sum'),
+            online_delivery=('has_online_delivery', 'sum'),
+        )
+        cells = cells.reset_index()
+
+        # o agrupamento sem ordenação cria as categorias na ordem de aparição; volta para a ordem do dataframe
+        for col in CUBE_DIMENSIONS:
+            if pd.api.types.is_categorical_dtype(df[col]):
+                cells[col] = cells[col].cat.set_categories(df[col].cat.categories)
+        self.cells = cells
+
+        # com restaurant_id único, a soma de 'restaurants' entre células já é a contagem distinta
+        self.sketches = None
+        if df['restaurant_id'].duplicated().any():
+            self.sketches = hll_registers(grouped.ngroup().to_numpy(), df['restaurant_id'].to_numpy(), len(self.cells))
+
+    def select(self, countries=None, rating_range=None, price_range=None):
+        """
+            Células que atendem aos filtros da barra lateral, com a mesma semântica de isin e between das páginas.
+            Quando os limites de nota e preço não são limites das faixas, os restaurantes das faixas das pontas que
+            ficam fora do filtro são descontados das células.
+        """
+        cells = self.cells
+        rows_selected = np.ones(len(cells), dtype=bool)
+
+        if countries is not None:
+            rows_selected &= cells['country'].isin(countries).to_numpy()
+
+        ranges = {}
+        for column, value_range in (('aggregate_rating', rating_range), ('price_brl', price_range)):
+            if value_range is not None:
+                ranges[column] = value_range
+                first, last = code_range(value_range[0], value_range[1], self.edges[column])
+                rows_selected &= cells[BUCKET_DIMENSIONS[column]].between(first, last).to_numpy()
+
+        selection = CubeSelection(self, np.flatnonzero(rows_selected))
+        excluded = self.excluded_rows(ranges, rows_selected)
+        if not len(excluded):
+            return selection
+
+        return selection.without_rows(excluded)
+
+    def excluded_rows(self, ranges, rows_selected):
+        """
+            Restaurantes das células selecionadas que estão em uma faixa de ponta (código ímpar de code_range: o
+            limite fica dentro da faixa) e fora do filtro
+        """
+        outside = [np.empty(0, dtype=np.int64)]
+        for column, (low, high) in ranges.items():
+            values, codes = self.row_values[column], self.row_codes[column]
+            first, last = code_range(low, high, self.edges[column])
+            if first % 2:
+                rows = np.flatnonzero(codes == first)
+                outside.append(rows[values[rows] < low])
+            if last % 2:
+                rows = np.flatnonzero(codes == last)
+                outside.append(rows[values[rows] > high])
+
+        outside = np.unique(np.concatenate(outside))
+
+        return outside[rows_selected[self.row_cells[outside]]]
+
+class CubeSelection:
+    """
+        Conjunto de células selecionadas. Os métodos reproduzem os agrupamentos das páginas
+        (groupby(...).nunique(), .mean(), .count()) somando as medidas das células.
+    """
+
+    def __init__(self, cube, positions, cells=None, sketches=None):
+        self.cube = cube
+        self.positions = positions
+        self.cells = cube.cells.iloc[positions] if cells is None else cells
+
+        # registradores HyperLogLog das células refinadas (None: os do cubo)
+        self.sketches = sketches
+
+    def where(self, rows_selected):
+        """
+            Restringe a seleção com uma máscara booleana sobre self.cells (por exemplo, cells['online_delivery'] > 0)
+        """
+        rows_selected = np.asarray(rows_selected, dtype=bool)
+        sketches = None if self.sketches is None else self.sketches[rows_selected]
+
+        return CubeSelection(self.cube, self.positions[rows_selected], self.cells[rows_selected], sketches)
+
+    def without_rows(self, rows):
+        """
+            Seleção com os restaurantes rows (posições nas linhas do cubo) descontados das suas células; as células
+            que ficam vazias saem da seleção
+        """
+        cube = self.cube
+        n_cells = len(cube.cells)
+        cells = self.cells.copy()
+        for measure, column in ROW_MEASURES.items():
+            weights = None if column is None else cube.row_values[column][rows]
+            removed = np.bincount(cube.row_cells[rows], weights=weights, minlength=n_cells)[self.positions]
+            cells[measure] = cells[measure] - removed.astype(cells[measure].dtype)
+
+        sketches = None
+        if cube.sketches is not None:
+            # com restaurant_id repetido, os registradores das células afetadas são refeitos com os restaurantes que ficam
+            sketches = cube.sketches[self.positions]
+            affected = np.flatnonzero(np.isin(self.positions, cube.row_cells[rows]))
+            kept = np.isin(cube.row_cells, self.positions[affected])
+            kept[rows] = False
+            kept = np.flatnonzero(kept)
+            local = np.searchsorted(self.positions[affected], cube.row_cells[kept])
+            sketches[affected] = hll_registers(local, cube.row_ids[kept], len(affected))
+
+        present = cells['count'].to_numpy() > 0
+
+        return CubeSelection(cube, self.positions[present], cells[present], None if sketches is None else sketches[present])
+
+    def above(self, column, value):
+        """
+            Restringe a seleção aos restaurantes com column > value; value deve ser um limite das faixas da coluna
+        """
+        code = edge_code(value, self.cube.edges[column])
+
+        return self.where(self.cells[BUCKET_DIMENSIONS[column]].to_numpy() > code)
+
+    def below(self, column, value):
+        """
+            Restringe a seleção aos restaurantes com column < value; value deve ser um limite das faixas da coluna
+        """
+        code = edge_code(value, self.cube.edges[column])
+
+        return self.where(self.cells[BUCKET_DIMENSIONS[column]].to_numpy() < code)
+
+    def nunique(self, by, column):
+        """
+            Equivalente a df[[column, by]].groupby(by).nunique(): valores distintos de uma dimensão ou restaurantes
+            distintos (column='restaurant_id') por grupo
+        """
+        if column == 'restaurant_id':
+            return self.restaurants(by)
+
+        # pares (grupo, valor) distintos, contados por grupo sobre os códigos
+        codes, groups = pd.factorize(self.cells[by], sort=True)
+        values, uniques = pd.factorize(self.cells[column])
+        pairs = np.unique(codes.astype(np.int64) * max(len(uniques), 1) + values)
+        counts = np.bincount(pairs // max(len(uniques), 1), minlength=len(groups))
+
+        return pd.DataFrame({column: counts}, index=pd.Index(groups, name=by))
+
+    def restaurants(self, by):
+        """
+            Restaurantes distintos por grupo, com a coluna chamada 'restaurant_id' como nas páginas
+        """
+        if self.cube.sketches is None:
+            result = self.cells.groupby(by, observed=True, sort=True)['restaurants'].sum()
+            return result.to_frame('restaurant_id')
+
+        codes, groups = pd.factorize(self.cells[by], sort=True)
+        registers = np.zeros((len(groups), self.cube.sketches.shape[1]), dtype=np.uint8)
+        np.maximum.at(registers, codes, self.registers())
+        estimates = np.round(hll_estimate(registers)).astype(np.int64)
+
+        return pd.DataFrame({'restaurant_id': estimates}, index=pd.Index(groups, name=by))
+
+    def mean(self, by, column):
+        """
+            Equivalente a df[[by, column]].groupby(by).mean() para as medidas de MEAN_MEASURES
+        """
+        sums = self.cells.groupby(by, observed=True, sort=True)[[MEAN_MEASURES[column], 'count']].sum()
+
+        return (sums[MEAN_MEASURES[column]] / sums['count']).to_frame(column)
+
+    def cost_mean(self, by, rates, target):
+        """
+            Valor médio para 2 pessoas por grupo na moeda target (coluna average_cost_for_two): o valor original de
+            cada célula, na moeda do país, é convertido com a tabela de cotações rates (RateTable.convert), a mesma
+            usada nos valores de cada restaurante
+        """
+        converted = rates.convert(self.cells['cost_sum'], self.cells['currency'], target)
+        sums = self.cells[np.atleast_1d(by).tolist() + ['count']].assign(average_cost_for_two=converted)
+        sums = sums.groupby(by, observed=True, sort=True)[['average_cost_for_two', 'count']].sum()
+
+        return (sums['average_cost_for_two'] / sums['count']).to_frame('average_cost_for_two')
+
+    def sum(self, by, column):
+        """
+            Soma de uma medida por grupo
+        """
+        return self.cells.groupby(by, observed=True, sort=True)[[column]].sum()
+
+    def total(self, column):
+        """
+            Total de uma medida na seleção; column='restaurant_id' devolve os restaurantes distintos
+        """
+        if column == 'restaurant_id':
+            if self.cube.sketches is None:
+                return int(self.cells['restaurants'].sum())
+            registers = self.registers().max(axis=0, initial=0)
+            return int(round(hll_estimate(registers[np.newaxis, :])[0]))
+
+        if column in CUBE_DIMENSIONS:
+            return self.cells[column].nunique()
+
+        return self.cells[column].sum()
+
+    def registers(self):
+        """
+            Registradores HyperLogLog das células selecionadas
+        """
+        return self.cube.sketches[self.positions] if self.sketches is None else self.sketches
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def hash64(values):
+    """
+        Hash splitmix64 vetorizado para identificadores inteiros
+    """
+    with np.errstate(over='ignore'):
+        z = np.asarray(values).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return z ^ (z >> np.uint64(31))
+
+def hll_registers(cell_codes, ids, n_cells, precision=HLL_PRECISION):
+    """
+        Registradores HyperLogLog (um vetor de 2^precision bytes por célula) dos restaurant_id de cada célula
+    """
+    hashes = hash64(ids)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+
+    # posição do primeiro bit 1 nos bits restantes (com um bit de guarda para não passar do limite)
+    rest = (hashes << np.uint64(precision)) | np.uint64(1 << (precision - 1))
+    rank = (64 - np.floor(np.log2(rest.astype(np.float64)))).astype(np.uint8)
+
+    registers = np.zeros((n_cells, 2 ** precision), dtype=np.uint8)
+    np.maximum.at(registers, (cell_codes, index), rank)
+
+    return registers
+
+def hll_estimate(registers):
+    """
+        Estimativa de cardinalidade para cada linha de registradores, com a correção para conjuntos pequenos
+    """
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)), axis=1)
+    zeros = np.sum(registers == 0, axis=1)
+
+    with np.errstate(divide='ignore'):
+        small = m * np.log(m / np.maximum(zeros, 1))
+
+    return np.where((raw <= 2.5 * m) & (zeros > 0), small, raw)
+
+@st.experimental_singleton(show_spinner=False, max_entries=2)
+def _cached_restaurant_cube(version):
+    # o argumento version só participa da chave do cache
+    return RestaurantCube(load_clean_restaurants(columns=CUBE_COLUMNS))
+
+def load_restaurant_cube():
+    """
+        Cubo da versão atual do dataset, compartilhado entre todas as sessões
+    """
+    return _cached_restaurant_cube(dataset_version())
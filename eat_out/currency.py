@@ -0,0 +1,203 @@
+"""Conversão de moedas com as cotações da API Exchange Rates.
+
+    Cada arquivo de cotações (formato da exchangerate-api.com: base_code, time_last_update_unix e conversion_rates)
+    vira uma RateTable: as siglas ordenadas em um array e as cotações em um array float64 na mesma ordem. Converter
+    uma coluna inteira é um único gather nesses arrays, feito sobre as categorias da coluna de moeda.
+
+    O FileRateProvider junta o arquivo principal (CURRENCY_PATH) e os arquivos datados de RATES_DIR, permitindo
+    mostrar os preços com a cotação de uma data ("as of"). A moeda de destino é escolhida na conversão, sem limpar
+    o dataset de novo: o valor original (average_cost_for_two) e a moeda de cada restaurante continuam no dataframe.
+    Os valores convertidos sempre partem do valor original, com uma única tabela por página; price_brl, calculado
+    na limpeza com as cotações de CURRENCY_PATH, só aparece em R$ (BRL_NOTE).
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import json
+import glob
+import datetime
+
+import numpy          as np
+import pandas         as pd
+import streamlit      as st
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+CURRENCY_PATH = 'data/dict_currency,json'
+
+# snapshots adicionais de cotação, um arquivo JSON por data
+RATES_DIR = 'data/rates'
+
+DEFAULT_TARGET = 'BRL'
+
+# aviso das páginas que mostram price_brl (calculado na limpeza com as cotações de CURRENCY_PATH)
+BRL_NOTE = 'Valores em R$, com as cotações do arquivo principal; não mudam com a moeda escolhida em Cidades e Culinárias.'
+
+# moedas oferecidas como destino nas páginas, com o prefixo usado na exibição
+TARGET_CURRENCIES = {
+'BRL': 'R$',
+'USD': 'US$',
+'EUR': '€',
+'GBP': '£',
+'INR': 'Rs.',
+}
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class RateTable:
+    """
+        Cotações de uma data: quantas unidades de cada moeda valem uma unidade da moeda base
+    """
+
+    def __init__(self, base, date, codes, rates):
+        order = np.argsort(codes)
+        self.base = base
+        self.date = date
+        self.codes = np.asarray(codes, dtype=object)[order]
+        self.rates = np.asarray(rates, dtype=float)[order]
+
+    def lookup(self, codes):
+        """
+            Cotação de cada sigla; siglas desconhecidas recebem NaN
+        """
+        codes = np.asarray(codes, dtype=object)
+        positions = np.minimum(np.searchsorted(self.codes, codes), len(self.codes) - 1)
+        found = self.codes[positions] == codes
+
+        return np.where(found, self.rates[positions], np.nan)
+
+    def factors(self, codes, target=DEFAULT_TARGET):
+        """
+            Fator que converte um valor em cada moeda de codes para a moeda target
+        """
+        return self.lookup([target])[0] / self.lookup(codes)
+
+    def convert(self, amounts, codes, target=DEFAULT_TARGET):
+        """
+            Converte os valores (cada um na moeda correspondente de codes) para a moeda target.
+            Com uma coluna category em codes, as cotações são buscadas só para as categorias e distribuídas pelos códigos.
+        """
+        if isinstance(codes, pd.Series) and pd.api.types.is_categorical_dtype(codes):
+            factors = self.factors(codes.cat.categories, target)
+            gathered = np.append(factors, np.nan)[codes.cat.codes.to_numpy()]
+        else:
+            unique_codes, inverse = np.unique(np.asarray(codes, dtype=object), return_inverse=True)
+            gathered = self.factors(unique_codes, target)[inverse]
+
+        return np.asarray(amounts, dtype=float) * gathered
+
+    def series(self):
+        """
+            Cotações como Series indexada pela sigla, no formato usado por clean_dataframe
+        """
+        return pd.Series(self.rates, index=self.codes, name='conversion_rates')
+
+class FileRateProvider:
+    """
+        Tabelas de cotação lidas de arquivos locais, ordenadas por data
+    """
+
+    def __init__(self, paths):
+        self.tables = sorted((read_rate_table(path) for path in paths), key=lambda table: table.date)
+
+    def dates(self):
+        """
+            Datas disponíveis, da mais antiga para a mais recente
+        """
+        return [table.date for table in self.tables]
+
+    def table(self, as_of=None):
+        """
+            Tabela mais recente com data até as_of (a mais recente de todas quando as_of é None;
+            a mais antiga quando as_of é anterior a todas)
+        """
+        if as_of is None:
+            return self.tables[-1]
+
+        position = np.searchsorted(np.array(self.dates(), dtype='datetime64[D]'), np.datetime64(as_of, 'D'), side='right')
+
+        return self.tables[max(position - 1, 0)]
+
+    def convert(self, amounts, codes, target=DEFAULT_TARGET, as_of=None):
+        """
+            Converte os valores para a moeda target com a cotação da data as_of
+        """
+        return self.table(as_of).convert(amounts, codes, target)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def read_rate_table(path):
+    """
+        Lê um arquivo de cotações da API Exchange Rates
+    """
+    with open(path, encoding='utf-8') as file:
+        content = json.load(file)
+
+    date = datetime.datetime.fromtimestamp(content['time_last_update_unix'], datetime.timezone.utc).date()
+    rates = content['conversion_rates']
+
+    return RateTable(content['base_code'], date, list(rates.keys()), list(rates.values()))
+
+def rate_paths(currency_path=CURRENCY_PATH, rates_dir=RATES_DIR):
+    """
+        Arquivo principal de cotações seguido dos snapshots datados de rates_dir
+    """
+    return [currency_path] + sorted(glob.glob(os.path.join(rates_dir, '*.json')))
+
+def rates_version(paths):
+    """
+        Versão do conjunto de arquivos de cotação (caminho, data de modificação e tamanho de cada um)
+    """
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append('{}:{}:{}'.format(os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+
+    return '|'.join(parts)
+
+def currency_label(value, target=DEFAULT_TARGET):
+    """
+        Valor formatado com o prefixo da moeda, como nos cartões das páginas
+    """
+    return '{}{}'.format(TARGET_CURRENCIES.get(target, target + ' '), round(value, 2))
+
+def price_column(target=DEFAULT_TARGET):
+    """
+        Nome da coluna de valores na moeda target (price_brl para o real, como no dataset)
+    """
+    return 'price_' + target.lower()
+
+def currency_select(rate_provider):
+    """
+        Seletor da moeda dos valores e da data da cotação na barra lateral, compartilhado pelas páginas.
+        Devolve (moeda, data); a data é None quando só há um arquivo de cotações.
+    """
+    st.sidebar.subheader('Selecione a Moeda')
+    target = st.sidebar.selectbox('Moeda', list(TARGET_CURRENCIES))
+
+    # com mais de um arquivo de cotações é possível ver os valores com a cotação de uma data
+    dates = rate_provider.dates()
+    as_of = st.sidebar.select_slider('Cotação de', options=dates, value=dates[-1]) if len(dates) > 1 else None
+
+    return target, as_of
+
+@st.experimental_singleton(show_spinner=False, max_entries=2)
+def _cached_rate_provider(paths, version):
+    # o argumento version só participa da chave do cache
+    return FileRateProvider(paths)
+
+def load_rate_provider(currency_path=CURRENCY_PATH, rates_dir=RATES_DIR):
+    """
+        Cotações de todos os arquivos locais, lidas uma vez por versão dos arquivos e compartilhadas entre as sessões
+    """
+    paths = tuple(rate_paths(currency_path, rates_dir))
+
+    return _cached_rate_provider(paths, rates_version(paths))
@@ -0,0 +1,294 @@
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import inflection
+
+from functools import lru_cache
+
+import numpy          as np
+import pandas         as pd
+import streamlit      as st
+
+from eat_out.schema         import apply_schema
+from eat_out.outliers       import flag_price_outliers
+from eat_out.dedup          import deduplicate
+from eat_out.currency       import CURRENCY_PATH, read_rate_table
+from eat_out.snapshot       import snapshot_path, snapshot_is_stale, write_snapshot, read_snapshot
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+CSV_PATH = 'data/zomato.csv'
+
+# incrementar sempre que a saída de clean_dataframe mudar, invalidando caches e snapshots antigos
+CLEANING_VERSION = 3
+
+# a partir deste tamanho de CSV o snapshot é gerado em streaming, pedaço a pedaço (eat_out.ingest)
+STREAMING_MIN_BYTES = 256 * 1024 ** 2
+
+COUNTRIES = {
+1: "India",
+14: "Australia",
+30: "Brazil",
+37: "Canada",
+94: "Indonesia",
+148: "New Zeland",
+162: "Philippines",
+166: "Qatar",
+184: "Singapure",
+189: "South Africa",
+191: "Sri Lanka",
+208: "Turkey",
+214: "United Arab Emirates",
+215: "England",
+216: "United States of America",
+}
+
+RATING_COLORS = {
+"3F7E00": "darkgreen",
+"5BA829": "green",
+"9ACD32": "lightgreen",
+"CDD614": "orange",
+"FFBA00": "red",
+"CBCBC8": "darkred",
+"FF7800": "darkred",
+}
+
+PRICE_TYPES = {
+1: "cheap",
+2: "normal",
+3: "expensive",
+}
+
+CURRENCIES = {
+'Botswana Pula(P)': 'BWP',
+'Brazilian Real(R$)': 'BRL',
+'Dollar($)': 'USD',
+'Emirati Diram(AED)': 'AED',
+'Indian Rupees(Rs.)': 'INR',
+'Indonesian Rupiah(IDR)': 'IDR',
+'NewZealand($)': 'NZD',
+'Pounds(£)': 'GBP',
+'Qatari Rial(QR)': 'QAR',
+'Rand(R)': 'ZAR',
+'Sri Lankan Rupee(LKR)': 'LKR',
+}
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def clean_dataframe(df, exchange_rate):
+    """Esta função realiza a limpeza do dataframe a ser analisado
+
+        Ações Executadas:
+        1. Renomear as colunas
+        2. Remover dados NaN
+        3. Remover dados duplicados (pela chave restaurant_id e pelo hash do conteúdo, ver eat_out.dedup)
+        4. Nomear as variáveis da coluna 'rating_color'
+        5. Classificar os valores na coluna 'cuisines'
+        6. Selecionar apenas 1 valor da coluna 'cuisines'
+        7. Renomear os dados da coluna 'currency'
+        8. Criar as colunas 'country', 'exchange_rate' e 'price_brl'
+        9. Marcar os preços inválidos na coluna 'price_outlier'
+    """
+
+    # renomeando as colunas
+    df = rename_columns(df)
+
+    # removendo dados NaN
+    df = drop_missing(df)
+
+    # removendo dados duplicados: só as linhas com restaurant_id repetido têm o conteúdo comparado
+    df, _ = deduplicate(df)
+
+    # colunas derivadas, linha a linha
+    df = derive_columns(df, exchange_rate)
+
+    # marcando os preços zerados ou muito fora do padrão da moeda, para as páginas desconsiderarem
+    df['price_outlier'] = flag_price_outliers(df['average_cost_for_two'], df['currency'])
+
+    return df
+
+def derive_columns(df, exchange_rate):
+    """
+        Passos 4 a 8 de clean_dataframe. Cada linha depende só dela mesma, então a função também é aplicada
+        pedaço a pedaço na leitura em streaming (eat_out.ingest).
+    """
+
+    # renomenado as cores
+    df['rating_color'] = df['rating_color'].map(RATING_COLORS)
+
+    # classificando os pratos por valor
+    df['price_range'] = map_unique(df['price_range'], create_price_type)
+
+    # selecionando 1 tipo de culinária na coluna cuisines
+    df['cuisines'] = map_unique(df['cuisines'], lambda x: x.split(",")[0])
+
+    # renomeando as siglas das moedas
+    df['currency'] = map_unique(df['currency'], currency_type)
+
+    # transformando os valores da coluna average cost for two para float
+    df['average_cost_for_two'] = df['average_cost_for_two'].astype(float)
+
+    # criação da coluna country
+    df['country'] = map_unique(df['country_code'], country_name)
+
+    # criação da coluna utilizando as informações da API Exchange Rates no arquivo JSON
+    df['exchange_rate'] = df.loc[:, 'currency'].map(exchange_rate)
+
+    # utilizando os valores do prato pelo valores de cotação do dia
+    df['price_brl'] = df['average_cost_for_two'] / df['exchange_rate']
+
+    return df
+
+
+def rename_columns(dataframe):
+    """
+        Renomear as colunas do dataframe para snakecase substituindo os espaços entre as palavras para underscore
+    """
+
+    df = dataframe.copy(deep=False)
+    df.columns = list(snakecase_columns(tuple(df.columns)))
+
+    return df
+
+@lru_cache(maxsize=None)
+def snakecase_columns(columns):
+    """
+        Calcula uma única vez, para cada conjunto de colunas, os nomes em snakecase usados por rename_columns
+    """
+    title = lambda x: inflection.titleize(x)
+    snakecase = lambda x: inflection.underscore(x)
+    spaces = lambda x: x.replace(" ", "")
+    cols_old = list(columns)
+    cols_old = list(map(title, cols_old))
+    cols_old = list(map(spaces, cols_old))
+    cols_new = tuple(map(snakecase, cols_old))
+
+    return cols_new
+
+def drop_missing(df):
+    """
+        Equivalente ao df.dropna(), montando a máscara coluna a coluna em NumPy, o que evita a contagem por linha do pandas
+    """
+    rows_selected = np.logical_and.reduce([df[col].notna().to_numpy() for col in df.columns])
+
+    return df.take(np.flatnonzero(rows_selected))
+
+def map_unique(series, func):
+    """
+        Aplica a função apenas sobre os valores distintos da coluna e distribui o resultado pelos códigos do pd.factorize.
+        O custo em Python passa a depender da cardinalidade da coluna e não do número de linhas.
+    """
+    codes, uniques = pd.factorize(series)
+    values = np.empty(len(uniques), dtype=object)
+    values[:] = [func(x) for x in uniques]
+
+    return pd.Series(values[codes], index=series.index, name=series.name)
+
+def country_name(country_id):
+    """
+        Substitui os IDs dos países pelo seu nome conforme dicionário localizado na seção BIBLIOTECA COMPLEMENTAR DE DADOS
+    """
+    return COUNTRIES[country_id]
+
+def create_price_type(price_range):
+    """
+        Classifica a faixa de preço conforme o dicionário PRICE_TYPES; faixas desconhecidas são 'gourmet'
+    """
+    return PRICE_TYPES.get(price_range, "gourmet")
+
+def currency_type(currency):
+    """
+        Converte o nome da moeda para a sigla conforme o dicionário CURRENCIES; moedas desconhecidas são 'TRY'
+    """
+    return CURRENCIES.get(currency, 'TRY')
+
+def read_exchange_rate(currency_path=CURRENCY_PATH):
+    """
+        Carrega as cotações do arquivo JSON da API Exchange Rates, indexadas pela sigla da moeda
+    """
+    return read_rate_table(currency_path).series()
+
+def dataset_version(csv_path=CSV_PATH, currency_path=CURRENCY_PATH):
+    """
+        Identifica a versão dos dados de entrada a partir do caminho, da data de modificação e do tamanho de cada arquivo.
+        Qualquer alteração no CSV, no JSON de cotações ou em CLEANING_VERSION gera uma nova versão.
+    """
+    parts = ['v{}'.format(CLEANING_VERSION)]
+    for path in (csv_path, currency_path):
+        stat = os.stat(path)
+        parts.append('{}:{}:{}'.format(os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+
+    return '|'.join(parts)
+
+def build_clean_restaurants(csv_path=CSV_PATH, currency_path=CURRENCY_PATH, typed=True):
+    """
+        Lê o CSV e o JSON de cotações e devolve o dataframe limpo, sem passar pelo cache do Streamlit.
+        Com typed=True as colunas são convertidas para os tipos compactos de eat_out.schema.
+    """
+    df = pd.read_csv(csv_path)
+    exchange_rate = read_exchange_rate(currency_path)
+    df = clean_dataframe(df, exchange_rate)
+
+    if typed:
+        df = apply_schema(df)
+
+    return df
+
+def build_snapshot(csv_path=CSV_PATH, currency_path=CURRENCY_PATH, force=False):
+    """
+        Gera o snapshot colunar do dataframe limpo ao lado do CSV quando ele não existe ou quando o CSV
+        ou o JSON de cotações mudaram desde a última geração. Devolve o caminho e se o snapshot foi (re)gerado.
+        CSVs a partir de STREAMING_MIN_BYTES são limpos em streaming, sem carregar o arquivo inteiro na memória.
+    """
+    path = snapshot_path(csv_path)
+    version = dataset_version(csv_path, currency_path)
+
+    if not force and not snapshot_is_stale(path, version):
+        return path, False
+
+    if os.path.getsize(csv_path) >= STREAMING_MIN_BYTES:
+        # import local: eat_out.ingest importa este módulo
+        from eat_out.ingest import stream_snapshot
+        stream_snapshot(csv_path, currency_path, path, version)
+        return path, True
+
+    df = build_clean_restaurants(csv_path, currency_path)
+    write_snapshot(df, path, version)
+
+    return path, True
+
+@st.experimental_singleton(show_spinner=False, max_entries=8)
+def _cached_clean_restaurants(csv_path, currency_path, columns, countries, version):
+    # o argumento version só participa da chave do cache
+    path, _ = build_snapshot(csv_path, currency_path)
+
+    return read_snapshot(path, columns, countries)
+
+def load_clean_restaurants(columns=None, countries=None, csv_path=CSV_PATH, currency_path=CURRENCY_PATH):
+    """
+        Devolve o dataframe limpo, compartilhado entre todas as sessões do Streamlit.
+
+        Os dados vêm do snapshot colunar (ver build_snapshot), aberto por memory-map e restrito às colunas
+        informadas em columns (todas quando None), então o CSV só é lido e limpo quando ele ou o JSON de cotações mudam.
+        Com countries só as partições desses países são lidas (o equivalente a df[df['country'].isin(countries)]).
+        A chave do cache é formada pelos caminhos, pelas colunas, pelos países e pela versão dos arquivos (ver dataset_version).
+        O mesmo objeto é entregue a todas as sessões: filtre com .loc, nunca altere o dataframe in-place.
+    """
+    version = dataset_version(csv_path, currency_path)
+    if columns is not None:
+        columns = tuple(columns)
+    if countries is not None:
+        countries = tuple(sorted(set(countries)))
+
+    return _cached_clean_restaurants(csv_path, currency_path, columns, countries, version)
+
+def clear_restaurants_cache():
+    """
+        Invalida explicitamente o cache de load_clean_restaurants
+    """
+    _cached_clean_restaurants.clear()
@@ -0,0 +1,199 @@
+"""Remoção de linhas duplicadas pela chave restaurant_id e por um hash do conteúdo.
+
+    O drop_duplicates do pandas calcula o hash de todas as células de todas as linhas, incluindo os textos longos
+    (endereço, localidade). Aqui a chave inteira restaurant_id separa os candidatos primeiro: só as linhas cujo id
+    aparece mais de uma vez podem ser duplicadas, e só elas têm o conteúdo resumido em um hash de 64 bits.
+
+    Duas linhas são duplicadas quando têm o mesmo id e o mesmo hash de conteúdo; fica a primeira, como no
+    drop_duplicates(keep='first'). Linhas com o mesmo id e conteúdo diferente são mantidas e listadas como conflitos
+    no DedupReport.
+
+    Para dados que chegam aos poucos (lotes de eat_out.ingest ou um CSV acrescentado depois), o DedupIndex guarda o
+    id e o hash de cada linha mantida (16 bytes por linha) e compara cada lote novo com tudo o que já passou. Nesse
+    modo todas as linhas têm o conteúdo resumido, já que qualquer uma pode ser repetida por um lote futuro.
+
+    Relatório dos duplicados do CSV (a partir da raiz do repositório):
+        python -m eat_out.dedup [--csv]
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import argparse
+
+import numpy          as np
+import pandas         as pd
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+DEDUP_KEY = 'restaurant_id'
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class DedupReport:
+    """
+        Linhas lidas, linhas descartadas como duplicadas e ids em conflito (mesmo id, conteúdo diferente)
+    """
+
+    def __init__(self, rows_read=0, rows_dropped=0, conflict_ids=()):
+        self.rows_read = rows_read
+        self.rows_dropped = rows_dropped
+        self.conflict_ids = np.unique(np.asarray(conflict_ids, dtype=np.int64))
+
+    def add(self, other):
+        """
+            Soma o relatório de outro lote a este
+        """
+        self.rows_read += other.rows_read
+        self.rows_dropped += other.rows_dropped
+        self.conflict_ids = np.union1d(self.conflict_ids, other.conflict_ids)
+
+        return self
+
+    def conflicts(self, df, key=DEDUP_KEY):
+        """
+            Linhas de df com ids em conflito, ordenadas pelo id
+        """
+        return df[df[key].isin(self.conflict_ids)].sort_values(key, kind='mergesort')
+
+    def summary(self):
+        """
+            Resumo para exibição no terminal
+        """
+        return '\n'.join([
+            'linhas lidas:          {}'.format(self.rows_read),
+            'linhas duplicadas:     {}'.format(self.rows_dropped),
+            'ids em conflito:       {}'.format(len(self.conflict_ids)),
+        ])
+
+class SeenHashes:
+    """
+        Conjunto de hashes (ou ids) já vistos, em níveis de arrays ordenados (8 bytes por valor).
+        Cada lote entra como um nível novo e níveis de tamanho parecido são fundidos, então há O(log n) níveis
+        e cada valor é copiado O(log n) vezes ao longo da leitura.
+    """
+
+    def __init__(self):
+        self.levels = []
+
+    def contains(self, hashes):
+        """
+            Máscara dos hashes que já estão no conjunto
+        """
+        found = np.zeros(len(hashes), dtype=bool)
+        for level in self.levels:
+            positions = np.minimum(np.searchsorted(level, hashes), len(level) - 1)
+            found |= level[positions] == hashes
+
+        return found
+
+    def add(self, hashes):
+        """
+            Acrescenta hashes novos (sem repetição entre si nem com o conjunto)
+        """
+        self.levels.append(np.sort(hashes))
+        while len(self.levels) > 1 and len(self.levels[-2]) <= 2 * len(self.levels[-1]):
+            last = self.levels.pop()
+            self.levels[-1] = np.sort(np.concatenate([self.levels[-1], last]), kind='mergesort')
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels)
+
+class DedupIndex:
+    """
+        Deduplicação incremental: ids e hashes (id, conteúdo) das linhas mantidas nos lotes anteriores
+    """
+
+    def __init__(self, key=DEDUP_KEY):
+        self.key = key
+        self.keys = SeenHashes()
+        self.pairs = SeenHashes()
+        self.report = DedupReport()
+
+    def deduplicate(self, df):
+        """
+            Remove do lote as linhas repetidas dentro dele ou em relação aos lotes anteriores.
+            Devolve o lote sem duplicados e o relatório do lote; self.report acumula todos os lotes.
+        """
+        keys = df[self.key].to_numpy(dtype=np.int64)
+        pairs = pair_hashes(keys, content_hashes(df, self.key))
+        first = ~pd.Series(pairs).duplicated().to_numpy() & ~self.pairs.contains(pairs)
+
+        # conflito: um id novo no conjunto de pares que já tinha aparecido com outro conteúdo, aqui ou antes
+        new_keys = keys[first]
+        seen = self.keys.contains(new_keys)
+        conflicting = seen | pd.Series(new_keys).duplicated(keep=False).to_numpy()
+
+        self.pairs.add(pairs[first])
+        self.keys.add(np.unique(new_keys[~seen]))
+
+        report = DedupReport(len(df), len(df) - int(first.sum()), new_keys[conflicting])
+        self.report.add(report)
+
+        return df.take(np.flatnonzero(first)), report
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def content_hashes(df, key=None):
+    """
+        Hash de 64 bits do conteúdo de cada linha, sem a coluna key. As colunas numéricas entram como float64, para que
+        o mesmo valor gere o mesmo hash em lotes onde o pandas inferiu int64 e float64.
+    """
+    columns = [col for col in df.columns if col != key]
+    dtypes = {col: 'float64' for col in columns if pd.api.types.is_numeric_dtype(df[col])}
+
+    return pd.util.hash_pandas_object(df[columns].astype(dtypes), index=False).to_numpy()
+
+def pair_hashes(keys, hashes):
+    """
+        Hash combinado da chave e do hash de conteúdo de cada linha
+    """
+    pairs = pd.DataFrame({'key': keys, 'content': hashes})
+
+    return pd.util.hash_pandas_object(pairs, index=False).to_numpy()
+
+def deduplicate(df, key=DEDUP_KEY):
+    """
+        Equivalente a df.drop_duplicates(keep='first'), calculando o hash de conteúdo só das linhas cujo id se repete.
+        Devolve o dataframe sem duplicados e o DedupReport.
+    """
+    keys = df[key].to_numpy()
+    candidates = np.flatnonzero(pd.Series(keys).duplicated(keep=False).to_numpy())
+
+    pairs = pd.DataFrame({'key': keys[candidates], 'content': content_hashes(df.iloc[candidates], key)})
+    repeated = pairs.duplicated().to_numpy()
+
+    # conflitos: ids com mais de um conteúdo distinto entre os candidatos
+    distinct_keys = pairs['key'][~repeated]
+    conflict_ids = distinct_keys[distinct_keys.duplicated()]
+
+    keep = np.ones(len(df), dtype=bool)
+    keep[candidates[repeated]] = False
+
+    return df.take(np.flatnonzero(keep)), DedupReport(len(df), int(repeated.sum()), conflict_ids)
+
+def main():
+    from eat_out.data import CSV_PATH, rename_columns, drop_missing
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--conflicts', type=int, default=20, help='quantidade de linhas em conflito exibidas')
+    args = parser.parse_args()
+
+    df = drop_missing(rename_columns(pd.read_csv(args.csv)))
+    _, report = deduplicate(df)
+    print(report.summary())
+
+    conflicts = report.conflicts(df)
+    if len(conflicts):
+        print(conflicts.head(args.conflicts).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Cache dos gráficos Plotly prontos, chaveado pelo estado dos filtros.
+
+    Os gráficos de barras das páginas só dependem da versão dos dados e dos filtros da barra lateral, mas eram
+    montados de novo (agregação no cubo + px.bar) a cada rerun, mesmo quando só outro widget mudou ou o usuário
+    voltou para a página. Aqui cada gráfico é guardado com a chave
+        (versão do dataset, página, id do gráfico, estado dos filtros normalizado)
+    e um rerun com os mesmos filtros (na maioria das visitas, todos os países selecionados) reaproveita o gráfico sem
+    agregar nem chamar o Plotly.
+
+    O que fica no cache é o JSON da figura (o mesmo que o st.plotly_chart enviaria ao navegador), não o go.Figure:
+    o st.plotly_chart valida a figura de novo e a serializa com json.dumps a cada chamada, o que num acerto custaria
+    quase o mesmo que montá-la. plotly_chart() desenha direto a partir do JSON guardado.
+
+    O cache fica no processo e é compartilhado entre as sessões (eat_out.cache). A remoção é LRU sob um orçamento
+    de memória (FIGURE_CACHE_MB, ou a variável de ambiente EAT_OUT_FIGURE_CACHE_MB); o tamanho de cada entrada é o
+    do próprio JSON. Os contadores de acertos, faltas e remoções aparecem no painel "Desempenho"
+    (eat_out.profiling).
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import json
+import numbers
+
+import plotly.express as px
+import plotly.utils
+import streamlit as st
+from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+
+from eat_out.cache          import BudgetCache, budget_bytes
+from eat_out.data           import dataset_version
+from eat_out.schema         import decategorize
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+FIGURE_CACHE_ENV = 'EAT_OUT_FIGURE_CACHE_MB'
+FIGURE_CACHE_MB = 64
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def figure_spec(fig):
+    """
+        JSON de uma figura, serializado como o st.plotly_chart faz antes de enviar ao navegador
+    """
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+def figure_nbytes(value):
+    """
+        Tamanho de um gráfico (ou tupla de gráficos) do cache pelo seu JSON
+    """
+    specs = value if isinstance(value, tuple) else (value,)
+
+    return sum(len(spec) for spec in specs)
+
+def normalize_state(state):
+    """
+        Estado dos filtros em uma forma imutável e canônica: a ordem das chaves e dos países selecionados não
+        importa, e os números dos sliders viram float (o mesmo valor vindo como int ou numpy gera a mesma chave).
+        Qualquer outro valor (datas, por exemplo) entra na chave pelo seu repr
+    """
+    if isinstance(state, dict):
+        return tuple(sorted((key, normalize_state(value)) for key, value in state.items()))
+    if isinstance(state, (list, set, frozenset)):
+        return tuple(sorted((normalize_state(value) for value in state), key=repr))
+    if isinstance(state, tuple):
+        return tuple(normalize_state(value) for value in state)
+    if isinstance(state, (str, bool)) or state is None:
+        return state
+    if isinstance(state, numbers.Number):
+        return float(state)
+
+    return repr(state)
+
+def cached_figure(page, chart, state, build):
+    """
+        JSON do gráfico chart da página page para o estado dos filtros state, do cache compartilhado.
+        build() monta a figura (ou uma tupla de figuras que saem da mesma agregação) quando ela não está no cache;
+        o resultado vai para plotly_chart()
+    """
+    def build_spec():
+        figures = build()
+        if isinstance(figures, tuple):
+            return tuple(figure_spec(fig) for fig in figures)
+        return figure_spec(figures)
+
+    return FIGURES.get((dataset_version(), page, chart, normalize_state(state)), build_spec)
+
+def plotly_chart(spec):
+    """
+        Desenha um gráfico a partir do JSON de cached_figure, na largura do container, com o tema do Streamlit.
+        Equivale a st.plotly_chart(fig, use_container_width=True) sem validar nem serializar a figura de novo
+    """
+    proto = PlotlyChartProto()
+    proto.use_container_width = True
+    proto.figure.spec = spec
+    proto.figure.config = json.dumps({'showLink': False, 'linkText': False})
+    proto.theme = 'streamlit'
+
+    # st._main segue o container ativo (colunas, abas), como o st.plotly_chart
+    return st._main._enqueue('plotly_chart', proto)
+
+def bar_chart(df, x, y):
+    """
+        Gráfico de barras das páginas: uma cor por barra e o valor acima de cada barra
+    """
+    fig = px.bar(data_frame=decategorize(df), x=x, y=y, text_auto=True, color=x)
+    fig.update_traces(textposition='outside', selector=dict(type='bar'))
+
+    return fig
+
+# cache do processo, compartilhado pelas sessões (eat_out.cache)
+FIGURES = BudgetCache('gráficos', budget_bytes(FIGURE_CACHE_ENV, FIGURE_CACHE_MB), size=figure_nbytes)
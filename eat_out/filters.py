@@ -0,0 +1,322 @@
+"""Índice de bitmaps para os filtros da barra lateral.
+
+    Os filtros viram bitmaps compactados (um bit por restaurante, np.packbits): um por país e, para nota e preço, um
+    por código de faixa (abaixo). As seleções do usuário são combinadas com AND bit a bit e o dataframe só é
+    recortado uma vez no final, com take(), sem as cópias intermediárias de cada .loc.
+
+    As colunas de FLAG_FILTERS (preço inválido) também têm um bitmap, usado para descartar as linhas marcadas.
+
+    Nota e preço usam codificação por intervalo sobre os códigos de faixa de eat_out.buckets (um código por limite
+    e um por intervalo entre limites): o bitmap c marca os restaurantes com código <= c. Assim between(low, high)
+    custa dois bitmaps, qualquer que seja o tamanho do intervalo, e a quantidade de bitmaps depende só da quantidade
+    de faixas, não da quantidade de valores distintos. Quando low ou high não é um limite, as linhas da faixa da
+    ponta são comparadas com os valores originais da coluna.
+
+    As opções dos sliders são calculadas por seleção (FilterDomain): os valores distintos das linhas selecionadas ou,
+    se forem mais de MAX_SLIDER_STOPS, quantis ponderados pela quantidade de linhas. Em geral não são limites das
+    faixas; o índice, o cubo e a pirâmide do mapa refinam as faixas das pontas e os filtros continuam exatos.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import streamlit      as st
+
+from eat_out.data           import COUNTRIES, dataset_version, load_clean_restaurants
+from eat_out.buckets        import bucket_edges, bucketize, round_down, round_up
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+FILTER_COLUMNS = ['country', 'aggregate_rating', 'price_brl', 'price_outlier']
+
+# colunas booleanas que as páginas usam para descartar linhas (ver eat_out.outliers)
+FLAG_FILTERS = ['price_outlier']
+
+# quantidade máxima de opções enviadas a cada select_slider
+MAX_SLIDER_STOPS = 100
+
+# casas decimais das opções dos sliders (None = valor original)
+OPTION_DECIMALS = {
+'aggregate_rating': None,
+'price_brl': 2,
+}
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class RangeBitmaps:
+    """
+        Bitmaps de uma coluna numérica com codificação por intervalo sobre os códigos de faixa dos limites edges,
+        o código de cada linha e os valores originais
+    """
+
+    def __init__(self, values, edges):
+        # para uma coluna float do dataframe os valores são uma view da coluna, não uma cópia
+        self.values = np.asarray(values, dtype=float)
+        self.edges = np.asarray(edges, dtype=float)
+
+        # códigos de faixa deslocados em 1 (o -1 de bucketize vira 0); NaN fica com n_codes, fora de todos os bitmaps
+        self.n_codes = 2 * len(self.edges) + 1
+        self.codes = (bucketize(self.values, self.edges) + 1).astype(np.min_scalar_type(self.n_codes))
+        self.codes[np.isnan(self.values)] = self.n_codes
+
+        self.bitmaps = np.empty((self.n_codes, packed_size(len(self.values))), dtype=np.uint8)
+        for code in range(self.n_codes):
+            self.bitmaps[code] = np.packbits(self.codes <= code)
+
+    def between(self, low, high):
+        """
+            Bitmap das linhas com low <= valor <= high
+        """
+        first, last = bucketize([low, high], self.edges) + 1
+
+        # faixas inteiras no intervalo; as faixas das pontas entram inteiras só quando low e high são limites
+        first_full = first + (first % 2 == 0)
+        last_full = last - (last % 2 == 0)
+        bitmap = self.codes_between(first_full, last_full)
+
+        for code in {first, last}:
+            if code % 2 == 0 and code < self.n_codes:
+                bitmap |= self.refine(code, low, high)
+
+        return bitmap
+
+    def codes_between(self, first, last):
+        """
+            Bitmap das linhas com first <= código <= last
+        """
+        if last < first:
+            return np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        if first == 0:
+            return self.bitmaps[last].copy()
+
+        return self.bitmaps[last] & ~self.bitmaps[first - 1]
+
+    def refine(self, code, low, high):
+        """
+            Bitmap das linhas da faixa code com low <= valor <= high, comparando os valores originais
+        """
+        rows = np.flatnonzero(self.codes == code)
+        rows = rows[(self.values[rows] >= low) & (self.values[rows] <= high)]
+
+        rows_selected = np.zeros(len(self.values), dtype=bool)
+        rows_selected[rows] = True
+
+        return np.packbits(rows_selected)
+
+    def equal(self, value):
+        """
+            Bitmap das linhas com valor igual a value
+        """
+        return self.between(value, value)
+
+    def nbytes(self):
+        """
+            Memória dos códigos e dos bitmaps (os valores originais são os da coluna do dataframe)
+        """
+        return self.codes.nbytes + self.bitmaps.nbytes
+
+class FilterDomain:
+    """
+        Domínio de um slider nas linhas selecionadas: valores distintos (arredondados como as opções), quantidade de
+        linhas por valor, mínimo, máximo e as paradas do slider (todos os valores ou, se forem muitos, quantis).
+        O mínimo e o máximo são os valores extremos arredondados para baixo e para cima na precisão das opções
+        (decimals), então a seleção padrão (min, max) mantém todas as linhas.
+    """
+
+    def __init__(self, values, counts, max_stops=MAX_SLIDER_STOPS, low=None, high=None, decimals=None):
+        self.values = values
+        self.counts = counts
+        self.min = round_down(low, decimals) if len(values) else None
+        self.max = round_up(high, decimals) if len(values) else None
+        self.stops = quantile_stops(values, counts, max_stops)
+
+        # as pontas das opções viram o mínimo e o máximo arredondados para fora
+        if self.stops:
+            self.stops = sorted({self.min, *self.stops[1:-1], self.max})
+
+class FilterIndex:
+    """
+        Bitmaps por país, por nota e por preço do dataset limpo. Construído uma vez por versão do dataset; as páginas
+        combinam as seleções com & e recortam o próprio dataframe (mesma ordem de linhas do snapshot) com take().
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.labels = df.index.to_numpy()
+
+        country = df['country'].astype('category')
+        self.countries = list(country.cat.categories)
+        codes = country.cat.codes.to_numpy()
+        self.country_bitmaps = np.empty((len(self.countries), packed_size(self.size)), dtype=np.uint8)
+        for code in range(len(self.countries)):
+            self.country_bitmaps[code] = np.packbits(codes == code)
+
+        self.columns = {col: RangeBitmaps(df[col], edges) for col, edges in bucket_edges(df).items()}
+        self.flags = {col: np.packbits(df[col].to_numpy(dtype=bool)) for col in FLAG_FILTERS}
+
+    def all(self):
+        """
+            Bitmap com todas as linhas selecionadas
+        """
+        return np.packbits(np.ones(self.size, dtype=bool))
+
+    def isin(self, countries):
+        """
+            Bitmap das linhas dos países informados (equivalente a df['country'].isin(countries))
+        """
+        codes = [self.countries.index(country) for country in countries if country in self.countries]
+        if not codes:
+            return np.zeros(self.country_bitmaps.shape[1], dtype=np.uint8)
+
+        return np.bitwise_or.reduce(self.country_bitmaps[codes], axis=0)
+
+    def between(self, column, low, high):
+        """
+            Bitmap das linhas com low <= column <= high (equivalente a df[column].between(low, high))
+        """
+        return self.columns[column].between(low, high)
+
+    def not_equal(self, column, value):
+        """
+            Bitmap das linhas com column != value
+        """
+        bitmap = ~self.columns[column].equal(value)
+        bitmap[-1] &= self.all()[-1]
+
+        return bitmap
+
+    def unflagged(self, flag):
+        """
+            Bitmap das linhas não marcadas na coluna de flag (por exemplo, preços válidos para flag='price_outlier')
+        """
+        bitmap = ~self.flags[flag]
+        bitmap[-1] &= self.all()[-1]
+
+        return bitmap
+
+    def options(self, column, bitmap):
+        """
+            Opções do slider da coluna nas linhas selecionadas
+        """
+        return self.domain(column, bitmap).stops
+
+    def domain(self, column, bitmap, max_stops=MAX_SLIDER_STOPS):
+        """
+            Domínio do slider da coluna nas linhas selecionadas
+        """
+        values = self.columns[column].values[self.mask(bitmap)]
+        values = values[~np.isnan(values)]
+        decimals = OPTION_DECIMALS[column]
+        options, counts = np.unique(values if decimals is None else np.round(values, decimals), return_counts=True)
+        if not len(options):
+            return FilterDomain(options, counts, max_stops)
+
+        return FilterDomain(options, counts, max_stops, values.min(), values.max(), decimals)
+
+    def mask(self, bitmap):
+        """
+            Máscara booleana (uma posição por linha) a partir do bitmap compactado
+        """
+        return np.unpackbits(bitmap, count=self.size).view(bool)
+
+    def count(self, bitmap):
+        """
+            Quantidade de linhas selecionadas no bitmap
+        """
+        return int(np.unpackbits(bitmap, count=self.size).sum())
+
+    def take(self, df, bitmap):
+        """
+            Recorta o dataframe com um único take nas linhas selecionadas. O dataframe pode ser o dataset inteiro ou
+            só parte dele (por exemplo, as partições dos países selecionados): nesse caso as linhas são localizadas
+            pelo índice, que está em ordem crescente nos dois.
+        """
+        positions = np.flatnonzero(self.mask(bitmap))
+        if len(df) == self.size:
+            return df.take(positions)
+
+        labels = self.labels[positions]
+        index = df.index.to_numpy()
+        found = np.searchsorted(index, labels)
+        if (found >= len(index)).any() or (index[np.minimum(found, len(index) - 1)] != labels).any():
+            raise ValueError('o dataframe ({} linhas) não contém todas as linhas selecionadas no índice de filtros'.format(len(df)))
+
+        return df.take(found)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def packed_size(n_rows):
+    """
+        Quantidade de bytes de um bitmap compactado com n_rows linhas
+    """
+    return (n_rows + 7) // 8
+
+def quantile_stops(values, counts, max_stops=MAX_SLIDER_STOPS):
+    """
+        Até max_stops opções de slider tiradas dos próprios valores: todos, se couberem, ou os quantis ponderados pela
+        quantidade de linhas de cada valor. O mínimo e o máximo sempre fazem parte das opções.
+    """
+    if len(values) <= max_stops:
+        return values.tolist()
+
+    cumulative = np.cumsum(counts)
+    targets = np.linspace(0, cumulative[-1], max_stops)
+    positions = np.unique(np.searchsorted(cumulative, targets, side='left'))
+
+    # valores muito frequentes ocupam vários quantis; as paradas que sobram são espalhadas entre os demais valores
+    if len(positions) < max_stops:
+        remaining = np.setdiff1d(np.arange(len(values)), positions)
+        spread = np.linspace(0, len(remaining) - 1, max_stops - len(positions)).round().astype(int)
+        positions = np.union1d(positions, remaining[spread])
+
+    return values[positions].tolist()
+
+def country_multiselect(label='Países'):
+    """
+        Seletor de países da barra lateral, compartilhado pelas páginas; todos os países vêm selecionados
+    """
+    countries = sorted(COUNTRIES.values())
+    st.sidebar.subheader('Selecione o(s) País(es)')
+
+    return st.sidebar.multiselect(label, countries, default=countries)
+
+@st.experimental_singleton(show_spinner=False, max_entries=2)
+def _cached_filter_index(version):
+    # o argumento version só participa da chave do cache
+    return FilterIndex(load_clean_restaurants(columns=FILTER_COLUMNS))
+
+def load_filter_index():
+    """
+        Índice de filtros da versão atual do dataset, compartilhado entre todas as sessões
+    """
+    return _cached_filter_index(dataset_version())
+
+@st.experimental_singleton(show_spinner=False, max_entries=64)
+def _cached_filter_domain(column, countries, rating_range, drop_flags, version):
+    index = _cached_filter_index(version)
+
+    rows_selected = index.isin(countries)
+    if rating_range is not None:
+        rows_selected &= index.between('aggregate_rating', rating_range[0], rating_range[1])
+    for flag in drop_flags:
+        rows_selected &= index.unflagged(flag)
+
+    return index.domain(column, rows_selected)
+
+def load_filter_domain(column, countries, rating_range=None, drop_flags=()):
+    """
+        Domínio do slider da coluna para os países (e, opcionalmente, a faixa de nota) selecionados, sem as linhas
+        marcadas nas colunas de drop_flags. Calculado uma vez por versão do dataset e seleção, e compartilhado entre
+        as sessões.
+    """
+    countries = tuple(sorted(countries))
+    rating_range = None if rating_range is None else tuple(rating_range)
+
+    return _cached_filter_domain(column, countries, rating_range, tuple(drop_flags), dataset_version())
@@ -0,0 +1,198 @@
+"""Leitura em streaming de exportações do Zomato maiores que a memória.
+
+    O CSV é lido em pedaços de CHUNK_ROWS linhas e cada pedaço passa pelos mesmos passos de clean_dataframe
+    (rename_columns, drop_missing, remoção de duplicados e derive_columns). Só um pedaço fica em memória por vez;
+    o que sobrevive entre pedaços são os acumuladores de IngestStats e o índice de duplicados (eat_out.dedup).
+
+    Dois passos dependem do dataset inteiro e por isso a gravação é feita em duas passadas:
+        1. os pedaços limpos vão para um arquivo Arrow temporário (texto ainda sem category), enquanto os acumuladores
+           coletam os valores distintos das colunas category, o mínimo e o máximo das colunas inteiras e as contagens
+           de preço por moeda (eat_out.outliers);
+        2. o arquivo temporário é relido lote a lote, recebe price_outlier e o schema tipado com as
+           categorias completas e o mesmo tipo inteiro em todos os lotes, e é gravado no snapshot definitivo
+           (particionado por país, ver eat_out.snapshot).
+
+    O resultado é o mesmo snapshot de build_snapshot (mesmas linhas, índice, tipos e categorias).
+
+    Uso (a partir da raiz do repositório):
+        python -m eat_out.ingest
+        python -m eat_out.ingest --csv /caminho/export.csv --chunk-rows 200000
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import argparse
+
+import numpy          as np
+import pandas         as pd
+import pyarrow        as pa
+
+from eat_out.data           import (CSV_PATH, CURRENCY_PATH, dataset_version, rename_columns, drop_missing,
+                                    derive_columns, read_exchange_rate)
+from eat_out.schema         import CATEGORY_COLUMNS, apply_schema, integer_columns
+from eat_out.snapshot       import PARTITION_COLUMN, SnapshotWriter, snapshot_path
+from eat_out.outliers       import PriceOutlierStats
+from eat_out.dedup          import DedupIndex
+from eat_out.cube           import hll_registers, hll_estimate
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+CHUNK_ROWS = 100000
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class IngestStats:
+    """
+        Acumuladores atualizados a cada pedaço: contagens de linhas, restaurantes por país, soma de votos,
+        valores distintos das colunas category, mínimo e máximo das colunas inteiras, sketch HyperLogLog dos
+        restaurant_id, contagens de preço por moeda e o índice de duplicados
+    """
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_missing = 0
+        self.rows_written = 0
+        self.countries = pd.Series(dtype=np.int64)
+        self.votes_sum = 0
+        self.distinct = {col: set() for col in CATEGORY_COLUMNS}
+        self.bounds = {}
+        self.restaurant_registers = np.zeros((1, 1024), dtype=np.uint8)
+        self.prices = PriceOutlierStats()
+        self.dedup = DedupIndex()
+
+    def update(self, df):
+        """
+            Soma um pedaço já limpo aos acumuladores
+        """
+        self.rows_written += len(df)
+        self.countries = self.countries.add(df['country'].value_counts(), fill_value=0).astype(np.int64)
+        self.votes_sum += int(df['votes'].sum())
+
+        for col in CATEGORY_COLUMNS:
+            self.distinct[col].update(df[col].dropna().unique())
+
+        for col in integer_columns():
+            low, high = int(df[col].min()), int(df[col].max())
+            if col in self.bounds:
+                low, high = min(low, self.bounds[col][0]), max(high, self.bounds[col][1])
+            self.bounds[col] = (low, high)
+
+        registers = hll_registers(np.zeros(len(df), dtype=np.int64), df['restaurant_id'].to_numpy(), 1)
+        np.maximum(self.restaurant_registers, registers, out=self.restaurant_registers)
+
+        self.prices.update(df['average_cost_for_two'], df['currency'])
+
+    def categories(self):
+        """
+            Categorias de cada coluna category, ordenadas como em astype('category')
+        """
+        return {col: sorted(values) for col, values in self.distinct.items()}
+
+    def restaurants(self):
+        """
+            Estimativa de restaurantes distintos (HyperLogLog)
+        """
+        return int(round(hll_estimate(self.restaurant_registers)[0]))
+
+    def report(self):
+        """
+            Resumo da leitura para exibição no terminal
+        """
+        lines = [
+            'linhas lidas:          {}'.format(self.rows_read),
+            'linhas com NaN:        {}'.format(self.rows_missing),
+            'linhas duplicadas:     {}'.format(self.dedup.report.rows_dropped),
+            'ids em conflito:       {}'.format(len(self.dedup.report.conflict_ids)),
+            'linhas gravadas:       {}'.format(self.rows_written),
+            'restaurantes (aprox.): {}'.format(self.restaurants()),
+            'total de votos:        {}'.format(self.votes_sum),
+            'cidades:               {}'.format(len(self.distinct['city'])),
+            'culinárias:            {}'.format(len(self.distinct['cuisines'])),
+        ]
+        lines += ['  {:<26} {}'.format(country, count) for country, count in self.countries.sort_index().items()]
+
+        return '\n'.join(lines)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def clean_chunks(csv_path, exchange_rate, stats, chunk_rows=CHUNK_ROWS):
+    """
+        Gera os pedaços do CSV limpos (passos 1 a 8 de clean_dataframe), com duplicados removidos entre todos os pedaços
+        pelo DedupIndex de stats
+    """
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        stats.rows_read += len(chunk)
+
+        chunk = rename_columns(chunk)
+        rows = len(chunk)
+        chunk = drop_missing(chunk)
+        stats.rows_missing += rows - len(chunk)
+
+        # mantém a primeira ocorrência: dentro do pedaço e em relação aos pedaços anteriores
+        chunk, _ = stats.dedup.deduplicate(chunk)
+
+        if len(chunk):
+            yield derive_columns(chunk, exchange_rate)
+
+def stream_snapshot(csv_path=CSV_PATH, currency_path=CURRENCY_PATH, path=None, version=None, chunk_rows=CHUNK_ROWS):
+    """
+        Limpa o CSV em pedaços e grava o snapshot tipado em duas passadas (ver docstring do módulo).
+        Devolve os acumuladores da leitura.
+    """
+    path = path or snapshot_path(csv_path)
+    version = version or dataset_version(csv_path, currency_path)
+    exchange_rate = read_exchange_rate(currency_path)
+    stats = IngestStats()
+
+    # 1ª passada: pedaços limpos no arquivo temporário e acumuladores
+    staging = SnapshotWriter(path + '.staging')
+    try:
+        for chunk in clean_chunks(csv_path, exchange_rate, stats, chunk_rows):
+            stats.update(chunk)
+            staging.write(chunk)
+        staging_path = staging.close()
+    except BaseException:
+        staging.abort()
+        raise
+
+    # 2ª passada: flags de preço e schema tipado, lote a lote a partir do arquivo temporário
+    categories = stats.categories()
+    writer = SnapshotWriter(path, version, PARTITION_COLUMN)
+    try:
+        with pa.OSFile(staging_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i).to_pandas()
+                batch['price_outlier'] = stats.prices.flags(batch['average_cost_for_two'], batch['currency'])
+                writer.write(apply_schema(batch, categories, stats.bounds))
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        os.remove(staging_path)
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--currency', default=CURRENCY_PATH)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    stats = stream_snapshot(args.csv, args.currency, chunk_rows=args.chunk_rows)
+    print('snapshot gerado: {}'.format(snapshot_path(args.csv)))
+    print(stats.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Estrutura comum das páginas: configuração, estilos e logo da barra lateral.
+
+    O Streamlit executa o script da página inteiro a cada interação. Aqui ficam as partes fixas do início de cada
+    página, fora desse caminho: os arquivos de estilo são lidos do disco uma vez por processo (chaveados pela data de
+    modificação, então um arquivo trocado é lido de novo) e o logo vem já codificado de eat_out.assets, sem abrir e
+    decodificar o PNG a cada rerun.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+
+import streamlit      as st
+
+from eat_out.assets         import show_image
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+# os mapas (iframes) ocupam toda a largura da coluna
+MAP_RESPONSIVE_CSS = """
+ <style>
+ [title~="st.iframe"] { width: 100%}
+ </style>
+"""
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+@st.experimental_singleton(show_spinner=False, max_entries=32)
+def _cached_file(path, mtime):
+    # o argumento mtime só participa da chave do cache
+    with open(path, 'rb') as file:
+        return file.read()
+
+def read_asset(path):
+    """
+        Conteúdo (bytes) de um arquivo estático, lido uma vez por versão do arquivo e compartilhado entre as sessões
+    """
+    return _cached_file(path, os.path.getmtime(path))
+
+def local_css(path):
+    """
+        Aplica à página o arquivo de estilo path
+    """
+    st.markdown('<style>{}</style>'.format(read_asset(path).decode('utf-8')), unsafe_allow_html=True)
+
+def setup_page(page_title, page_icon):
+    """
+        Configuração da página (layout largo), estilo dos mapas e logo na barra lateral; deve ser o primeiro comando
+        do Streamlit da página
+    """
+    st.set_page_config(page_title=page_title, page_icon=page_icon, layout='wide')
+    st.markdown(MAP_RESPONSIVE_CSS, unsafe_allow_html=True)
+    show_image('logo', st.sidebar, use_column_width='auto')
@@ -0,0 +1,93 @@
+"""Placar dos restaurantes destaque: melhor e pior avaliado, maior e menor valor para duas pessoas.
+
+    Cada placar é uma lista de critérios (coluna, crescente?). O restaurante vencedor sai de reduções vetorizadas
+    O(n): em cada critério ficam só as linhas com o melhor valor do seu grupo, sem ordenar o dataframe. Empates que
+    sobram depois dos critérios são desfeitos pelo nome do restaurante e pelo restaurant_id, em ordem crescente.
+
+    Com by=None o placar vale para todo o dataframe; com by='country' ou by='cuisines' (ou uma lista de colunas)
+    cada grupo tem o seu vencedor.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import pandas         as pd
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+LEADERBOARD_COLUMNS = ['restaurant_id', 'restaurant_name', 'aggregate_rating', 'votes', 'price_brl', 'price_outlier']
+
+# critérios de cada placar: (coluna, crescente?) em ordem de prioridade
+BOARDS = {
+'best_rated': [('aggregate_rating', False), ('votes', False)],
+'worst_rated': [('aggregate_rating', True), ('votes', True)],
+'most_expensive': [('price_brl', False)],
+'cheapest': [('price_brl', True)],
+}
+
+# placares que desconsideram as linhas marcadas na coluna de flag
+BOARD_FLAGS = {
+'most_expensive': 'price_outlier',
+'cheapest': 'price_outlier',
+}
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def leaderboard(df, by=None, boards=BOARDS):
+    """
+        Linha completa do restaurante vencedor de cada placar (e de cada grupo, se by for informado).
+        O índice do resultado é o nome do placar, seguido das colunas de by.
+    """
+    by = [] if by is None else [by] if isinstance(by, str) else list(by)
+    if by:
+        group_codes = df.groupby(by, observed=True, sort=True).ngroup().to_numpy()
+    else:
+        group_codes = np.zeros(len(df), dtype=np.int64)
+
+    # desempate comum a todos os placares: nome e restaurant_id crescentes
+    tie_breakers = [(df['restaurant_name'].to_numpy(), True)]
+    if 'restaurant_id' in df.columns:
+        tie_breakers.append((df['restaurant_id'].to_numpy(), True))
+
+    names = []
+    positions = []
+    for board, criteria in boards.items():
+        candidates = np.arange(len(df))
+        if board in BOARD_FLAGS and BOARD_FLAGS[board] in df.columns:
+            candidates = candidates[~df[BOARD_FLAGS[board]].to_numpy(dtype=bool)]
+
+        keys = [(df[column].to_numpy(dtype=float), ascending) for column, ascending in criteria] + tie_breakers
+        winners = extreme_positions(candidates, group_codes, keys)
+
+        names += [board] * len(winners)
+        positions.append(winners)
+
+    result = df.iloc[np.concatenate(positions)]
+    index = [pd.Index(names, name='board')] + [result[col] for col in by]
+
+    return result.set_axis(pd.MultiIndex.from_arrays(index) if by else index[0], axis=0)
+
+def extreme_positions(candidates, group_codes, keys):
+    """
+        Posição da linha vencedora de cada grupo: aplica os critérios em sequência, mantendo em cada um só as
+        linhas com o maior (ou menor) valor do grupo entre as que sobraram. Os desempates (nome, id) só olham as
+        poucas linhas que sobram dos critérios numéricos.
+    """
+    for values, ascending in keys:
+        values = values[candidates]
+        valid = ~pd.isna(values)
+        candidates, values = candidates[valid], values[valid]
+
+        grouped = pd.Series(values).groupby(group_codes[candidates])
+        best = grouped.transform('min' if ascending else 'max').to_numpy()
+        candidates = candidates[values == best]
+
+    # sem restaurant_id ainda pode haver empate: fica a primeira linha de cada grupo, na ordem dos grupos
+    _, first = np.unique(group_codes[candidates], return_index=True)
+
+    return candidates[first]
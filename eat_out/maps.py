@@ -0,0 +1,381 @@
+"""Mapa de localização dos restaurantes.
+
+    Dois modos de construção para os pontos:
+        'fast'    -> todos os pontos são enviados ao navegador como um único payload colunar (ColumnarMarkerCluster);
+                     os marcadores são criados no navegador e o popup de cada um só é montado quando ele é aberto.
+        'markers' -> implementação original: um folium.Marker com IFrame, Popup e Icon por restaurante.
+
+    Acima de PYRAMID_MIN_POINTS restaurantes o mapa passa a desenhar as células agregadas da pirâmide
+    (eat_out.pyramid) como círculos, escolhendo no navegador o nível de acordo com o zoom (AggregateCircles).
+
+    O HTML renderizado de cada mapa fica em um cache do processo (eat_out.cache), compartilhado entre as sessões e
+    chaveado pela versão do dataset e por um hash dos restaurantes selecionados (ou das células da pirâmide): um rerun
+    com os mesmos filtros, o caso da maioria das visitas, não monta nem renderiza o mapa de novo. Como um mapa com
+    todos os restaurantes tem vários MB, o limite do cache é o total de bytes do HTML (MAP_CACHE_MB, ou a variável
+    de ambiente EAT_OUT_MAP_CACHE_MB), e não a quantidade de mapas.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import json
+import folium
+import hashlib
+
+import numpy          as np
+import pandas         as pd
+
+import streamlit.components.v1 as components
+
+from branca.element         import MacroElement
+from jinja2                 import Template
+from folium.elements        import JSCSSMixin
+from folium.plugins         import MarkerCluster
+
+from eat_out.cache          import BudgetCache, budget_bytes
+from eat_out.data           import dataset_version
+from eat_out.pyramid        import MAX_LEVEL
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+LOCATION_COLUMNS = ['restaurant_name', 'address', 'cuisines', 'price_brl', 'aggregate_rating', 'rating_color',
+                    'latitude', 'longitude']
+
+# casas decimais enviadas ao navegador (5 casas ~ 1 metro)
+COORDINATE_DECIMALS = 5
+
+# acima deste número de restaurantes o mapa usa a pirâmide de agregação
+PYRAMID_MIN_POINTS = 50000
+
+# tamanho do componente do mapa na página (a largura é a padrão do folium_static; o CSS das páginas estica o iframe)
+MAP_HEIGHT = 1000
+MAP_WIDTH = 700
+
+MAP_CACHE_ENV = 'EAT_OUT_MAP_CACHE_MB'
+MAP_CACHE_MB = 256
+
+# nível da pirâmide exibido = zoom do mapa + LEVEL_OFFSET (células de 1/4 do tile)
+LEVEL_OFFSET = 2
+
+# níveis da pirâmide que o navegador pode exibir: no zoom 0 já é o nível LEVEL_OFFSET
+MAP_LEVELS = range(LEVEL_OFFSET, MAX_LEVEL + 1)
+
+# níveis com mais células que isso não são enviados; o navegador usa o nível mais fino disponível
+MAX_CELLS_PER_LEVEL = 20000
+
+# cor do círculo pela nota média, nas mesmas faixas das cores de avaliação do Zomato
+RATING_THRESHOLDS = [
+[4.5, '#3F7E00'],
+[4.0, '#5BA829'],
+[3.5, '#9ACD32'],
+[2.5, '#CDD614'],
+[0.1, '#FFBA00'],
+[0.0, '#CBCBC8'],
+]
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class ColumnarMarkerCluster(JSCSSMixin, MacroElement):
+    """
+        Camada de cluster que recebe os restaurantes como colunas (listas paralelas) em um único JSON.
+        Textos repetidos (culinária e cor) são enviados como dicionário + códigos inteiros, e os marcadores
+        compartilham um único ícone por cor.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function() {
+                var data = {{ this.payload }};
+                var cluster = L.markerClusterGroup({chunkedLoading: true});
+                var icons = data.colors.map(function(color) {
+                    return L.AwesomeMarkers.icon({
+                        markerColor: color, iconColor: 'white', icon: 'cutlery', prefix: 'glyphicon',
+                        extraClasses: 'fa-rotate-0'
+                    });
+                });
+
+                function escapeHtml(text) {
+                    return String(text).replace(/[&<>"']/g, function(c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+
+                function field(label, value) {
+                    return '<p style="font-family:helvetica;"><strong>' + label + ' <br /></strong><em>'
+                        + escapeHtml(value) + '</em></p>';
+                }
+
+                function popupContent(layer) {
+                    var i = layer.options.row;
+                    return '<div style="width:300px;max-height:300px;overflow:auto;">'
+                        + field('Restaurante:', data.name[i])
+                        + field('Culin&aacute;ria:', data.cuisines[data.cuisine[i]])
+                        + field('Endere&ccedil;o:', data.address[i])
+                        + field('Custo m&eacute;dio para 2 pessoas:', 'R$' + data.price[i])
+                        + field('Nota m&eacute;dia:', data.rating[i])
+                        + '</div>';
+                }
+
+                var markers = new Array(data.lat.length);
+                for (var i = 0; i < data.lat.length; i++) {
+                    markers[i] = L.marker([data.lat[i], data.lng[i]], {icon: icons[data.color[i]], row: i})
+                                  .bindPopup(popupContent, {maxWidth: 2650});
+                }
+                cluster.addLayers(markers);
+
+                return cluster;
+            })();
+            {{ this._parent.get_name() }}.addLayer({{ this.get_name() }});
+        {% endmacro %}
+        """
+    )
+
+    default_js = MarkerCluster.default_js
+    default_css = MarkerCluster.default_css
+
+    def __init__(self, df_locations):
+        super().__init__()
+        self._name = 'ColumnarMarkerCluster'
+        self.payload = columnar_payload(df_locations)
+
+class AggregateCircles(MacroElement):
+    """
+        Camada com as células agregadas da pirâmide, um payload colunar por nível.
+        A cada zoom o navegador desenha apenas o nível correspondente; os círculos de cada nível são criados
+        na primeira vez em que ele é exibido e reaproveitados depois.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(map) {
+                var data = {{ this.payload }};
+                var group = L.layerGroup().addTo(map);
+                var layers = {};
+
+                function color(rating) {
+                    for (var i = 0; i < data.thresholds.length; i++) {
+                        if (rating >= data.thresholds[i][0]) { return data.thresholds[i][1]; }
+                    }
+                    return data.thresholds[data.thresholds.length - 1][1];
+                }
+
+                function tooltip(cells, i) {
+                    return function() {
+                        return '<strong>' + cells.count[i] + ' restaurantes</strong><br />'
+                            + 'Nota m&eacute;dia: ' + cells.rating[i] + '<br />'
+                            + 'Custo m&eacute;dio para 2 pessoas: R$' + cells.price[i];
+                    };
+                }
+
+                function layerFor(level) {
+                    if (!layers[level]) {
+                        var cells = data.levels[level];
+                        var circles = [];
+                        for (var i = 0; cells && i < cells.count.length; i++) {
+                            circles.push(L.circleMarker([cells.lat[i], cells.lng[i]], {
+                                radius: 4 + 2 * Math.log2(1 + cells.count[i]),
+                                color: color(cells.rating[i]), weight: 1, fillOpacity: 0.6
+                            }).bindTooltip(tooltip(cells, i)));
+                        }
+                        layers[level] = L.layerGroup(circles);
+                    }
+                    return layers[level];
+                }
+
+                function redraw() {
+                    var level = Math.max(data.min_level, Math.min(data.max_level, map.getZoom() + data.offset));
+                    group.clearLayers();
+                    group.addLayer(layerFor(level));
+                }
+
+                map.on('zoomend', redraw);
+                redraw();
+
+                return group;
+            })({{ this._parent.get_name() }});
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, cells):
+        super().__init__()
+        self._name = 'AggregateCircles'
+        self.payload = aggregate_payload(cells)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def encode_codes(series):
+    """
+        Devolve (códigos, valores distintos) de uma coluna de texto, aproveitando os códigos quando ela já é category
+    """
+    if hasattr(series, 'cat'):
+        series = series.cat.remove_unused_categories()
+        return series.cat.codes.to_numpy(), [str(x) for x in series.cat.categories]
+
+    uniques, codes = np.unique(series.astype(str).to_numpy(), return_inverse=True)
+
+    return codes, uniques.tolist()
+
+def columnar_payload(df_locations):
+    """
+        Serializa os restaurantes em um JSON orientado a colunas, pronto para ser embutido no HTML do mapa
+    """
+    cuisine_codes, cuisines = encode_codes(df_locations['cuisines'])
+    color_codes, colors = encode_codes(df_locations['rating_color'])
+
+    data = {
+        'lat': np.round(df_locations['latitude'].to_numpy(dtype=float), COORDINATE_DECIMALS).tolist(),
+        'lng': np.round(df_locations['longitude'].to_numpy(dtype=float), COORDINATE_DECIMALS).tolist(),
+        'name': df_locations['restaurant_name'].astype(str).tolist(),
+        'address': df_locations['address'].astype(str).tolist(),
+        'price': np.round(df_locations['price_brl'].to_numpy(dtype=float), 2).tolist(),
+        'rating': df_locations['aggregate_rating'].to_numpy(dtype=float).tolist(),
+        'cuisine': cuisine_codes.tolist(),
+        'cuisines': cuisines,
+        'color': color_codes.tolist(),
+        'colors': colors,
+    }
+
+    # '</' fecharia a tag <script> em que o JSON é embutido
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def aggregate_payload(cells):
+    """
+        Serializa as células da pirâmide (resultado de LocationPyramid.query) em um JSON colunar por nível.
+        Níveis acima do primeiro que excede MAX_CELLS_PER_LEVEL não são enviados.
+    """
+    levels = {}
+    for level, level_cells in cells.groupby('level', sort=True):
+        if len(level_cells) > MAX_CELLS_PER_LEVEL and levels:
+            break
+        levels[str(int(level))] = {
+            'lat': np.round(level_cells['latitude'].to_numpy(dtype=float), COORDINATE_DECIMALS).tolist(),
+            'lng': np.round(level_cells['longitude'].to_numpy(dtype=float), COORDINATE_DECIMALS).tolist(),
+            'count': level_cells['count'].astype(int).tolist(),
+            'rating': np.round(level_cells['aggregate_rating'].to_numpy(dtype=float), 2).tolist(),
+            'price': np.round(level_cells['price_brl'].to_numpy(dtype=float), 2).tolist(),
+        }
+
+    sent = [int(level) for level in levels]
+    data = {
+        'levels': levels,
+        'min_level': min(sent) if sent else 0,
+        'max_level': max(sent) if sent else 0,
+        'offset': LEVEL_OFFSET,
+        'thresholds': RATING_THRESHOLDS,
+    }
+
+    return json.dumps(data, separators=(',', ':'))
+
+def add_location_markers(mapa, df_locations):
+    """
+        Implementação original: um marcador com IFrame, Popup e Icon por restaurante
+    """
+    marker_cluster = MarkerCluster().add_to(mapa)
+
+    for i, row in df_locations.iterrows():
+
+        html = """<p style="font-family:helvetica;"><strong>Restaurante: </strong> <br /><em>{}</em></p>
+                  <p style="font-family:helvetica;"><strong>Culinária: <br /></strong><em>{}</em></p>
+                  <p style="font-family:helvetica;"><strong>Endere&ccedil;o: <br /></strong><em>{}</em></p>
+                  <p style="font-family:helvetica;"><strong>Custo m&eacute;dio para 2 pessoas: <br /></strong><em>R${}</em></p>
+                  <p style="font-family:helvetica;"><strong>Nota m&eacute;dia: <br /></strong><em>{}</em></p>""".format(
+                                        df_locations['restaurant_name'][i],
+                                        df_locations['cuisines'][i],
+                                        df_locations['address'][i],
+                                        round(df_locations['price_brl'][i],2),
+                                        df_locations['aggregate_rating'][i])
+        iframe = folium.IFrame(html=html, width=300, height=300)
+        popup = folium.Popup(iframe, max_width=2650)
+        icon_color = df_locations['rating_color'][i]
+
+        folium.Marker(location=[row['latitude'], row['longitude']],
+                      popup=popup,
+                      icon=folium.Icon(color=icon_color,
+                                        icon='cutlery')).add_to(marker_cluster)
+
+    return mapa
+
+def build_location_map(df1, mode='fast'):
+    """
+        Monta o mapa folium com o cluster de restaurantes, sem renderizá-lo
+    """
+    df_locations = (df1.loc[:, LOCATION_COLUMNS].reset_index())
+
+    mapa = folium.Map(location=[df_locations.latitude.mean(), df_locations.longitude.mean()], zoom_start=3, control_scale=True)
+
+    if mode == 'fast':
+        ColumnarMarkerCluster(df_locations).add_to(mapa)
+    elif mode == 'markers':
+        add_location_markers(mapa, df_locations)
+    else:
+        raise ValueError("mode deve ser 'fast' ou 'markers', recebido: {!r}".format(mode))
+
+    return mapa
+
+def build_density_map(cells):
+    """
+        Monta o mapa folium com as células agregadas da pirâmide, sem renderizá-lo
+    """
+    weights = cells['count'] / cells['count'].sum() if len(cells) else cells['count']
+    location = [float((cells['latitude'] * weights).sum()), float((cells['longitude'] * weights).sum())]
+
+    mapa = folium.Map(location=location, zoom_start=3, control_scale=True)
+    AggregateCircles(cells).add_to(mapa)
+
+    return mapa
+
+def render_map(mapa):
+    """
+        HTML completo do mapa, o mesmo que o folium_static envia ao navegador
+    """
+    return folium.Figure().add_child(mapa).render()
+
+def html_nbytes(html):
+    return len(html.encode('utf-8'))
+
+def selection_digest(values):
+    """
+        Hash de 128 bits de um array (ids dos restaurantes, hashes das células), usado na chave do cache de mapas
+    """
+    return hashlib.blake2b(np.ascontiguousarray(values).tobytes(), digest_size=16).hexdigest()
+
+def show_map(html, height=MAP_HEIGHT):
+    """
+        Exibe o HTML do mapa na página, como o folium_static
+    """
+    components.html(html, height=height + 10, width=MAP_WIDTH)
+
+def restaurants_density(cells):
+    """
+        Esta função cria um mapa com círculos que agregam os restaurantes de cada região, conforme o zoom.
+    """
+    digest = selection_digest(pd.util.hash_pandas_object(cells, index=False).to_numpy())
+    html = MAPS.get((dataset_version(), 'density', digest), lambda: render_map(build_density_map(cells)))
+
+    show_map(html)
+
+    return None
+
+def restaurants_location(df1, mode='fast'):
+    """
+        Esta função cria um mapa onde se cria um cluster com as localizações, além de fornecer informações destas localizações.
+        df1 precisa da coluna restaurant_id, que identifica a seleção no cache de mapas.
+    """
+    digest = selection_digest(df1['restaurant_id'].to_numpy(dtype=np.int64))
+    html = MAPS.get((dataset_version(), 'location', mode, digest), lambda: render_map(build_location_map(df1, mode)))
+
+    show_map(html)
+
+    return None
+
+# HTML dos mapas renderizados, compartilhado pelas sessões do processo
+MAPS = BudgetCache('mapas', budget_bytes(MAP_CACHE_ENV, MAP_CACHE_MB), size=html_nbytes)
@@ -0,0 +1,124 @@
+"""Detecção de preços inválidos no dataset limpo.
+
+    O preço para duas pessoas é comparado com os demais preços da mesma moeda usando estatísticas robustas sobre o
+    logaritmo do preço (a distribuição é assimétrica): z = 0.6745 * (log(preço) - mediana) / MAD. Quando a MAD da moeda
+    é zero, a escala vem do intervalo interquartil (IQR / 1.349). Preços zerados, negativos ou ausentes também são
+    marcados.
+
+    As estatísticas são acumuladas em PriceOutlierStats a partir da contagem de linhas por (moeda, preço), que tem
+    poucos valores distintos. Assim o mesmo cálculo serve para o dataframe inteiro e para a leitura em pedaços
+    (eat_out.ingest), com medianas e quantis exatos.
+
+    O limite é alto de propósito: só erros grosseiros de cadastro (valores dezenas de vezes acima ou abaixo do típico
+    da moeda) são marcados, não os restaurantes caros de verdade.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import pandas         as pd
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+
+# limite do z-score robusto (no log do preço) acima do qual o preço é marcado como inválido
+OUTLIER_THRESHOLD = 10.0
+
+# constantes que tornam a MAD e o IQR comparáveis ao desvio padrão de uma normal
+MAD_SCALE = 0.6745
+IQR_SCALE = 1.349
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class PriceOutlierStats:
+    """
+        Acumulador das estatísticas robustas por moeda: contagem de linhas por (moeda, preço positivo)
+    """
+
+    def __init__(self):
+        self.counts = None
+
+    def update(self, prices, currencies):
+        """
+            Soma as linhas de mais um pedaço do dataset às contagens
+        """
+        prices = np.asarray(prices, dtype=float)
+        valid = prices > 0
+        pairs = pd.DataFrame({'currency': np.asarray(currencies, dtype=object)[valid], 'price': prices[valid]})
+        counts = pairs.value_counts()
+
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+
+        return self
+
+    def scales(self):
+        """
+            Mediana e escala (MAD ou, quando a MAD é zero, IQR) do log do preço de cada moeda
+        """
+        stats = {}
+        if self.counts is not None:
+            for currency, group in self.counts.groupby(level='currency'):
+                values = np.log(group.index.get_level_values('price').to_numpy())
+                weights = group.to_numpy(dtype=np.int64)
+
+                median = weighted_quantile(values, weights, 0.5)
+                scale = weighted_quantile(np.abs(values - median), weights, 0.5) / MAD_SCALE
+                if scale == 0:
+                    scale = (weighted_quantile(values, weights, 0.75) - weighted_quantile(values, weights, 0.25)) / IQR_SCALE
+                stats[currency] = (median, scale)
+
+        return pd.DataFrame.from_dict(stats, orient='index', columns=['median', 'scale'], dtype=float)
+
+    def scores(self, prices, currencies):
+        """
+            z-score robusto do log de cada preço em relação à sua moeda; preços não positivos, moedas sem
+            estatística e moedas sem dispersão recebem z = 0
+        """
+        stats = self.scales()
+        prices = np.asarray(prices, dtype=float)
+        codes = stats.index.get_indexer(np.asarray(currencies, dtype=object))
+        median = np.append(stats['median'].to_numpy(), np.nan)[codes]
+        scale = np.append(stats['scale'].to_numpy(), np.nan)[codes]
+
+        log_prices = np.full(len(prices), np.nan)
+        np.log(prices, out=log_prices, where=prices > 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(scale > 0, (log_prices - median) / scale, 0.0)
+
+        return np.nan_to_num(scores, nan=0.0)
+
+    def flags(self, prices, currencies, threshold=OUTLIER_THRESHOLD):
+        """
+            Máscara dos preços inválidos: não positivos, ausentes ou com |z| acima do limite dentro da própria moeda
+        """
+        prices = np.asarray(prices, dtype=float)
+
+        return ~(prices > 0) | (np.abs(self.scores(prices, currencies)) > threshold)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def weighted_quantile(values, weights, q):
+    """
+        Quantil q (interpolação linear, como Series.quantile) de valores repetidos weights vezes cada um
+    """
+    order = np.argsort(values, kind='stable')
+    values, cumulative = values[order], np.cumsum(weights[order])
+
+    position = q * (cumulative[-1] - 1)
+    low, high = np.searchsorted(cumulative, [np.floor(position), np.ceil(position)], side='right')
+
+    return values[low] + (position - np.floor(position)) * (values[high] - values[low])
+
+def flag_price_outliers(prices, currencies, threshold=OUTLIER_THRESHOLD):
+    """
+        Máscara dos preços inválidos do dataframe inteiro (ver PriceOutlierStats.flags)
+    """
+    return PriceOutlierStats().update(prices, currencies).flags(prices, currencies, threshold)
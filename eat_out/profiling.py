@@ -0,0 +1,192 @@
+"""Medição do tempo de cada seção das páginas, ligada pela variável de ambiente EAT_OUT_PROFILE.
+
+    Cada página cria um PageProfiler no início e marca o começo de cada seção lógica (carregamento, cada filtro, cada
+    bloco de gráficos, mapa) com profiler.section(nome): uma seção dura até a marcação seguinte ou até finish().
+    Com a medição desligada (padrão) as marcações não fazem nada.
+
+    Com EAT_OUT_PROFILE=1, ao final de cada execução da página (rerun):
+        - um painel "Desempenho" na barra lateral mostra o tempo de cada seção e os contadores dos caches
+          (eat_out.cache);
+        - um registro JSON por rerun é acrescentado ao arquivo EAT_OUT_PROFILE_LOG (padrão logs/timings.jsonl), com
+          a data, a página, a sessão, o tempo total, o tempo de cada seção e os contadores dos caches.
+
+    Resumo dos registros gravados (percentis por página e seção), a partir da raiz do repositório:
+        python -m eat_out.profiling [--log logs/timings.jsonl]
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import json
+import time
+import argparse
+import datetime
+
+import pandas         as pd
+import streamlit      as st
+
+from eat_out.cache          import cache_stats
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+PROFILE_ENV = 'EAT_OUT_PROFILE'
+PROFILE_LOG_ENV = 'EAT_OUT_PROFILE_LOG'
+PROFILE_LOG = 'logs/timings.jsonl'
+
+# percentis exibidos no resumo dos registros
+SUMMARY_PERCENTILES = [0.5, 0.95]
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class PageProfiler:
+    """
+        Tempos das seções de uma execução da página
+    """
+
+    def __init__(self, page, enabled=None):
+        self.page = page
+        self.enabled = profiling_enabled() if enabled is None else enabled
+        self.sections = []
+        self.current = None
+        self.section_start = time.perf_counter()
+
+    def section(self, name):
+        """
+            Encerra a seção anterior e começa a seção name
+        """
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        self.close_section(now)
+        self.current = name
+        self.section_start = now
+
+    def close_section(self, now):
+        if self.current is not None:
+            self.sections.append((self.current, (now - self.section_start) * 1e3))
+            self.current = None
+
+    def record(self):
+        """
+            Registro da execução: página, sessão, data, tempo total e tempo de cada seção em milissegundos, e os
+            contadores dos caches do processo
+        """
+        return {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'page': self.page,
+            'session': session_id(),
+            'total_ms': round(sum(ms for _, ms in self.sections), 3),
+            'sections': [{'name': name, 'ms': round(ms, 3)} for name, ms in self.sections],
+            'caches': cache_stats(),
+        }
+
+    def finish(self, log_path=None):
+        """
+            Encerra a última seção, grava o registro no log e mostra o painel na barra lateral
+        """
+        if not self.enabled:
+            return None
+
+        self.close_section(time.perf_counter())
+        record = self.record()
+        write_record(record, log_path or os.environ.get(PROFILE_LOG_ENV, PROFILE_LOG))
+        performance_panel(record)
+
+        return record
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def profiling_enabled():
+    """
+        A medição fica ligada quando EAT_OUT_PROFILE tem um valor diferente de '', '0' e 'false'
+    """
+    return os.environ.get(PROFILE_ENV, '').strip().lower() not in ('', '0', 'false')
+
+def session_id():
+    """
+        Identificador da sessão do Streamlit que executa a página (None fora do servidor)
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+
+    ctx = get_script_run_ctx()
+
+    return ctx.session_id if ctx is not None else None
+
+def write_record(record, log_path):
+    """
+        Acrescenta o registro ao log como uma linha JSON
+    """
+    directory = os.path.dirname(log_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(log_path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def performance_panel(record):
+    """
+        Painel "Desempenho" na barra lateral com o tempo de cada seção da execução
+    """
+    sections = pd.DataFrame(record['sections'], columns=['name', 'ms'])
+
+    with st.sidebar.expander('Desempenho'):
+        st.markdown('**Total:** {:.1f} ms'.format(record['total_ms']))
+        st.table(sections.rename(columns={'name': 'seção', 'ms': 'tempo (ms)'}).round(1))
+
+        for name, cache in record['caches'].items():
+            st.markdown('**Cache de {}:** {} acertos, {} faltas, {} remoções, {} entradas ({:.1f} de {:.0f} MB)'.format(
+                name, cache['hits'], cache['misses'], cache['evictions'], cache['entries'],
+                cache['bytes'] / 1024 ** 2, cache['budget_bytes'] / 1024 ** 2))
+
+def read_records(log_path=PROFILE_LOG):
+    """
+        Registros do log em um dataframe com uma linha por seção (time, page, session, name, ms)
+    """
+    rows = []
+    with open(log_path, encoding='utf-8') as file:
+        for line in file:
+            record = json.loads(line)
+            for section in record['sections']:
+                rows.append({'time': record['time'], 'page': record['page'], 'session': record['session'],
+                             'name': section['name'], 'ms': section['ms']})
+            rows.append({'time': record['time'], 'page': record['page'], 'session': record['session'],
+                         'name': 'total', 'ms': record['total_ms']})
+
+    return pd.DataFrame(rows, columns=['time', 'page', 'session', 'name', 'ms'])
+
+def summarize(records):
+    """
+        Quantidade de execuções, percentis e máximo do tempo de cada seção de cada página
+    """
+    grouped = records.groupby(['page', 'name'], sort=False)['ms']
+    reruns = grouped.size()
+
+    # unstack ordena as linhas: volta para a ordem das seções na página
+    summary = grouped.quantile(SUMMARY_PERCENTILES).unstack().reindex(reruns.index)
+    summary.columns = ['p{:g}'.format(q * 100) for q in SUMMARY_PERCENTILES]
+    summary.insert(0, 'reruns', reruns)
+    summary['max'] = grouped.max()
+
+    return summary.round(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', default=os.environ.get(PROFILE_LOG_ENV, PROFILE_LOG))
+    args = parser.parse_args()
+
+    print(summarize(read_records(args.log)).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""Pirâmide de agregação espacial dos restaurantes para o mapa.
+
+    Os restaurantes são agrupados em células de uma grade em projeção Web Mercator, em vários níveis de resolução
+    (nível L = grade de 2^L x 2^L células, igual aos tiles do mapa no zoom L). As células do nível mais fino são
+    calculadas uma única vez e os níveis mais grossos saem delas dividindo as coordenadas por 2 (quadtree).
+
+    Cada linha da pirâmide guarda, além da célula, os códigos de país, faixa de nota, faixa de preço e preço inválido,
+    de modo que os filtros da barra lateral são aplicados sobre as células já agregadas, sem reagrupar os pontos
+    originais. As faixas são as de eat_out.buckets. Quando um limite de nota ou preço fica dentro de uma faixa, os
+    restaurantes dessa faixa de ponta que ficam fora do filtro são descontados das suas células em cada nível
+    (a pirâmide guarda a célula do nível mais fino, os códigos e os valores de cada restaurante), então os filtros
+    dos sliders são exatos com qualquer limite.
+
+    Os níveis ficam separados, do mais grosso ao mais fino, e só são guardados enquanto o total de linhas não passa
+    da quantidade de restaurantes (MAX_ROWS_RATIO): nos níveis mais finos quase cada restaurante é uma linha, e
+    o navegador continua mostrando o nível mais fino guardado quando o zoom passa dele. Uma consulta percorre os
+    níveis pedidos a partir do mais grosso e para no primeiro que passa de max_cells células, sem olhar os seguintes.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import pandas         as pd
+import streamlit      as st
+
+from eat_out.data           import dataset_version, load_clean_restaurants
+from eat_out.buckets        import bucket_edges, bucketize, code_range
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+PYRAMID_COLUMNS = ['country', 'latitude', 'longitude', 'aggregate_rating', 'price_brl', 'price_outlier']
+
+MIN_LEVEL = 0
+MAX_LEVEL = 16
+
+# total de linhas guardadas, em relação à quantidade de restaurantes
+MAX_ROWS_RATIO = 1.0
+
+# latitude máxima representável em Web Mercator
+MAX_LATITUDE = 85.05112878
+
+# medidas somadas em cada célula, com a coluna do dataset somada (None: uma unidade por restaurante)
+MEASURES = {
+'count': None,
+'rating_sum': 'aggregate_rating',
+'price_sum': 'price_brl',
+'lat_sum': 'latitude',
+'lng_sum': 'longitude',
+}
+
+# coluna do dataset de cada código de faixa
+BUCKET_COLUMNS = {
+'rating': 'aggregate_rating',
+'price': 'price_brl',
+}
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class LocationPyramid:
+    """
+        Células agregadas (count, soma das notas, soma dos preços, soma das coordenadas) por nível, país,
+        faixa de nota, faixa de preço e flag de preço inválido. Construída uma vez por versão do dataset e consultada
+        a cada filtro.
+    """
+
+    def __init__(self, df, min_level=MIN_LEVEL, max_level=MAX_LEVEL, max_rows_ratio=MAX_ROWS_RATIO):
+        country = df['country'].astype('category')
+        self.countries = list(country.cat.categories)
+        self.edges = bucket_edges(df)
+
+        x, y = tile_coordinates(df['latitude'].to_numpy(dtype=float), df['longitude'].to_numpy(dtype=float), max_level)
+        base = pd.DataFrame({
+            'x': x,
+            'y': y,
+            'country': country.cat.codes.to_numpy(dtype=np.int16),
+            'rating': bucketize(df['aggregate_rating'], self.edges['aggregate_rating']).astype(np.int16),
+            'price': bucketize(df['price_brl'], self.edges['price_brl']).astype(np.int16),
+            'outlier': df['price_outlier'].to_numpy(dtype=np.int8),
+            'count': np.ones(len(df), dtype=np.int64),
+            'rating_sum': df['aggregate_rating'].to_numpy(dtype=float),
+            'price_sum': df['price_brl'].to_numpy(dtype=float),
+            'lat_sum': df['latitude'].to_numpy(dtype=float),
+            'lng_sum': df['longitude'].to_numpy(dtype=float),
+        })
+
+        # por restaurante, para refinar as faixas das pontas: célula do nível mais fino, códigos e valores
+        self.tile_level = max_level
+        self.rows = base[['x', 'y', 'country', 'rating', 'price', 'outlier']].astype(
+            {'x': np.int32, 'y': np.int32, 'outlier': bool})
+        self.row_values = {col: df[col].to_numpy(dtype=float) for col in MEASURES.values() if col}
+
+        # todos os níveis, do mais fino ao mais grosso
+        rolled = {}
+        cells = rollup(base)
+        for level in range(max_level, min_level - 1, -1):
+            if level < max_level:
+                cells = rollup(cells.assign(x=cells['x'] // 2, y=cells['y'] // 2))
+            rolled[level] = cells
+
+        # guardados do mais grosso ao mais fino, até o limite de linhas (o nível mais grosso sempre fica)
+        self.levels = {}
+        rows = 0
+        for level in range(min_level, max_level + 1):
+            rows += len(rolled[level])
+            if self.levels and rows > max_rows_ratio * len(df):
+                break
+            self.levels[level] = PyramidLevel(rolled[level])
+
+        self.min_level = min_level
+        self.max_level = max(self.levels)
+
+    def query(self, countries=None, rating_range=None, price_range=None, levels=None, drop_outliers=False, max_cells=None):
+        """
+            Células por nível para os filtros informados, com count, nota média, preço médio e centróide.
+            Os filtros de nota e preço são exatos com qualquer limite (as faixas das pontas são refinadas).
+            Os níveis são consultados do mais grosso ao mais fino; com max_cells a consulta para no primeiro nível
+            com mais células que isso (incluído só quando é o primeiro).
+        """
+        codes = None
+        if countries is not None:
+            codes = [self.countries.index(country) for country in countries if country in self.countries]
+
+        value_ranges, ranges = {}, {}
+        for column, value_range in (('rating', rating_range), ('price', price_range)):
+            if value_range is not None:
+                value_ranges[column] = value_range
+                ranges[column] = code_range(value_range[0], value_range[1], self.edges[BUCKET_COLUMNS[column]])
+
+        excluded = self.excluded_rows(codes, value_ranges, ranges, drop_outliers)
+
+        results = []
+        for level in sorted(self.levels if levels is None else set(levels) & set(self.levels)):
+            shift = self.tile_level - level
+            removed = (excluded['keys'] >> np.uint64(2 * shift), excluded['measures'])
+            cells = self.levels[level].select(codes, ranges, drop_outliers, removed)
+            if max_cells is not None and len(cells) > max_cells and results:
+                break
+
+            results.append(cells.assign(level=np.int8(level)))
+            if max_cells is not None and len(cells) > max_cells:
+                break
+
+        columns = ['level', 'count', 'latitude', 'longitude', 'aggregate_rating', 'price_brl']
+        if not results:
+            return pd.DataFrame(columns=columns)
+
+        return pd.concat(results, ignore_index=True)[columns]
+
+    def excluded_rows(self, codes, value_ranges, ranges, drop_outliers):
+        """
+            Restaurantes que passam nos filtros de código (país, faixas, preço inválido) mas estão em uma faixa de
+            ponta e fora do filtro de valores: chaves das células no nível mais fino (ordenadas, então continuam
+            ordenadas em todos os níveis) e medidas a descontar das células
+        """
+        rows = self.rows
+        outside = [np.empty(0, dtype=np.int64)]
+        for column, (low, high) in value_ranges.items():
+            values, bucket = self.row_values[BUCKET_COLUMNS[column]], rows[column].to_numpy()
+            first, last = ranges[column]
+            if first % 2:
+                candidates = np.flatnonzero(bucket == first)
+                outside.append(candidates[values[candidates] < low])
+            if last % 2:
+                candidates = np.flatnonzero(bucket == last)
+                outside.append(candidates[values[candidates] > high])
+        outside = np.unique(np.concatenate(outside))
+
+        # só os que a seleção por códigos incluiria
+        kept = np.ones(len(outside), dtype=bool)
+        if codes is not None:
+            kept &= np.isin(rows['country'].to_numpy()[outside], codes)
+        for column, (first, last) in ranges.items():
+            bucket = rows[column].to_numpy()[outside]
+            kept &= (bucket >= first) & (bucket <= last)
+        if drop_outliers:
+            kept &= ~rows['outlier'].to_numpy()[outside]
+        outside = outside[kept]
+
+        keys = cell_keys(rows['x'].to_numpy()[outside], rows['y'].to_numpy()[outside])
+        order = np.argsort(keys, kind='stable')
+        outside = outside[order]
+
+        return {
+            'keys': keys[order],
+            'measures': {measure: np.ones(len(outside)) if col is None else self.row_values[col][outside]
+                         for measure, col in MEASURES.items()},
+        }
+
+    def nbytes(self):
+        """
+            Memória ocupada pelos arrays dos níveis guardados e pelas linhas de cada restaurante (sem os valores,
+            que são as colunas do dataframe)
+        """
+        return sum(level.nbytes() for level in self.levels.values()) + int(self.rows.memory_usage(index=False).sum())
+
+class PyramidLevel:
+    """
+        Linhas de um nível da pirâmide: a célula espacial de cada linha (0 .. n_cells - 1, na ordem das chaves das
+        células), os códigos dos filtros e as medidas, em arrays NumPy. A consulta soma as medidas por célula com
+        np.bincount.
+    """
+
+    def __init__(self, cells):
+        self.keys, cell = np.unique(cell_keys(cells['x'].to_numpy(), cells['y'].to_numpy()), return_inverse=True)
+        self.cell = cell.astype(np.int32)
+        self.n_cells = len(self.keys)
+        self.country = cells['country'].to_numpy(dtype=np.int16)
+        self.rating = cells['rating'].to_numpy(dtype=np.int16)
+        self.price = cells['price'].to_numpy(dtype=np.int16)
+        self.outlier = cells['outlier'].to_numpy(dtype=bool)
+        self.measures = {col: cells[col].to_numpy(dtype=float) for col in MEASURES}
+
+    def __len__(self):
+        return len(self.cell)
+
+    def select(self, codes=None, ranges=None, drop_outliers=False, removed=None):
+        """
+            Células espaciais com pelo menos um restaurante nos filtros, com as médias e o centróide.
+            removed = (chaves das células, medidas) dos restaurantes a descontar (ver LocationPyramid.excluded_rows).
+        """
+        rows_selected = np.ones(len(self), dtype=bool)
+        if codes is not None:
+            rows_selected &= np.isin(self.country, codes)
+        for column, (first, last) in (ranges or {}).items():
+            values = getattr(self, column)
+            rows_selected &= (values >= first) & (values <= last)
+        if drop_outliers:
+            rows_selected &= ~self.outlier
+
+        cell = self.cell[rows_selected]
+        sums = {col: np.bincount(cell, weights=values[rows_selected], minlength=self.n_cells)
+                for col, values in self.measures.items()}
+        if removed is not None and len(removed[0]):
+            removed_cell = np.searchsorted(self.keys, removed[0])
+            for col, values in removed[1].items():
+                sums[col] -= np.bincount(removed_cell, weights=values, minlength=self.n_cells)
+        present = sums['count'] > 0
+        count = sums['count'][present]
+
+        return pd.DataFrame({
+            'count': count.astype(np.int64),
+            'latitude': sums['lat_sum'][present] / count,
+            'longitude': sums['lng_sum'][present] / count,
+            'aggregate_rating': sums['rating_sum'][present] / count,
+            'price_brl': sums['price_sum'][present] / count,
+        })
+
+    def nbytes(self):
+        return (self.keys.nbytes + self.cell.nbytes + self.country.nbytes + self.rating.nbytes + self.price.nbytes + self.outlier.nbytes
+                + sum(values.nbytes for values in self.measures.values()))
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def tile_coordinates(latitude, longitude, level):
+    """
+        Coordenadas inteiras (x, y) da célula Web Mercator de cada ponto no nível informado
+    """
+    n = 2 ** level
+    lat = np.radians(np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.floor((longitude + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n)
+
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+def cell_keys(x, y):
+    """
+        Chave de cada célula (x, y) de um nível na ordem Z (bits de x e y intercalados): a célula do nível de cima
+        que contém (x, y) tem a chave >> 2, então chaves ordenadas continuam ordenadas nos níveis mais grossos
+    """
+    return spread_bits(x) | (spread_bits(y) << np.uint64(1))
+
+def spread_bits(values):
+    """
+        Intercala um bit zero entre os bits de cada valor (até 32 bits)
+    """
+    v = np.asarray(values).astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+
+    return v
+
+def rollup(cells):
+    """
+        Soma as medidas das linhas com a mesma célula, país, faixa de nota, faixa de preço e flag de preço inválido
+    """
+    return cells.groupby(['x', 'y', 'country', 'rating', 'price', 'outlier'], sort=False).sum().reset_index()
+
+@st.experimental_singleton(show_spinner=False, max_entries=2)
+def _cached_location_pyramid(version):
+    # o argumento version só participa da chave do cache
+    return LocationPyramid(load_clean_restaurants(columns=PYRAMID_COLUMNS))
+
+def load_location_pyramid():
+    """
+        Pirâmide da versão atual do dataset, compartilhada entre todas as sessões
+    """
+    return _cached_location_pyramid(dataset_version())
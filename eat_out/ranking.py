@@ -0,0 +1,78 @@
+"""Rankings (top-k e bottom-k) das agregações exibidas nas páginas.
+
+    Em vez de ordenar a agregação inteira para ler as 10 primeiras linhas, os candidatos são escolhidos por seleção
+    parcial (np.partition, O(n)): o k-ésimo valor define o corte e só as linhas até o corte, incluindo todos os empates
+    com ele, são ordenadas. rank_ends devolve as duas pontas do ranking com uma única partição.
+
+    Empates são desfeitos pelo índice da agregação (país, cidade, culinária...) em ordem crescente, então o mesmo
+    filtro sempre produz o mesmo ranking.
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+
+# tamanho padrão dos rankings das páginas
+TOP_K = 10
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def top_k(df, column, k=TOP_K, ascending=False):
+    """
+        Equivalente determinístico de df.sort_values(by=column, ascending=ascending).reset_index().head(k).
+        Com k=None o ranking completo é devolvido. Linhas com column NaN ficam de fora.
+    """
+    values, valid = ranking_values(df, column)
+
+    if k is None or k >= len(values):
+        return ordered(df.iloc[valid], column, ascending, k)
+
+    kth = k - 1 if ascending else len(values) - k
+    threshold = np.partition(values, kth)[kth]
+    selected = values <= threshold if ascending else values >= threshold
+
+    return ordered(df.iloc[valid[selected]], column, ascending, k)
+
+def rank_ends(df, column, k=TOP_K):
+    """
+        Os k maiores (ordem decrescente) e os k menores (ordem crescente) valores de column, com uma única partição
+    """
+    values, valid = ranking_values(df, column)
+    n = len(values)
+
+    if k >= n:
+        return ordered(df.iloc[valid], column, False, k), ordered(df.iloc[valid], column, True, k)
+
+    partitioned = np.partition(values, [k - 1, n - k])
+    largest = ordered(df.iloc[valid[values >= partitioned[n - k]]], column, False, k)
+    smallest = ordered(df.iloc[valid[values <= partitioned[k - 1]]], column, True, k)
+
+    return largest, smallest
+
+def ranking_values(df, column):
+    """
+        Valores da coluna e as posições das linhas sem NaN
+    """
+    values = df[column].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+
+    return values[valid], valid
+
+def ordered(candidates, column, ascending, k):
+    """
+        Ordena os candidatos pela coluna e, nos empates, pelo índice; devolve as k primeiras linhas com reset_index()
+    """
+    n_keys = candidates.index.nlevels
+    candidates = candidates.reset_index()
+    keys = list(candidates.columns[:n_keys])
+    ranking = candidates.sort_values(by=[column] + keys, ascending=[ascending] + [True] * len(keys), kind='mergesort')
+
+    return ranking.head(k).reset_index(drop=True) if k is not None else ranking.reset_index(drop=True)
@@ -0,0 +1,121 @@
+"""Schema tipado do dataframe limpo.
+
+    Colunas de texto com poucos valores distintos viram category, as flags 0/1 viram int8 e os inteiros e
+    coordenadas são reduzidos a tipos menores. Os inteiros só usam o tipo de COLUMN_TYPES quando todos os valores
+    cabem nele; senão a coluna fica int64 (um restaurant_id acima de 2^31 não pode virar negativo).
+    aggregate_rating, average_cost_for_two, exchange_rate e price_brl continuam float64: são exibidos e comparados
+    com os valores dos filtros.
+
+    Para ver o relatório de memória por coluna (a partir da raiz do repositório):
+        python -m eat_out.schema
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import pandas         as pd
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+CATEGORY_COLUMNS = ['country', 'city', 'cuisines', 'currency', 'price_range', 'rating_color', 'rating_text']
+
+FLAG_COLUMNS = ['has_table_booking', 'has_online_delivery', 'is_delivering_now', 'switch_to_order_menu']
+
+COLUMN_TYPES = {
+'restaurant_id': 'int32',
+'country_code': 'int16',
+'votes': 'int32',
+'latitude': 'float32',
+'longitude': 'float32',
+}
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def integer_columns():
+    """
+        Colunas de COLUMN_TYPES com tipo inteiro, cujo tipo depende do intervalo dos valores
+    """
+    return [col for col, dtype in COLUMN_TYPES.items() if np.issubdtype(np.dtype(dtype), np.integer)]
+
+def column_type(col, bounds):
+    """
+        Tipo da coluna col de COLUMN_TYPES. Para os inteiros, bounds (mínimo, máximo) precisa caber no tipo;
+        senão a coluna fica int64
+    """
+    dtype = np.dtype(COLUMN_TYPES[col])
+    if not np.issubdtype(dtype, np.integer) or bounds is None:
+        return dtype.name
+
+    info = np.iinfo(dtype)
+    low, high = bounds
+
+    return dtype.name if info.min <= low and high <= info.max else 'int64'
+
+def apply_schema(df, categories=None, bounds=None):
+    """
+        Converte as colunas do dataframe limpo para os tipos compactos definidos neste módulo.
+        Colunas ausentes são ignoradas, então a função também serve para recortes do dataframe.
+        Com categories (coluna -> lista de categorias) as colunas category usam essas categorias fixas, para que
+        pedaços diferentes do mesmo dataset tenham o mesmo dicionário (ver eat_out.ingest).
+        Do mesmo jeito, bounds (coluna -> (mínimo, máximo)) fixa o intervalo usado para escolher o tipo dos inteiros;
+        sem ele o intervalo é o do próprio dataframe.
+    """
+    categories = categories or {}
+    bounds = dict(bounds or {})
+    dtypes = {col: pd.CategoricalDtype(categories[col]) if col in categories else 'category'
+              for col in CATEGORY_COLUMNS if col in df.columns}
+    dtypes.update({col: 'int8' for col in FLAG_COLUMNS if col in df.columns})
+    for col in integer_columns():
+        if col in df.columns and col not in bounds and len(df):
+            bounds[col] = (df[col].min(), df[col].max())
+    dtypes.update({col: column_type(col, bounds.get(col)) for col in COLUMN_TYPES if col in df.columns})
+
+    return df.astype(dtypes)
+
+def decategorize(df):
+    """
+        Converte as colunas category de volta para texto. Usada nos resultados agregados enviados ao plotly,
+        que não aceita categorias sem ocorrência no agrupamento por cor.
+    """
+    dtypes = {col: 'object' for col in df.columns if pd.api.types.is_categorical_dtype(df[col])}
+
+    return df.astype(dtypes) if dtypes else df
+
+def memory_report(before, after):
+    """
+        Compara os bytes ocupados por coluna antes e depois da conversão de tipos
+    """
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_before': before.memory_usage(index=False, deep=True),
+        'bytes_after': after.memory_usage(index=False, deep=True),
+    })
+    total = pd.DataFrame({
+        'dtype_before': [''],
+        'dtype_after': [''],
+        'bytes_before': [report['bytes_before'].sum()],
+        'bytes_after': [report['bytes_after'].sum()],
+    }, index=['TOTAL'])
+    report = pd.concat([report, total])
+    report['reduction'] = 1 - report['bytes_after'] / report['bytes_before']
+
+    return report
+
+def main():
+    from eat_out.data import build_clean_restaurants
+
+    before = build_clean_restaurants(typed=False)
+    after = apply_schema(before)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_rows', None):
+        print(memory_report(before, after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Índice de restaurantes semelhantes (vizinhos mais próximos em um espaço de atributos normalizados).
+
+    A distância entre dois restaurantes é a euclidiana sobre:
+        - faixa de preço (ordinal), log do preço em R$, nota média e log dos votos, padronizados (média 0, desvio 1);
+          preços marcados como inválidos (price_outlier) ficam na média;
+        - entrega online, reserva de mesa e entrega no momento (0/1);
+        - a posição: a corda entre os dois pontos em unidades de LOCATION_SCALE_KM;
+        - a culinária (uma por restaurante): CUISINE_WEIGHT² somado ao quadrado da distância quando as culinárias são
+          diferentes, o mesmo que uma coluna one-hot por culinária, sem guardar as colunas;
+    cada grupo multiplicado pelo seu peso em FEATURE_WEIGHTS. Os atributos ficam pré-calculados em uma matriz float32
+    (FEATURE_COLUMNS) e a posição vem do índice espacial (eat_out.spatial), na mesma ordem das células da grade.
+
+    Como o termo da posição sozinho já limita a distância por baixo, a busca é exata sem olhar o dataset inteiro:
+    os candidatos são os restaurantes das células em volta do restaurante consultado, e o raio cresce até que o
+    N-ésimo mais semelhante esteja mais perto que qualquer restaurante fora do raio poderia estar. A distância aos
+    candidatos é calculada em blocos de BLOCK_ROWS linhas, como ||f - q||² direto (a expansão com produto escalar
+    perde precisão em float32 com o termo da posição).
+
+    O índice é construído uma vez por versão do dataset e compartilhado entre as sessões (load_similarity_index).
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import streamlit      as st
+
+from eat_out.data           import PRICE_TYPES, dataset_version, load_clean_restaurants
+from eat_out.spatial        import EARTH_RADIUS_KM, RADIUS_GROWTH, load_spatial_index, haversine_term
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+SIMILARITY_COLUMNS = ['cuisines', 'price_range', 'price_brl', 'price_outlier', 'aggregate_rating', 'votes',
+                      'has_online_delivery', 'has_table_booking', 'is_delivering_now']
+
+# atributos da matriz, na ordem das colunas
+FEATURE_COLUMNS = ['price_range', 'price_brl', 'aggregate_rating', 'votes', 'has_online_delivery',
+                   'has_table_booking', 'is_delivering_now']
+
+# nível de cada faixa de preço; faixas fora de PRICE_TYPES são 'gourmet', a mais cara
+PRICE_LEVELS = {name: level for level, name in PRICE_TYPES.items()}
+PRICE_LEVELS['gourmet'] = len(PRICE_TYPES) + 1
+
+# peso de cada grupo de atributos na distância
+FEATURE_WEIGHTS = {
+'price_range': 1.0,
+'price_brl': 1.0,
+'aggregate_rating': 1.0,
+'votes': 0.5,
+'has_online_delivery': 0.5,
+'has_table_booking': 0.5,
+'is_delivering_now': 0.25,
+'location': 1.0,
+}
+
+# culinárias diferentes somam CUISINE_WEIGHT² ao quadrado da distância
+CUISINE_WEIGHT = 1.5
+
+# distância (km) entre dois restaurantes que vale uma unidade na distância de atributos
+LOCATION_SCALE_KM = 10
+
+# linhas por bloco no cálculo das distâncias
+BLOCK_ROWS = 262144
+
+# quantidade de restaurantes esperada no primeiro raio da busca, por restaurante pedido
+CANDIDATES_PER_RESULT = 16
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class SimilarityIndex:
+    """
+        Atributos normalizados e culinária de cada restaurante, na ordem do índice espacial
+    """
+
+    def __init__(self, df, spatial):
+        if len(df) != spatial.size:
+            raise ValueError('o dataframe ({} linhas) e o índice espacial ({} linhas) não são do mesmo dataset'.format(
+                len(df), spatial.size))
+
+        self.spatial = spatial
+        self.labels = spatial.labels
+
+        # restaurantes sem coordenadas ficam fora do índice espacial e, portanto, das buscas
+        rows = spatial.rows
+        self.features = feature_matrix(df)[rows]
+        self.cuisines = df['cuisines'].astype('category').cat.codes.to_numpy()[rows]
+        self.positions = np.full(len(df), -1, dtype=np.int32)
+        self.positions[rows] = np.arange(len(rows), dtype=np.int32)
+
+        # quadrado da distância de atributos = location_scale * a, com a o termo haversine entre as posições
+        self.location_scale = (FEATURE_WEIGHTS['location'] * 2 * EARTH_RADIUS_KM / LOCATION_SCALE_KM) ** 2
+
+    def position(self, label):
+        """
+            Posição nos arrays do índice do restaurante com o rótulo label (o índice do dataframe está em ordem crescente)
+        """
+        row = int(np.searchsorted(self.labels, label))
+        if row >= len(self.labels) or self.labels[row] != label or self.positions[row] < 0:
+            raise KeyError(label)
+
+        return int(self.positions[row])
+
+    def distances(self, position, candidates):
+        """
+            Quadrado da distância entre o restaurante position e cada candidato, em blocos de BLOCK_ROWS
+        """
+        query = self.features[position]
+        lat, lon = self.spatial.lat[position], self.spatial.lon[position]
+        penalty = np.float32(CUISINE_WEIGHT ** 2)
+
+        distances = np.empty(len(candidates), dtype=np.float32)
+        for start in range(0, len(candidates), BLOCK_ROWS):
+            block = candidates[start:start + BLOCK_ROWS]
+            diff = self.features[block] - query
+
+            distances[start:start + len(block)] = (
+                np.einsum('ij,ij->i', diff, diff)
+                + penalty * (self.cuisines[block] != self.cuisines[position])
+                + self.location_scale * haversine_term(lat, lon, self.spatial.lat[block], self.spatial.lon[block])
+            )
+
+        return distances
+
+    def similar(self, label, n=10, selected=None):
+        """
+            Os n restaurantes mais semelhantes ao restaurante label, do mais ao menos semelhante, sem ele mesmo.
+            selected é uma máscara booleana opcional das linhas do dataframe (os filtros da página).
+            Devolve (rótulos do índice do dataframe, distâncias).
+        """
+        position = self.position(label)
+        lat, lon = np.degrees(self.spatial.lat[position]), np.degrees(self.spatial.lon[position])
+
+        radius_km = self.spatial.initial_radius(lat, lon, CANDIDATES_PER_RESULT * n)
+        n_covered = -1
+        while True:
+            # as células de um raio maior contêm as do raio menor: mesma quantidade, mesmos candidatos
+            covered = self.spatial.candidates(lat, lon, radius_km)
+            if len(covered) != n_covered:
+                n_covered = len(covered)
+                candidates = covered[covered != position]
+                if selected is not None:
+                    candidates = candidates[selected[self.spatial.rows[candidates]]]
+                distances = self.distances(position, candidates)
+
+                best = np.argpartition(distances, n - 1)[:n] if len(candidates) > n else np.arange(len(candidates))
+
+            # um restaurante fora do raio tem, só com o termo da posição, distância² >= bound
+            bound = self.location_scale * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2) ** 2
+            if radius_km >= np.pi * EARTH_RADIUS_KM or (len(best) >= n and distances[best].max() <= bound):
+                break
+
+            radius_km *= RADIUS_GROWTH
+
+        order = best[np.argsort(distances[best], kind='stable')]
+
+        return self.labels[self.spatial.rows[candidates[order]]], np.sqrt(distances[order])
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def standardize(values):
+    """
+        (valores - média) / desvio padrão, em float32; uma coluna constante vira zeros
+    """
+    values = np.asarray(values, dtype=np.float64)
+    std = values.std()
+
+    return ((values - values.mean()) / (std if std > 0 else 1)).astype(np.float32)
+
+def feature_matrix(df):
+    """
+        Matriz (restaurantes x FEATURE_COLUMNS) float32 com os atributos padronizados e ponderados por FEATURE_WEIGHTS
+    """
+    price_level = df['price_range'].astype(str).map(PRICE_LEVELS).fillna(PRICE_LEVELS['gourmet'])
+
+    # preços inválidos ficam na média dos válidos, e então em zero depois de padronizados
+    price = np.log1p(df['price_brl'].to_numpy(dtype=np.float64).clip(min=0))
+    outlier = df['price_outlier'].to_numpy(dtype=bool) | ~np.isfinite(price)
+    price[outlier] = price[~outlier].mean() if (~outlier).any() else 0
+
+    columns = {
+        'price_range': standardize(price_level),
+        'price_brl': standardize(price),
+        'aggregate_rating': standardize(df['aggregate_rating']),
+        'votes': standardize(np.log1p(df['votes'].to_numpy(dtype=np.float64))),
+        'has_online_delivery': df['has_online_delivery'].to_numpy(dtype=np.float32),
+        'has_table_booking': df['has_table_booking'].to_numpy(dtype=np.float32),
+        'is_delivering_now': df['is_delivering_now'].to_numpy(dtype=np.float32),
+    }
+
+    features = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for i, col in enumerate(FEATURE_COLUMNS):
+        features[:, i] = columns[col] * FEATURE_WEIGHTS[col]
+
+    return features
+
+@st.experimental_singleton(show_spinner=False, max_entries=2)
+def _cached_similarity_index(version):
+    # o argumento version só participa da chave do cache
+    return SimilarityIndex(load_clean_restaurants(columns=SIMILARITY_COLUMNS), load_spatial_index())
+
+def load_similarity_index():
+    """
+        Índice de semelhança da versão atual do dataset, compartilhado entre todas as sessões
+    """
+    return _cached_similarity_index(dataset_version())
@@ -0,0 +1,227 @@
+"""Snapshot colunar (Arrow IPC / Feather v2) do dataframe limpo.
+
+    O snapshot é gravado ao lado do CSV (data/zomato.feather) sem compressão, o que permite abri-lo por memory-map:
+    as colunas numéricas são lidas direto do arquivo e as colunas não solicitadas nunca são tocadas.
+
+    O arquivo é particionado por país: cada lote (record batch) tem linhas de um único país e o nome da coluna de
+    partição fica nos metadados (PARTITION_KEY). Com read_snapshot(path, columns, countries) só os lotes dos países
+    selecionados são lidos. Dentro do arquivo as linhas ficam agrupadas por país; a ordem original (a do CSV) é
+    restaurada pelo índice na leitura.
+
+    Para reconstruir manualmente (a partir da raiz do repositório):
+        python -m eat_out.snapshot [--force]
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import os
+import argparse
+import tempfile
+
+import numpy           as np
+import pandas          as pd
+import pyarrow         as pa
+import pyarrow.feather as feather
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+VERSION_KEY = b'eat_out.dataset_version'
+INDEX_COLUMN = '__index_level_0__'
+
+# coluna de partição do snapshot, registrada nos metadados do arquivo
+PARTITION_KEY = b'eat_out.partition_by'
+PARTITION_COLUMN = 'country'
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class SnapshotWriter:
+    """
+        Grava o snapshot lote a lote, para dataframes que não cabem inteiros na memória (ver eat_out.ingest).
+        O primeiro lote define o schema; os seguintes são convertidos para ele. Como em write_snapshot, a escrita é
+        feita em um arquivo temporário, trocado de forma atômica em close().
+        Com partition_by, cada dataframe recebido é dividido em lotes de um único valor da coluna.
+    """
+
+    def __init__(self, path, version=None, partition_by=None):
+        self.path = path
+        self.version = version
+        self.partition_by = partition_by
+        self.schema = None
+        self.writer = None
+        self.rows = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self.tmp_path = tempfile.mkstemp(suffix='.feather', dir=directory)
+        os.close(fd)
+
+    def write(self, df):
+        """
+            Acrescenta um lote (dataframe com as mesmas colunas dos anteriores) ao snapshot
+        """
+        if self.schema is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=True)
+            metadata = dict(schema.metadata or {})
+            if self.version is not None:
+                metadata[VERSION_KEY] = self.version.encode()
+            if self.partition_by is not None:
+                metadata[PARTITION_KEY] = self.partition_by.encode()
+            self.schema = schema.with_metadata(metadata)
+            self.writer = pa.ipc.new_file(self.tmp_path, self.schema)
+
+        if self.partition_by is None:
+            self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=True))
+        else:
+            # uma única conversão das linhas ordenadas pela partição, fatiada em um lote por valor
+            codes, _ = pd.factorize(df[self.partition_by], sort=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(codes))])
+            table = pa.Table.from_pandas(df.take(order), schema=self.schema, preserve_index=True)
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                self.writer.write_table(table.slice(start, stop - start))
+
+        self.rows += len(df)
+
+    def close(self):
+        """
+            Finaliza o arquivo e o move para o caminho definitivo
+        """
+        if self.writer is None:
+            raise ValueError('nenhum lote foi gravado em {}'.format(self.path))
+
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+        return self.path
+
+    def abort(self):
+        """
+            Descarta o arquivo temporário sem tocar no snapshot existente
+        """
+        if self.writer is not None:
+            self.writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def snapshot_path(csv_path):
+    """
+        Caminho do snapshot correspondente ao CSV: mesmo diretório e mesmo nome, extensão .feather
+    """
+    return os.path.splitext(csv_path)[0] + '.feather'
+
+def read_schema(path):
+    """
+        Lê apenas o schema do snapshot, sem carregar nenhuma coluna
+    """
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema
+
+def snapshot_version(path):
+    """
+        Versão dos dados de entrada gravada no snapshot, ou None se o arquivo não existir ou não tiver a versão
+    """
+    if not os.path.exists(path):
+        return None
+
+    metadata = read_schema(path).metadata or {}
+    version = metadata.get(VERSION_KEY)
+
+    return version.decode() if version is not None else None
+
+def snapshot_is_stale(path, version):
+    """
+        O snapshot está desatualizado quando não existe ou quando foi gerado a partir de outra versão do CSV/JSON
+    """
+    return snapshot_version(path) != version
+
+def snapshot_partitions(path):
+    """
+        Lotes de cada partição do snapshot ({valor: [índices dos lotes]}), ou None se o arquivo não for particionado
+    """
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        partition_by = (reader.schema.metadata or {}).get(PARTITION_KEY)
+        if partition_by is None:
+            return None
+
+        partitions = {}
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if batch.num_rows:
+                value = batch.column(partition_by.decode())[0].as_py()
+                partitions.setdefault(value, []).append(i)
+
+    return partitions
+
+def write_snapshot(df, path, version, partition_by=PARTITION_COLUMN):
+    """
+        Grava o dataframe como Arrow IPC sem compressão, preservando o índice, registrando a versão dos dados de entrada
+        e dividindo as linhas em lotes por partition_by (None grava sem partição).
+        A escrita é feita em um arquivo temporário e trocada de forma atômica, já que várias sessões podem ler o arquivo.
+    """
+    writer = SnapshotWriter(path, version, partition_by if partition_by in df.columns else None)
+    try:
+        writer.write(df)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+    return path
+
+def read_snapshot(path, columns=None, countries=None):
+    """
+        Lê o snapshot por memory-map, carregando apenas as colunas solicitadas (todas quando columns é None) e,
+        num snapshot particionado, apenas os lotes dos países em countries (todos quando countries é None)
+    """
+    schema = read_schema(path)
+    if columns is not None:
+        columns = list(columns)
+        if INDEX_COLUMN in schema.names and INDEX_COLUMN not in columns:
+            columns.append(INDEX_COLUMN)
+
+    partitions = snapshot_partitions(path) if countries is not None else None
+    if partitions is None:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        selected = sorted(i for country in set(countries) for i in partitions.get(country, []))
+        batches = [reader.get_batch(i) for i in selected]
+        if not batches and reader.num_record_batches:
+            # seleção vazia: um lote sem linhas mantém as categorias das colunas category
+            batches = [reader.get_batch(0).slice(0, 0)]
+        table = pa.Table.from_batches(batches, schema=schema)
+        if columns is not None:
+            table = table.select(columns)
+
+    df = table.to_pandas(split_blocks=True)
+
+    # lotes agrupados por partição: a ordem original das linhas volta pelo índice
+    if PARTITION_KEY in (schema.metadata or {}) and not df.index.is_monotonic_increasing:
+        df = df.take(np.argsort(df.index.to_numpy(), kind='stable'))
+
+    return df
+
+def main():
+    from eat_out.data import CSV_PATH, CURRENCY_PATH, build_snapshot
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--currency', default=CURRENCY_PATH)
+    parser.add_argument('--force', action='store_true', help='reconstrói mesmo que o snapshot esteja atualizado')
+    args = parser.parse_args()
+
+    path, built = build_snapshot(args.csv, args.currency, force=args.force)
+    print('{} {}'.format('snapshot gerado:' if built else 'snapshot atualizado:', path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Índice espacial dos restaurantes para buscas por proximidade (raio e k mais próximos).
+
+    Os restaurantes são agrupados em uma grade de células de GRID_DEGREES x GRID_DEGREES graus e ordenados pela
+    célula, de forma que cada faixa de células vizinhas em uma mesma linha da grade é um intervalo contínuo dos
+    arrays. Uma busca:
+        1. calcula as linhas e colunas da grade que cobrem o círculo de busca (com a volta no meridiano 180);
+        2. junta os intervalos dessas células em uma lista de candidatos, com um searchsorted por linha da grade;
+        3. refina os candidatos com a distância haversine vetorizada em NumPy.
+    Assim cada busca só calcula a distância para os restaurantes das células próximas, e não para o dataset inteiro.
+
+    Os k mais próximos são uma busca por raio que cresce até achar k restaurantes; o primeiro raio é estimado pela
+    densidade de restaurantes na célula do ponto. As duas buscas aceitam uma máscara das linhas selecionadas nos
+    filtros da barra lateral (FilterIndex.mask), aplicada aos candidatos antes da distância.
+
+    O índice é construído uma vez por versão do dataset e compartilhado entre as sessões (load_spatial_index), e
+    guarda 12 bytes por restaurante (linha e coordenadas em float32, ~1 m de precisão).
+"""
+
+# ================================================================
+# BIBLIOTECAS
+# ================================================================
+
+import numpy          as np
+import streamlit      as st
+
+from eat_out.data           import dataset_version, load_clean_restaurants
+
+# ================================================================
+# BIBLIOTECA COMPLEMENTAR DE DADOS
+# ================================================================
+SPATIAL_COLUMNS = ['latitude', 'longitude']
+
+# raio médio da Terra, o mesmo do pacote haversine
+EARTH_RADIUS_KM = 6371.0088
+
+# lado das células da grade (0.05 grau ~ 5.5 km no equador)
+GRID_DEGREES = 0.05
+
+# fator de crescimento do raio na busca dos k mais próximos
+RADIUS_GROWTH = 2
+
+# ================================================================
+# CLASSES
+# ================================================================
+
+class SpatialIndex:
+    """
+        Grade de células com os restaurantes ordenados por célula
+    """
+
+    def __init__(self, df):
+        self.labels = df.index.to_numpy()
+        self.size = len(df)
+        self.n_lat = int(round(180 / GRID_DEGREES))
+        self.n_lon = int(round(360 / GRID_DEGREES))
+
+        latitude = df['latitude'].to_numpy(dtype=np.float64)
+        longitude = df['longitude'].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(latitude) & np.isfinite(longitude))
+
+        keys = self.cell_keys(latitude[valid], longitude[valid])
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+
+        # linha (posição no dataframe) e coordenadas em radianos de cada restaurante, na ordem das células
+        self.rows = valid[order].astype(np.int32)
+        self.lat = np.radians(latitude[self.rows]).astype(np.float32)
+        self.lon = np.radians(longitude[self.rows]).astype(np.float32)
+
+        # células não vazias e o início de cada uma nos arrays; cell_starts tem uma posição a mais, o fim da última
+        self.cells, starts = np.unique(keys, return_index=True)
+        self.cell_starts = np.append(starts, len(keys)).astype(np.int64)
+
+    def cell_keys(self, latitude, longitude):
+        """
+            Chave da célula (linha * n_lon + coluna) de cada coordenada em graus
+        """
+        row = np.clip(np.floor((np.asarray(latitude) + 90) / GRID_DEGREES).astype(np.int64), 0, self.n_lat - 1)
+        col = np.floor((np.asarray(longitude) + 180) / GRID_DEGREES).astype(np.int64) % self.n_lon
+
+        return row * self.n_lon + col
+
+    def key_ranges(self, lat, lon, radius_km):
+        """
+            Intervalos [início, fim] de chaves das células que cobrem o círculo de raio radius_km em volta de (lat, lon)
+        """
+        angle = radius_km / EARTH_RADIUS_KM
+        dlat = np.degrees(angle)
+        row_first = max(int(np.floor((lat - dlat + 90) / GRID_DEGREES)), 0)
+        row_last = min(int(np.floor((lat + dlat + 90) / GRID_DEGREES)), self.n_lat - 1)
+        rows = np.arange(row_first, row_last + 1)
+
+        # o círculo alcança um polo ou meia volta: todas as colunas. Senão, a maior variação de longitude do círculo
+        # (sobre a calota esférica) é asin(sin(raio) / cos(lat))
+        cos_lat = np.cos(np.radians(lat))
+        if lat - dlat <= -90 or lat + dlat >= 90 or angle >= np.pi / 2 or np.sin(angle) >= cos_lat:
+            col_ranges = [(0, self.n_lon - 1)]
+        else:
+            dlon = np.degrees(np.arcsin(np.sin(angle) / cos_lat))
+            col_first = int(np.floor((lon - dlon + 180) / GRID_DEGREES))
+            col_last = int(np.floor((lon + dlon + 180) / GRID_DEGREES))
+            if col_last - col_first + 1 >= self.n_lon:
+                col_ranges = [(0, self.n_lon - 1)]
+            elif col_first < 0:
+                col_ranges = [(0, col_last), (col_first + self.n_lon, self.n_lon - 1)]
+            elif col_last >= self.n_lon:
+                col_ranges = [(col_first, self.n_lon - 1), (0, col_last - self.n_lon)]
+            else:
+                col_ranges = [(col_first, col_last)]
+
+        low = np.concatenate([rows * self.n_lon + first for first, _ in col_ranges])
+        high = np.concatenate([rows * self.n_lon + last for _, last in col_ranges])
+
+        return low, high
+
+    def candidates(self, lat, lon, radius_km):
+        """
+            Posições (nos arrays do índice) dos restaurantes das células que cobrem o círculo
+        """
+        low, high = self.key_ranges(lat, lon, radius_km)
+        starts = self.cell_starts[np.searchsorted(self.cells, low, side='left')]
+        ends = self.cell_starts[np.searchsorted(self.cells, high, side='right')]
+
+        return concat_ranges(starts, ends)
+
+    def search(self, lat, lon, radius_km, selected=None):
+        """
+            Posições (nos arrays do índice) e distâncias em km dos restaurantes selecionados a até radius_km, sem ordem
+        """
+        positions = self.candidates(lat, lon, radius_km)
+        if selected is not None:
+            positions = positions[selected[self.rows[positions]]]
+
+        distances = haversine_km(lat, lon, self.lat[positions], self.lon[positions], radians=True)
+        inside = distances <= radius_km
+
+        return positions[inside], distances[inside]
+
+    def within(self, lat, lon, radius_km, selected=None):
+        """
+            Restaurantes a até radius_km de (lat, lon), do mais próximo ao mais distante.
+            selected é uma máscara booleana opcional das linhas do dataframe (os filtros da página).
+            Devolve (rótulos do índice do dataframe, distâncias em km).
+        """
+        positions, distances = self.search(lat, lon, radius_km, selected)
+        order = np.argsort(distances, kind='stable')
+
+        return self.labels[self.rows[positions[order]]], distances[order]
+
+    def nearest(self, lat, lon, k, selected=None):
+        """
+            Os k restaurantes mais próximos de (lat, lon), do mais próximo ao mais distante (menos que k se a seleção
+            tiver menos restaurantes). Devolve (rótulos do índice do dataframe, distâncias em km).
+        """
+        radius_km = self.initial_radius(lat, lon, k)
+        while True:
+            positions, distances = self.search(lat, lon, radius_km, selected)
+
+            # o raio já cobre a Terra inteira: não há mais restaurantes para encontrar
+            if len(positions) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                break
+
+            radius_km *= RADIUS_GROWTH
+
+        # só os k menores são ordenados
+        if len(positions) > k:
+            first = np.argpartition(distances, k - 1)[:k]
+            positions, distances = positions[first], distances[first]
+        order = np.argsort(distances, kind='stable')
+
+        return self.labels[self.rows[positions[order]]], distances[order]
+
+    def initial_radius(self, lat, lon, k):
+        """
+            Raio em que se esperam k restaurantes, pela densidade da célula do ponto (uma célula se ela estiver vazia)
+        """
+        cell_km = np.radians(GRID_DEGREES) * EARTH_RADIUS_KM
+        cell_area = cell_km * cell_km * max(np.cos(np.radians(lat)), 1e-6)
+
+        key = self.cell_keys(lat, lon)
+        i = np.searchsorted(self.cells, key)
+        count = self.cell_starts[i + 1] - self.cell_starts[i] if i < len(self.cells) and self.cells[i] == key else 0
+        if count == 0:
+            return cell_km
+
+        return float(np.sqrt(k * cell_area / (np.pi * count)))
+
+# ================================================================
+# FUNÇÕES
+# ================================================================
+
+def concat_ranges(starts, ends):
+    """
+        Concatena os intervalos [starts[i], ends[i]) em um único array de posições, sem laço em Python
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # cada posição é o início do seu intervalo somado ao deslocamento dentro dele
+    offsets = np.cumsum(lengths) - lengths
+
+    return np.repeat(starts - offsets, lengths) + np.arange(total)
+
+def haversine_term(lat, lon, lats, lons):
+    """
+        Termo a = sin²(θ/2) da fórmula haversine, com todas as coordenadas em radianos (θ é o ângulo central; a corda
+        entre os pontos é 2R·sqrt(a) e a distância sobre a superfície é 2R·asin(sqrt(a)))
+    """
+    return np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+
+def haversine_km(lat, lon, lats, lons, radians=False):
+    """
+        Distância haversine (km) entre o ponto (lat, lon) e cada ponto de (lats, lons), vetorizada.
+        Com radians=True as coordenadas dos arrays já estão em radianos; (lat, lon) está sempre em graus.
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    if not radians:
+        lats, lons = np.radians(lats), np.radians(lons)
+
+    a = haversine_term(lat, lon, lats, lons)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+@st.experimental_singleton(show_spinner=False, max_entries=2)
+def _cached_spatial_index(version):
+    # o argumento version só participa da chave do cache
+    return SpatialIndex(load_clean_restaurants(columns=SPATIAL_COLUMNS))
+
+def load_spatial_index():
+    """
+        Índice espacial da versão atual do dataset, compartilhado entre todas as sessões
+    """
+    return _cached_spatial_index(dataset_version())
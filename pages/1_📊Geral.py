@@ -2,229 +2,37 @@
 # BIBLIOTECAS
 # ================================================================
 
-import json
-import folium
-import requests
-import inflection
-
-import pandas         as pd
-import numpy          as np
-import seaborn        as sns
 import streamlit      as st
-import plotly.express as px
 
-from PIL                    import Image
-from haversine              import haversine, Unit
-from folium.plugins         import MarkerCluster
-from streamlit_folium       import folium_static
+from eat_out.data           import load_clean_restaurants
+from eat_out.filters        import country_multiselect, load_filter_index, load_filter_domain
+from eat_out.pyramid        import load_location_pyramid
+from eat_out.cube           import load_restaurant_cube
+from eat_out.ranking        import top_k
+from eat_out.profiling      import PageProfiler
+from eat_out.layout         import setup_page
+from eat_out.figures        import cached_figure, bar_chart, plotly_chart
+from eat_out.spatial        import load_spatial_index
+from eat_out.currency       import BRL_NOTE
 
 # ================================================================
 # CONFIGURAÇÃO DA PÁGINA
 # ================================================================
-st.set_page_config(page_title='Geral', page_icon=':bar_chart:', layout='wide')
+# configuração, estilo dos mapas e logo ficam em eat_out.layout, com os arquivos lidos uma vez por processo
+setup_page('Geral', ':bar_chart:')
 
-make_map_responsive= """
- <style>
- [title~="st.iframe"] { width: 100%}
- </style>
-"""
-st.markdown(make_map_responsive, unsafe_allow_html=True)
-
-image = Image.open('img/logo_eat_out.png')
-st.sidebar.image(image, use_column_width='auto')
-
-
-# ================================================================
-# BIBLIOTECA COMPLEMENTAR DE DADOS
-# ================================================================
-COUNTRIES = {
-1: "India",
-14: "Australia",
-30: "Brazil",
-37: "Canada",
-94: "Indonesia",
-148: "New Zeland",
-162: "Philippines",
-166: "Qatar",
-184: "Singapure",
-189: "South Africa",
-191: "Sri Lanka",
-208: "Turkey",
-214: "United Arab Emirates",
-215: "England",
-216: "United States of America",
-}
-
-# ================================================================
-# FUNÇÕES
-# ================================================================
-
-def clean_dataframe(df):
-    """Esta função realiza a limpeza do dataframe a ser analisado
-        
-        Ações Executadas:
-        1. Renomear as colunas
-        2. Remover dados NaN
-        3. Remover dados duplicados
-        4. Nomear as variáveis da coluna 'rating_color'
-        5. Classificar os valores na coluna 'cuisines'
-        6. Selecionar apenas 1 valor da coluna 'cuisines'
-        7. Renomear os dados da coluna 'currency'
-        8. Criar as colunas 'country', 'exchange_rate' e 'price_brl'    
-    """
-    
-    # renomeando as colunas
-    df = rename_columns(df)
-    
-    # removendo dados NaN
-    df = df.dropna()
-    
-    # removendo dados duplicados
-    df = df.drop_duplicates(keep='first')
-    
-    # renomenado as cores
-    df['rating_color'] = df['rating_color'].map({
-                                                "3F7E00": "darkgreen",
-                                                "5BA829": "green",
-                                                "9ACD32": "lightgreen",
-                                                "CDD614": "orange",
-                                                "FFBA00": "red",
-                                                "CBCBC8": "darkred",
-                                                "FF7800": "darkred",
-                                                })
-    
-    # classificando os pratos por valor
-    df['price_range'] = df.loc[:, 'price_range'].apply(lambda x: create_price_type(x))
-    
-    # selecionando 1 tipo de culinária na coluna cuisines
-    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(",")[0])
-    
-    # renomeando as siglas das moedas
-    df['currency'] = df.loc[:, 'currency'].apply(lambda x: currency_type(x))
-    
-    # transformando os valores da coluna average cost for two para float
-    df['average_cost_for_two'] = df['average_cost_for_two'].astype(float)
-    
-    # criação da coluna country
-    df['country'] = df.loc[:, 'country_code'].apply(lambda x: country_name(x))
-    
-    # criação da coluna utilizando as informações da API Exchange Rates no arquivo JSON
-    df['exchange_rate'] = df.loc[:, 'currency'].map(exchange_rate)
-
-    # utilizando os valores do prato pelo valores de cotação do dia
-    df['price_brl'] = df['average_cost_for_two'] / df['exchange_rate']
-
-    return df
-
-    
-def rename_columns(dataframe):
-    """ 
-        Renomear as colunas do dataframe para snakecase substituindo os espaços entre as palavras para underscore
-    """
-    
-    df = dataframe.copy()
-    title = lambda x: inflection.titleize(x)
-    snakecase = lambda x: inflection.underscore(x)
-    spaces = lambda x: x.replace(" ", "")
-    cols_old = list(df.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    cols_new = list(map(snakecase, cols_old))
-    df.columns = cols_new
-    
-    return df
-
-def country_name(country_id):
-    """
-        Substitui os IDs dos países pelo seu nome conforme dicionário localizado na seção BIBLIOTECA COMPLEMENTAR DE DADOS
-    """
-    return COUNTRIES[country_id]
-
-def create_price_type(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-    
-def currency_type(currency):
-    if currency == 'Botswana Pula(P)':
-        return 'BWP'
-    elif currency == 'Brazilian Real(R$)':
-        return 'BRL'
-    elif currency == 'Dollar($)':
-        return 'USD'
-    elif currency == 'Emirati Diram(AED)':
-        return 'AED'
-    elif currency == 'Indian Rupees(Rs.)':
-        return 'INR'
-    elif currency == 'Indonesian Rupiah(IDR)':
-        return 'IDR'
-    elif currency == 'NewZealand($)':
-        return 'NZD'
-    elif currency == 'Pounds(£)':
-        return 'GBP'
-    elif currency == 'Qatari Rial(QR)':
-        return 'QAR'
-    elif currency == 'Rand(R)':
-        return 'ZAR'
-    elif currency == 'Sri Lankan Rupee(LKR)':
-        return 'LKR'
-    else:
-        return 'TRY'
-
-def restaurants_location(df1):
-    """
-        Esta função cria um mapa onde se cria um cluster com as localizações, além de fornecer informações destas localizações.
-    """
-    
-    df_locations = (df1.loc[:, ['restaurant_name', 'address','cuisines', 'price_brl', 'aggregate_rating', 'rating_color', 'latitude', 'longitude']].reset_index())
-
-    mapa = folium.Map(location=[df_locations.latitude.mean(), df_locations.longitude.mean()], zoom_start=3, control_scale=True)
-
-    marker_cluster = MarkerCluster().add_to(mapa)
-
-    for i, row in df_locations.iterrows():
-
-        html = """<p style="font-family:helvetica;"><strong>Restaurante: </strong> <br /><em>{}</em></p>
-                  <p style="font-family:helvetica;"><strong>Culinária: <br /></strong><em>{}</em></p>
-                  <p style="font-family:helvetica;"><strong>Endere&ccedil;o: <br /></strong><em>{}</em></p>
-                  <p style="font-family:helvetica;"><strong>Custo m&eacute;dio para 2 pessoas: <br /></strong><em>R${}</em></p>
-                  <p style="font-family:helvetica;"><strong>Nota m&eacute;dia: <br /></strong><em>{}</em></p>""".format(
-                                        df_locations['restaurant_name'][i],
-                                        df_locations['cuisines'][i],
-                                        df_locations['address'][i], 
-                                        round(df_locations['price_brl'][i],2),
-                                        df_locations['aggregate_rating'][i])
-        iframe = folium.IFrame(html=html, width=300, height=300)
-        popup = folium.Popup(iframe, max_width=2650)
-        icon_color = df_locations['rating_color'][i]
-
-        folium.Marker(location=[row['latitude'], row['longitude']], 
-                      popup=popup,
-                      icon=folium.Icon(color=icon_color, 
-                                        icon='cutlery')).add_to(marker_cluster)
-
-    folium_static(mapa, height=1000)
-
-    return None
+# tempos de cada seção, medidos só com EAT_OUT_PROFILE ligada (ver eat_out.profiling)
+profiler = PageProfiler('Geral')
 
 # --------------------------------- ESTRUTURA DO CÓDIGO ---------------------------------
 
 # ================================================================
 # CARREGANDO DADOS
 # ================================================================
-df = pd.read_csv('data/zomato.csv')
-
-# carregando os dados do arquivo json para conversão de moeda
-json_currency = pd.read_json('data/dict_currency,json')
-exchange_rate = json_currency['conversion_rates']
-
-# Limpeza dos dados
-df1 = clean_dataframe(df)
+profiler.section('carregando dados')
+# leitura e limpeza dos dados compartilhadas entre as páginas, com cache por versão dos arquivos
+# os restaurantes são carregados depois da seleção de países, lendo só as partições selecionadas
+filter_index = load_filter_index()
 
 # ================================================================
 # BARRA LATERAL
@@ -235,74 +43,81 @@ st.sidebar.markdown('# MENU')
 st.sidebar.markdown("""---""")
 
 # SELECIONE OS PAÍSES
-st.sidebar.subheader('Selecione o(s) País(es)')
-country_selection = st.sidebar.multiselect('Países', ['Australia', 'Brazil', 'Canada', 'England', 'India', 'Indonesia',
-       'New Zeland', 'Philippines', 'Qatar', 'Singapure', 'South Africa',
-       'Sri Lanka', 'Turkey', 'United Arab Emirates',
-       'United States of America'], default=['Australia', 'Brazil', 'Canada', 'England', 'India', 'Indonesia',
-       'New Zeland', 'Philippines', 'Qatar', 'Singapure', 'South Africa',
-       'Sri Lanka', 'Turkey', 'United Arab Emirates',
-       'United States of America'])
+profiler.section('filtro de país')
+country_selection = country_multiselect()
 
 st.sidebar.markdown("""---""")
 
 # FILTRO DE PAÍS
-rows_selected = df1['country'].isin(country_selection)
-df1 = df1.loc[rows_selected, :]
+# apenas as colunas usadas nesta página e as partições dos países selecionados são carregadas do snapshot colunar
+df1 = load_clean_restaurants(columns=['restaurant_id', 'restaurant_name', 'country', 'address', 'cuisines', 'latitude', 'longitude',
+                                     'aggregate_rating', 'rating_color', 'price_brl'], countries=country_selection)
+
+# os demais filtros são combinados nos bitmaps do índice e o dataframe só é recortado uma vez, depois do último filtro
+rows_selected = filter_index.isin(country_selection)
 
 #SELECIONE A NOTA DOS RESTAURANTES
+profiler.section('filtro de nota')
 st.sidebar.subheader('Selecione a Nota Média')
 
-min_rating = float(min(df1['aggregate_rating']))
-max_rating = float(max(df1['aggregate_rating']))
-rating_range = list(df1['aggregate_rating'].sort_values().unique())
+# as opções dos sliders vêm do domínio pré-calculado por seleção, limitado a MAX_SLIDER_STOPS paradas
+rating_domain = load_filter_domain('aggregate_rating', country_selection)
 
-f_min_rating, f_max_rating=st.sidebar.select_slider('Nota Média', options=rating_range, value=(min_rating, max_rating))
+f_min_rating, f_max_rating=st.sidebar.select_slider('Nota Média', options=rating_domain.stops, value=(rating_domain.min, rating_domain.max))
 
 # FILTRO DE NOTA
-rows_selected = df1['aggregate_rating'].between(f_min_rating, f_max_rating)
-df1 = df1.loc[rows_selected, :]
+rows_selected &= filter_index.between('aggregate_rating', f_min_rating, f_max_rating)
 
 st.sidebar.markdown("""---""")
 
 # SELECIONE O PREÇO MÉDIO PARA DUAS PESSOAS
+profiler.section('filtro de preço')
 st.sidebar.subheader('Selecione o Preço')
-df1 = df1.loc[(df1['price_brl'] != 126968090.40121888), :]
-min_price = float(round(df1['price_brl'].min(),2))
-max_price = float(round(df1['price_brl'].max(),2))
-price_range = list(round(df1['price_brl'],2).sort_values().unique())
+# os preços inválidos já vêm marcados na coluna price_outlier desde a limpeza dos dados
+rows_selected &= filter_index.unflagged('price_outlier')
+price_domain = load_filter_domain('price_brl', country_selection, (f_min_rating, f_max_rating), drop_flags=['price_outlier'])
 
-f_min_price, f_max_price=st.sidebar.select_slider('Preço para 2 Pessoas em R$', options=price_range, value=(min_price, max_price))
+f_min_price, f_max_price=st.sidebar.select_slider('Preço para 2 Pessoas em R$', options=price_domain.stops, value=(price_domain.min, price_domain.max),
+                                                   help=BRL_NOTE)
 
 # FILTRO DE PREÇO
-rows_selected = df1['price_brl'].between(f_min_price, f_max_price)
-df1 = df1.loc[rows_selected, :]
+rows_selected &= filter_index.between('price_brl', f_min_price, f_max_price)
+df1 = filter_index.take(df1, rows_selected)
+
+# os indicadores e gráficos saem do cubo pré-agregado, com os mesmos filtros aplicados às células
+profiler.section('cubo')
+cube_selection = load_restaurant_cube().select(country_selection, (f_min_rating, f_max_rating), (f_min_price, f_max_price))
+cube_selection = cube_selection.where(~cube_selection.cells['price_outlier'])
+
+# os gráficos são guardados no cache de figuras com o estado dos filtros: com os mesmos filtros não são montados de novo
+filter_state = {'countries': country_selection, 'rating': (f_min_rating, f_max_rating), 'price': (f_min_price, f_max_price)}
 
 # ================================================================
 # ABA DE VISÃO PAÍSES
 # ================================================================
+profiler.section('indicadores')
 st.markdown('-----------------')
 with st.container():
     col1, col2, col3, col4, col5 = st.columns(5, gap="small")
     
     with col1:
-        unique_countries = len(df1['country'].unique())
+        unique_countries = cube_selection.total('country')
         col1.metric('Total de Países', unique_countries) 
         
     with col2:
-        unique_restaurants = len(df1['restaurant_id'].unique())
+        unique_restaurants = cube_selection.total('restaurant_id')
         col2.metric('Total de Restaurantes', unique_restaurants) 
         
     with col3:
-        unique_cities = len(df1['city'].unique())
+        unique_cities = cube_selection.total('city')
         col3.metric('Total de Cidades', unique_cities) 
         
     with col4:
-        unique_cuisines = len(df1['cuisines'].unique())
+        unique_cuisines = cube_selection.total('cuisines')
         col4.metric('Tipos de Culinária', unique_cuisines) 
         
     with col5:
-        unique_votes = df1['votes'].sum()
+        unique_votes = cube_selection.total('votes_sum')
         col5.metric('Total de Votos', unique_votes)
 st.markdown('-----------------')
         
@@ -311,30 +126,82 @@ with st.container():
     
     with col1:
         with st.container():
+            profiler.section('mapa')
             st.header('Localização dos Restaurantes')
-            restaurants_location(df1)
+            st.caption(BRL_NOTE)
+            # folium só é usado no mapa: importado aqui, depois do restante da página já montado
+            from eat_out.maps import PYRAMID_MIN_POINTS, MAP_LEVELS, MAX_CELLS_PER_LEVEL, restaurants_location, restaurants_density
+
+            # com muitos restaurantes o mapa usa as células pré-agregadas da pirâmide em vez dos pontos; só os níveis
+            # que o mapa exibe são consultados, e a consulta para no primeiro nível grande demais para ser enviado
+            if len(df1) > PYRAMID_MIN_POINTS:
+                cells = load_location_pyramid().query(country_selection, (f_min_rating, f_max_rating), (f_min_price, f_max_price),
+                                                      levels=MAP_LEVELS, drop_outliers=True, max_cells=MAX_CELLS_PER_LEVEL)
+                restaurants_density(cells)
+            else:
+                restaurants_location(df1)
         
     with col2:
         with st.container():
+            profiler.section('gráfico: restaurantes por país')
             st.header('Top 10 Países com Mais Restaurantes Registrados')
-            restaurant_register = df1.loc[:, ['restaurant_id', 'country']].groupby('country').nunique().sort_values(by='restaurant_id', ascending=False).reset_index()
-
-            fig = px.bar(data_frame=restaurant_register.head(10), x='country', y='restaurant_id',text_auto=True, color='country')
-            fig.update_traces(textposition='outside', selector=dict(type='bar'))
-            st.plotly_chart(fig, use_container_width=True)
+            fig = cached_figure('Geral', 'restaurantes por país', filter_state, lambda: bar_chart(
+                top_k(cube_selection.nunique('country', 'restaurant_id'), 'restaurant_id'), 'country', 'restaurant_id'))
+            plotly_chart(fig)
             
         with st.container():
+            profiler.section('gráfico: culinárias por país')
             st.header('Top 10 Países com Mais Tipos de Culinárias')
-            country_cuisines = df1.loc[:, ['cuisines', 'country']].groupby('country').nunique().sort_values(by='cuisines', ascending=False).reset_index()
-
-            fig = px.bar(data_frame=country_cuisines.head(10), x='country', y='cuisines',text_auto=True, color='country')
-            fig.update_traces(textposition='outside', selector=dict(type='bar'))
-            st.plotly_chart(fig, use_container_width=True)
+            fig = cached_figure('Geral', 'culinárias por país', filter_state, lambda: bar_chart(
+                top_k(cube_selection.nunique('country', 'cuisines'), 'cuisines'), 'country', 'cuisines'))
+            plotly_chart(fig)
             
 with st.container():
+    profiler.section('gráfico: cidades por país')
     st.header('Quantidade de Cidades Registradas por País')
-    city_register = df1.loc[:, ['city', 'country']].groupby('country').nunique().sort_values(by='city', ascending=False).reset_index()
+    fig = cached_figure('Geral', 'cidades por país', filter_state, lambda: bar_chart(
+        top_k(cube_selection.nunique('country', 'city'), 'city', k=None), 'country', 'city'))
+    plotly_chart(fig)
+
+# ================================================================
+# RESTAURANTES PRÓXIMOS
+# ================================================================
+profiler.section('restaurantes próximos')
+st.markdown('-----------------')
+with st.container():
+    st.header('Restaurantes Próximos de um Local')
+    col1, col2, col3, col4 = st.columns(4, gap="small")
+
+    # o ponto inicial é o centro (mediana) dos restaurantes selecionados
+    center = df1[['latitude', 'longitude']].median().fillna(0).round(2)
+
+    with col1:
+        near_latitude = st.number_input('Latitude', min_value=-90.0, max_value=90.0, value=float(center['latitude']), format='%.5f')
+
+    with col2:
+        near_longitude = st.number_input('Longitude', min_value=-180.0, max_value=180.0, value=float(center['longitude']), format='%.5f')
+
+    with col3:
+        near_mode = st.radio('Buscar', ['Mais próximos', 'Dentro do raio'], horizontal=True)
+
+    with col4:
+        if near_mode == 'Mais próximos':
+            near_k = st.slider('Quantidade de restaurantes', min_value=1, max_value=50, value=10)
+        else:
+            near_radius = st.slider('Raio (km)', min_value=1, max_value=100, value=5)
+
+    # a busca usa o índice espacial (grade de células + haversine vetorizada) com os mesmos filtros da barra lateral
+    spatial_index = load_spatial_index()
+    if near_mode == 'Mais próximos':
+        near_labels, near_distances = spatial_index.nearest(near_latitude, near_longitude, near_k, filter_index.mask(rows_selected))
+    else:
+        near_labels, near_distances = spatial_index.within(near_latitude, near_longitude, near_radius, filter_index.mask(rows_selected))
+        st.markdown('##### {} restaurantes em até {} km'.format(len(near_labels), near_radius))
+
+    # no máximo 50 linhas na tabela, dos mais próximos para os mais distantes
+    nearby = df1.loc[near_labels[:50], ['restaurant_name', 'cuisines', 'address', 'aggregate_rating', 'price_brl']]
+    nearby['price_brl'] = nearby['price_brl'].round(2)
+    nearby['distance_km'] = near_distances[:50].round(2)
+    st.table(nearby.reset_index(drop=True))
 
-    fig = px.bar(data_frame=city_register, x='country', y='city',text_auto=True, color='country')
-    fig.update_traces(textposition='outside', selector=dict(type='bar'))
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+profiler.finish()
@@ -2,228 +2,37 @@
 # BIBLIOTECAS
 # ================================================================
 
-import json
-import folium
-import requests
-import inflection
-
-import pandas         as pd
-import numpy          as np
-import seaborn        as sns
 import streamlit      as st
-import plotly.express as px
 
-from PIL                    import Image
-from haversine              import haversine, Unit
-from folium.plugins         import MarkerCluster
-from streamlit_folium       import folium_static
+from eat_out.data           import load_clean_restaurants
+from eat_out.filters        import country_multiselect, load_filter_index
+from eat_out.cube           import load_restaurant_cube
+from eat_out.ranking        import top_k, rank_ends
+from eat_out.leaderboard    import leaderboard
+from eat_out.currency       import load_rate_provider, currency_select, currency_label, price_column
+from eat_out.profiling      import PageProfiler
+from eat_out.layout         import setup_page
+from eat_out.figures        import cached_figure, bar_chart, plotly_chart
+from eat_out.similarity     import load_similarity_index
 
 # ================================================================
 # CONFIGURAÇÃO DA PÁGINA
 # ================================================================
-st.set_page_config(page_title='Países', page_icon=':bar_chart:', layout='wide')
+# configuração, estilo dos mapas e logo ficam em eat_out.layout, com os arquivos lidos uma vez por processo
+setup_page('Países', ':bar_chart:')
 
-make_map_responsive= """
- <style>
- [title~="st.iframe"] { width: 100%}
- </style>
-"""
-st.markdown(make_map_responsive, unsafe_allow_html=True)
+# tempos de cada seção, medidos só com EAT_OUT_PROFILE ligada (ver eat_out.profiling)
+profiler = PageProfiler('Culinárias')
 
-image = Image.open('img/logo_eat_out.png')
-st.sidebar.image(image, use_column_width='auto')
-
-# ================================================================
-# BIBLIOTECA COMPLEMENTAR DE DADOS
-# ================================================================
-COUNTRIES = {
-1: "India",
-14: "Australia",
-30: "Brazil",
-37: "Canada",
-94: "Indonesia",
-148: "New Zeland",
-162: "Philippines",
-166: "Qatar",
-184: "Singapure",
-189: "South Africa",
-191: "Sri Lanka",
-208: "Turkey",
-214: "United Arab Emirates",
-215: "England",
-216: "United States of America",
-}
-
-# ================================================================
-# FUNÇÕES
-# ================================================================
-
-def clean_dataframe(df):
-    """Esta função realiza a limpeza do dataframe a ser analisado
-        
-        Ações Executadas:
-        1. Renomear as colunas
-        2. Remover dados NaN
-        3. Remover dados duplicados
-        4. Nomear as variáveis da coluna 'rating_color'
-        5. Classificar os valores na coluna 'cuisines'
-        6. Selecionar apenas 1 valor da coluna 'cuisines'
-        7. Renomear os dados da coluna 'currency'
-        8. Criar as colunas 'country', 'exchange_rate' e 'price_brl'    
-    """
-    
-    # renomeando as colunas
-    df = rename_columns(df)
-    
-    # removendo dados NaN
-    df = df.dropna()
-    
-    # removendo dados duplicados
-    df = df.drop_duplicates(keep='first')
-    
-    # renomenado as cores
-    df['rating_color'] = df['rating_color'].map({
-                                                "3F7E00": "darkgreen",
-                                                "5BA829": "green",
-                                                "9ACD32": "lightgreen",
-                                                "CDD614": "orange",
-                                                "FFBA00": "red",
-                                                "CBCBC8": "darkred",
-                                                "FF7800": "darkred",
-                                                })
-    
-    # classificando os pratos por valor
-    df['price_range'] = df.loc[:, 'price_range'].apply(lambda x: create_price_type(x))
-    
-    # selecionando 1 tipo de culinária na coluna cuisines
-    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(",")[0])
-    
-    # renomeando as siglas das moedas
-    df['currency'] = df.loc[:, 'currency'].apply(lambda x: currency_type(x))
-    
-    # transformando os valores da coluna average cost for two para float
-    df['average_cost_for_two'] = df['average_cost_for_two'].astype(float)
-    
-    # criação da coluna country
-    df['country'] = df.loc[:, 'country_code'].apply(lambda x: country_name(x))
-    
-    # criação da coluna utilizando as informações da API Exchange Rates no arquivo JSON
-    df['exchange_rate'] = df.loc[:, 'currency'].map(exchange_rate)
-
-    # utilizando os valores do prato pelo valores de cotação do dia
-    df['price_brl'] = df['average_cost_for_two'] / df['exchange_rate']
-
-    return df
-
-    
-def rename_columns(dataframe):
-    """ 
-        Renomear as colunas do dataframe para snakecase substituindo os espaços entre as palavras para underscore
-    """
-    
-    df = dataframe.copy()
-    title = lambda x: inflection.titleize(x)
-    snakecase = lambda x: inflection.underscore(x)
-    spaces = lambda x: x.replace(" ", "")
-    cols_old = list(df.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    cols_new = list(map(snakecase, cols_old))
-    df.columns = cols_new
-    
-    return df
-
-def country_name(country_id):
-    """
-        Substitui os IDs dos países pelo seu nome conforme dicionário localizado na seção BIBLIOTECA COMPLEMENTAR DE DADOS
-    """
-    return COUNTRIES[country_id]
-
-def create_price_type(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-    
-def currency_type(currency):
-    if currency == 'Botswana Pula(P)':
-        return 'BWP'
-    elif currency == 'Brazilian Real(R$)':
-        return 'BRL'
-    elif currency == 'Dollar($)':
-        return 'USD'
-    elif currency == 'Emirati Diram(AED)':
-        return 'AED'
-    elif currency == 'Indian Rupees(Rs.)':
-        return 'INR'
-    elif currency == 'Indonesian Rupiah(IDR)':
-        return 'IDR'
-    elif currency == 'NewZealand($)':
-        return 'NZD'
-    elif currency == 'Pounds(£)':
-        return 'GBP'
-    elif currency == 'Qatari Rial(QR)':
-        return 'QAR'
-    elif currency == 'Rand(R)':
-        return 'ZAR'
-    elif currency == 'Sri Lankan Rupee(LKR)':
-        return 'LKR'
-    else:
-        return 'TRY'
-
-def restaurants_location(df1):
-    """
-        Esta função cria um mapa onde se cria um cluster com as localizações, além de fornecer informações destas localizações.
-    """
-    
-    df_locations = (df1.loc[:, ['restaurant_name', 'address','cuisines', 'price_brl', 'aggregate_rating', 'rating_color', 'latitude', 'longitude']].reset_index())
-
-    mapa = folium.Map(location=[df_locations.latitude.mean(), df_locations.longitude.mean()], zoom_start=3, control_scale=True)
-
-    marker_cluster = MarkerCluster().add_to(mapa)
-
-    for i, row in df_locations.iterrows():
-
-        html = """<p style="font-family:helvetica;"><strong>Restaurante: </strong> <br /><em>{}</em></p>
-                  <p style="font-family:helvetica;"><strong>Culinária: <br /></strong><em>{}</em></p>
-                  <p style="font-family:helvetica;"><strong>Endere&ccedil;o: <br /></strong><em>{}</em></p>
-                  <p style="font-family:helvetica;"><strong>Custo m&eacute;dio para 2 pessoas: <br /></strong><em>R${}</em></p>
-                  <p style="font-family:helvetica;"><strong>Nota m&eacute;dia: <br /></strong><em>{}</em></p>""".format(
-                                        df_locations['restaurant_name'][i],
-                                        df_locations['cuisines'][i],
-                                        df_locations['address'][i], 
-                                        round(df_locations['price_brl'][i],2),
-                                        df_locations['aggregate_rating'][i])
-        iframe = folium.IFrame(html=html, width=300, height=300)
-        popup = folium.Popup(iframe, max_width=2650)
-        icon_color = df_locations['rating_color'][i]
-
-        folium.Marker(location=[row['latitude'], row['longitude']], 
-                      popup=popup,
-                      icon=folium.Icon(color=icon_color, 
-                                        icon='cutlery')).add_to(marker_cluster)
-
-    folium_static(mapa, height=1000)
-
-    return None
-  
 # --------------------------------- ESTRUTURA DO CÓDIGO ---------------------------------
 
 # ================================================================
 # CARREGANDO DADOS
 # ================================================================
-df = pd.read_csv('data/zomato.csv')
-
-# carregando os dados do arquivo json para conversão de moeda
-json_currency = pd.read_json('data/dict_currency,json')
-exchange_rate = json_currency['conversion_rates']
-
-# Limpeza dos dados
-df1 = clean_dataframe(df)
+profiler.section('carregando dados')
+# leitura e limpeza dos dados compartilhadas entre as páginas, com cache por versão dos arquivos
+# os restaurantes são carregados depois da seleção de países, lendo só as partições selecionadas
+rate_provider = load_rate_provider()
 
 # ================================================================
 # BARRA LATERAL
@@ -234,104 +43,153 @@ st.sidebar.markdown('# MENU')
 st.sidebar.markdown("""---""")
 
 # SELECIONE OS PAÍSES
-st.sidebar.subheader('Selecione o(s) País(es)')
-country_selection = st.sidebar.multiselect('Países', ['Australia', 'Brazil', 'Canada', 'England', 'India', 'Indonesia',
-       'New Zeland', 'Philippines', 'Qatar', 'Singapure', 'South Africa',
-       'Sri Lanka', 'Turkey', 'United Arab Emirates',
-       'United States of America'], default=['Australia', 'Brazil', 'Canada', 'England', 'India', 'Indonesia',
-       'New Zeland', 'Philippines', 'Qatar', 'Singapure', 'South Africa',
-       'Sri Lanka', 'Turkey', 'United Arab Emirates',
-       'United States of America'])
+profiler.section('filtro de país')
+country_selection = country_multiselect()
+
+st.sidebar.markdown("""---""")
+
+# SELECIONE A MOEDA DOS VALORES
+profiler.section('filtro de moeda')
+target_currency, rate_date = currency_select(rate_provider)
+
+# todos os valores da página partem do valor original, na moeda do país, convertido com a mesma tabela de cotações
+rate_table = rate_provider.table(rate_date)
 
 st.sidebar.markdown("""---""")
 
 # FILTRO DE PAÍS
-rows_selected = df1['country'].isin(country_selection)
-df1 = df1.loc[rows_selected, :]
+profiler.section('carregando restaurantes')
+# apenas as colunas usadas nesta página e as partições dos países selecionados são carregadas do snapshot colunar
+df1 = load_clean_restaurants(columns=['restaurant_id', 'restaurant_name', 'country', 'city', 'cuisines', 'aggregate_rating', 'votes',
+                                     'price_brl', 'price_outlier', 'average_cost_for_two', 'currency'], countries=country_selection)
+
+# os rankings por culinária saem do cubo pré-agregado, com o mesmo filtro de país
+cube_selection = load_restaurant_cube().select(country_selection)
 
 
 # ================================================================
 # ABA DE VISÃO CULINÁRIAS
 # ================================================================
 
+profiler.section('restaurantes destaque')
+# os quatro restaurantes destaque saem de uma única passada sobre os restaurantes filtrados
+restaurant_board = leaderboard(df1)
+restaurant_board['price_target'] = rate_table.convert(restaurant_board['average_cost_for_two'], restaurant_board['currency'],
+                                                      target_currency)
+
 with st.container():
     st.markdown('-----------------')    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.markdown('### Restaurante mais avaliado')
-        rating_votes_high = (df1.loc[:, ['restaurant_name', 'aggregate_rating', 'votes']]
-                              .groupby(['restaurant_name', 'aggregate_rating', 'votes'])
-                              .mean()
-                              .sort_values(by=['aggregate_rating', 'votes'], ascending=False)).reset_index()
+        rating_votes_high = restaurant_board.loc['best_rated']
         
-        st.markdown('##### {}'.format(rating_votes_high['restaurant_name'][0]))
-        st.markdown('##### {}/5.0'.format(rating_votes_high['aggregate_rating'][0]))
+        st.markdown('##### {}'.format(rating_votes_high['restaurant_name']))
+        st.markdown('##### {}/5.0'.format(rating_votes_high['aggregate_rating']))
         
     with col2:
         st.markdown('### Restaurante menos avaliado')
-        rating_votes_low = (df1.loc[:, ['restaurant_name', 'aggregate_rating', 'votes']]
-                              .groupby(['restaurant_name', 'aggregate_rating', 'votes'])
-                              .mean()
-                              .sort_values(by=['aggregate_rating', 'votes'], ascending=True)).reset_index()
+        rating_votes_low = restaurant_board.loc['worst_rated']
         
-        st.markdown('##### {}'.format(rating_votes_low['restaurant_name'][0]))
-        st.markdown('##### {}/5.0'.format(rating_votes_low['aggregate_rating'][0]))
+        st.markdown('##### {}'.format(rating_votes_low['restaurant_name']))
+        st.markdown('##### {}/5.0'.format(rating_votes_low['aggregate_rating']))
 
     with col3:
         st.markdown('### Restaurante Maior Valor Médio')
-        df_aux1 = df1.loc[((df1['price_brl'] < 126968090.40121888) & (df1['price_brl'] > 0.0)), :]
-        price_brl_high = (df_aux1.loc[:, ['restaurant_name', 'price_brl']].groupby('restaurant_name')).mean().sort_values(by='price_brl', ascending=False).reset_index()
+        price_brl_high = restaurant_board.loc['most_expensive']
         
-        st.markdown('##### {}'.format(price_brl_high['restaurant_name'][0]))
-        st.markdown('##### R${}'.format(round(price_brl_high['price_brl'][0],2)))
+        st.markdown('##### {}'.format(price_brl_high['restaurant_name']))
+        st.markdown('##### {}'.format(currency_label(price_brl_high['price_target'], target_currency)))
     
     with col4:
         st.markdown('### Restaurante Menor Valor Médio')
-        df_aux1 = df1.loc[((df1['price_brl'] < 126968090.40121888) & (df1['price_brl'] > 0.0)), :]
-        price_brl_low = (df_aux1.loc[:, ['restaurant_name', 'price_brl']].groupby('restaurant_name')).mean().sort_values(by='price_brl', ascending=True).reset_index()
+        price_brl_low = restaurant_board.loc['cheapest']
         
-        st.markdown('##### {}'.format(price_brl_low['restaurant_name'][0]))
-        st.markdown('##### R${}'.format(round(price_brl_low['price_brl'][0],2)))
+        st.markdown('##### {}'.format(price_brl_low['restaurant_name']))
+        st.markdown('##### {}'.format(currency_label(price_brl_low['price_target'], target_currency)))
 
     st.markdown('-----------------')
+
+profiler.section('gráficos: nota por culinária')
+# melhores e piores culinárias saem da mesma agregação, com as duas pontas do ranking de uma vez, e os dois gráficos
+# ficam juntos no cache de figuras, com o filtro de país como estado
+def cuisine_rating_charts():
+    best, worst = rank_ends(cube_selection.mean('cuisines', 'aggregate_rating'), 'aggregate_rating')
+    return bar_chart(round(best, 2), 'cuisines', 'aggregate_rating'), bar_chart(round(worst, 2), 'cuisines', 'aggregate_rating')
+
+fig_best_rating, fig_worst_rating = cached_figure('Culinárias', 'nota por culinária', {'countries': country_selection},
+                                                  cuisine_rating_charts)
+
 with st.container():
     col1, col2 = st.columns(2)
     with col1:
         st.markdown('### Top 10 Melhores Tipos de Culinária\n Por Nota Média ')
-        cuisines_best_rating = df1.loc[:, ['cuisines', 'aggregate_rating']].groupby('cuisines').mean().sort_values(by='aggregate_rating', ascending=False).reset_index()
-        
-        fig = px.bar(data_frame=round(cuisines_best_rating.head(10),2), x='cuisines', y='aggregate_rating', text_auto=True, color='cuisines')
-        fig.update_traces(textposition='outside', selector=dict(type='bar'))
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig_best_rating)
         
     with col2:
         st.markdown('### Top 10 Piores Tipos de Culinária\n Por Nota Média ')
-        cuisines_worst_rating = df1.loc[:, ['cuisines', 'aggregate_rating']].groupby('cuisines').mean().sort_values(by='aggregate_rating', ascending=True).reset_index()
-        
-        fig = px.bar(data_frame=round(cuisines_worst_rating.head(10),2), x='cuisines', y='aggregate_rating', text_auto=True, color='cuisines')
-        fig.update_traces(textposition='outside', selector=dict(type='bar'))
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig_worst_rating)
 
 with st.container():
     col1, col2 = st.columns(2)
     
     with col1:
+        profiler.section('tabela: valor médio por culinária')
         st.markdown('### Maior Valor Médio para 2 Pessoas\n Por Culinária ')
-        df_aux1 = df1.loc[((df1['price_brl'] < 126968090.40121888) & (df1['price_brl'] > 0.0)), :]
+        price_selection = cube_selection.where(~cube_selection.cells['price_outlier'])
 
-        restaurants_cost = df_aux1.loc[:, ['cuisines', 'price_brl']].groupby('cuisines').mean().sort_values(by='price_brl', ascending=False).reset_index()
-        st.table(restaurants_cost.head(10))
+        restaurants_cost = top_k(price_selection.cost_mean('cuisines', rate_table, target_currency), 'average_cost_for_two')
+        st.table(restaurants_cost.rename(columns={'average_cost_for_two': price_column(target_currency)}))
     
     with col2:
+        profiler.section('tabela: culinárias com entrega')
         st.markdown('### Tipos de Culinária\n Que mais Realizam Entregas ')
-        df_aux1 = df1.loc[(df1['has_online_delivery'] == 1), :]
-        cuisines_delivery = df_aux1.loc[:, ['cuisines', 'is_delivering_now']].groupby('cuisines').count().sort_values(by='is_delivering_now', ascending=False).reset_index()
+        delivery_selection = cube_selection.where(cube_selection.cells['online_delivery'] > 0)
+        cuisines_delivery = top_k(delivery_selection.sum('cuisines', 'online_delivery').rename(columns={'online_delivery': 'is_delivering_now'}), 'is_delivering_now')
 
-        st.table(cuisines_delivery.head(10))
+        st.table(cuisines_delivery)
         
 
+# ================================================================
+# RESTAURANTES SEMELHANTES
+# ================================================================
+profiler.section('restaurantes semelhantes')
+st.markdown('-----------------')
+with st.container():
+    st.header('Restaurantes Semelhantes')
+    col1, col2, col3 = st.columns([2, 3, 2], gap="small")
+
+    with col1:
+        similar_query = st.text_input('Buscar restaurante pelo nome')
 
+    # no máximo 100 opções na lista, dos restaurantes com mais votos
+    matches = df1[df1['restaurant_name'].str.contains(similar_query, case=False, regex=False)] if similar_query else df1
+    matches = matches.nlargest(100, 'votes')
 
+    with col2:
+        similar_label = st.selectbox('Restaurante', matches.index.tolist(),
+                                     format_func=lambda label: '{} ({})'.format(df1.at[label, 'restaurant_name'], df1.at[label, 'city']))
 
+    with col3:
+        similar_n = st.slider('Quantidade de restaurantes semelhantes', min_value=5, max_value=20, value=10)
 
+    if similar_label is None:
+        st.markdown('##### Nenhum restaurante encontrado')
+    else:
+        # a busca usa o índice de semelhança (atributos normalizados + grade espacial), só nos países selecionados
+        filter_index = load_filter_index()
+        try:
+            similar_labels, similar_distances = load_similarity_index().similar(
+                similar_label, similar_n, filter_index.mask(filter_index.isin(country_selection)))
+        except KeyError:
+            # restaurante sem coordenadas: fica fora do índice
+            st.markdown('##### Restaurante sem localização')
+        else:
+            similar = df1.loc[similar_labels, ['restaurant_name', 'city', 'cuisines', 'aggregate_rating']]
+            similar[price_column(target_currency)] = rate_table.convert(df1.loc[similar_labels, 'average_cost_for_two'],
+                                                                        df1.loc[similar_labels, 'currency'], target_currency).round(2)
+            similar['distance'] = similar_distances.round(3)
+            st.table(similar.reset_index(drop=True))
+
+profiler.finish()
@@ -1,20 +1,20 @@
 import streamlit as st
-from PIL import Image
 
-st.set_page_config(
-    page_title=":knife_fork_plate: Home",
-    page_icon="knife_fork_plate",
-    layout='wide'
-)
+from eat_out.layout import setup_page, local_css
+from eat_out.assets import validate_assets, show_image
 
-image = Image.open('img/logo_eat_out.png')
-st.sidebar.image(image, use_column_width='auto')
+setup_page(":knife_fork_plate: Home", "knife_fork_plate")
+
+# imagens ausentes são registradas no log uma vez por processo; na página aparece um aviso no lugar de cada uma
+validate_assets()
 
 st.header('Eat Out')
 st.subheader('Sempre a escolha certa!')
 
-tab1, tab2 = st.tabs(['Página Inicial', 'Atualizações'])
-with tab1:
+# as abas são escolhidas em um seletor: só a aba visível é executada e tem as imagens enviadas ao navegador
+# (com st.tabs o conteúdo de todas as abas, GIFs incluídos, é enviado a cada visita)
+tab = st.radio('Aba', ['Página Inicial', 'Atualizações'], horizontal=True, label_visibility='collapsed')
+if tab == 'Página Inicial':
     with st.container():
         st.header('Como utilizar este Dashboard?')
         st.markdown('### Demonstração de uso')
@@ -23,15 +23,13 @@ with tab1:
         col1, col2 = st.columns(2)
         with col1:
             st.markdown('##### - Visualize e interaja com os gráficos dispostos')
-            st.image('img/gif_graph.gif')
+            show_image('gif_graph')
            
         with col2:
             st.markdown('##### - Alterne as páginas e selecione os filtros')
-            st.image('img/gif_graph2.gif')
+            show_image('gif_graph2')
 
-st.markdown("----------")
-        
-with tab2:
+elif tab == 'Atualizações':
     with st.container():
         st.header("Atualizações")
         st.markdown("### Versão 1.1")
@@ -39,23 +37,19 @@ with tab2:
         st.markdown("----------")
         # primeiro item das atualizações
         st.markdown("##### - Adicionadas informações nas localizações do mapa")
-        image_path_1 = 'img/localizacao_info.png'
-        image_1 = Image.open(image_path_1)
-        st.image(image_1)
+        show_image('localizacao_info')
 
         st.markdown("----------")
         # segundo item das atualizações
         st.markdown("##### - Atualizados os rankings na seção de Culinárias")
-        image_path_2 = 'img/ranking_culinaria.png'
-        image_2 = Image.open(image_path_2)
-        st.image(image_2)
+        show_image('ranking_culinaria')
 
         st.markdown("----------")
         # terceiro item das atualizações
         st.markdown("#####  - Criado o filtro de Preço")
-        image_path_3 = 'img/filtro_preco.png'
-        image_3 = Image.open(image_path_3)
-        st.image(image_3)
+        show_image('filtro_preco')
+
+st.markdown("----------")
           
 with st.container():
     
@@ -76,10 +70,7 @@ with st.container():
         
         st.markdown(contact_form, unsafe_allow_html=True)
         
-        def local_css(file_name):
-            with open(file_name) as f:
-                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-        local_css('style/style.css')    
+        local_css('style/style.css')
                 
     with col2:
         st.markdown('# Precisa de ajuda? \n ## Time de Data Science no Discord\n - @gabrielpastega')
\ No newline at end of file